@@ -0,0 +1,52 @@
+"""Vistas asíncronas con la autenticación, los permisos y el renderizado de DRF.
+
+DRF no admite vistas asíncronas: ``@api_view`` envuelve la función en un
+``APIView`` síncrono. :func:`async_api_view` aplica a una vista
+``async def`` los mismos pasos que ``APIView.dispatch``: autenticación,
+permisos, throttling y negociación de contenido con las clases de
+``REST_FRAMEWORK``, conversión de excepciones (``ValidationError``,
+``NotFound``...) en respuestas y renderizado con el renderer negociado.
+Así una vista asíncrona responde exactamente lo mismo que su versión
+síncrona, y puede combinarse con
+:func:`~api_server.cache.cache_response` y
+:func:`~api_server.conditional.conditional_on`.
+
+Los pasos que pueden consultar la base de datos (autenticación y
+permisos) se ejecutan con ``sync_to_async``.
+"""
+from functools import wraps
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.views import APIView
+
+# Métodos que atienden las vistas asíncronas (solo lectura)
+ALLOWED_METHODS = ('GET', 'HEAD')
+
+
+def async_api_view(view):
+    """Decorador equivalente a ``@api_view(['GET'])`` para vistas ``async def``.
+
+    La vista recibe un ``Request`` de DRF y debe retornar un ``Response``.
+
+    Args:
+        view: Función asíncrona de la vista
+
+    Returns:
+        Función asíncrona que recibe un ``HttpRequest`` de Django
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        handler = APIView()
+        handler.args, handler.kwargs = args, kwargs
+        request = handler.initialize_request(request, *args, **kwargs)
+        handler.request = request
+        handler.headers = handler.default_response_headers
+        try:
+            await sync_to_async(handler.initial)(request, *args, **kwargs)
+            if request.method not in ALLOWED_METHODS:
+                raise MethodNotAllowed(request.method)
+            response = await view(request, *args, **kwargs)
+        except Exception as exc:
+            response = handler.handle_exception(exc)
+        return handler.finalize_response(request, response, *args, **kwargs)
+    return wrapper
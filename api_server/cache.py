@@ -0,0 +1,330 @@
+"""Caché de respuestas de la API con invalidación por versión de tabla.
+
+Cada modelo registrado con :func:`track_versions` tiene un número de
+versión guardado en la caché que se incrementa en cada alta, modificación
+o baja (señales ``post_save``/``post_delete``). La clave de una respuesta
+se forma con la URL completa de la petición (incluidos el host y la query
+string) y las versiones de las tablas de las que depende la vista, de modo
+que una escritura invalida exactamente las respuestas que la leen, sin
+recorrer ni borrar claves.
+
+Se usa el alias de caché ``API_CACHE_ALIAS`` de ``CACHES``: en desarrollo
+una caché en memoria local, en producción un backend compartido (Redis o
+Memcached) para que todos los procesos vean las mismas versiones.
+
+Las escrituras que no emiten señales (``QuerySet.update``,
+``bulk_create``) deben llamar a :func:`invalidate` por su cuenta.
+"""
+import hashlib
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from rest_framework.response import Response
+
+# Métodos cuyas respuestas se pueden guardar
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+HITS_KEY = 'api:stats:hits'
+MISSES_KEY = 'api:stats:misses'
+
+
+def get_cache():
+    """Retorna el backend de caché configurado para la API."""
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    """Segundos que se conserva una respuesta en caché."""
+    return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+
+def version_key(model):
+    """Clave de caché con la versión de la tabla de un modelo."""
+    return f'api:version:{model._meta.label_lower}'
+
+
+def modified_key(model):
+    """Clave de caché con la hora de la última escritura en la tabla."""
+    return f'api:modified:{model._meta.label_lower}'
+
+
+def _initial_version():
+    """Versión inicial de una tabla sin versión en caché.
+
+    Se parte de la hora actual en lugar de 1 para que, si el backend
+    expulsa una versión, no vuelvan a ser válidas respuestas antiguas
+    guardadas con números bajos.
+    """
+    return time.time_ns()
+
+
+def table_versions(models):
+    """Versiones actuales de las tablas de los modelos indicados.
+
+    Args:
+        models: Modelos de los que depende una respuesta
+
+    Returns:
+        list: Versión de cada modelo, en el mismo orden
+    """
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def table_modified(models):
+    """Hora de la última escritura en cualquiera de las tablas indicadas.
+
+    Las tablas sin hora registrada (por ejemplo tras reiniciar una caché en
+    memoria) toman la hora actual, que nunca es anterior a su última
+    escritura real.
+
+    Args:
+        models: Modelos de los que depende una respuesta
+
+    Returns:
+        float: Marca de tiempo Unix de la escritura más reciente
+    """
+    cache = get_cache()
+    keys = [modified_key(model) for model in models]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, time.time(), None)
+            stamps[key] = cache.get(key)
+    return max(stamps.values())
+
+
+def bump_version(model):
+    """Incrementa la versión de la tabla de un modelo y anota la hora.
+
+    Args:
+        model: Modelo cuya tabla ha cambiado
+    """
+    cache = get_cache()
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+    cache.set(modified_key(model), time.time(), None)
+
+
+def invalidate(*models):
+    """Invalida las respuestas que leen las tablas de los modelos.
+
+    La versión se incrementa de inmediato y otra vez al confirmar la
+    transacción, para descartar respuestas que otro proceso haya guardado
+    con los datos anteriores mientras la transacción seguía abierta.
+
+    Args:
+        *models: Modelos cuyas tablas han cambiado
+    """
+    def bump_all():
+        for model in models:
+            bump_version(model)
+
+    bump_all()
+    transaction.on_commit(bump_all)
+
+
+def _model_changed(sender, **kwargs):
+    """Receptor de señales que invalida las respuestas que leen la tabla."""
+    invalidate(sender)
+
+
+def track_versions(*models, deletes=True):
+    """Conecta las señales que versionan las tablas de los modelos.
+
+    Args:
+        *models: Modelos cuyas escrituras deben invalidar la caché
+        deletes: Si es False no se conecta ``post_delete``. Un receptor de
+            ``post_delete`` impide que Django borre en cascada con un único
+            ``DELETE``; los borrados deben llamar a :func:`invalidate`
+    """
+    for model in models:
+        uid = f'api-cache-{model._meta.label_lower}'
+        post_save.connect(_model_changed, sender=model, dispatch_uid=uid)
+        if deletes:
+            post_delete.connect(_model_changed, sender=model, dispatch_uid=uid)
+
+
+def response_key(request, versions):
+    """Clave de caché de una respuesta.
+
+    Args:
+        request: Objeto de petición HTTP
+        versions: Versiones de las tablas de las que depende la respuesta
+
+    Returns:
+        str: Clave formada por la URL absoluta (esquema, host, ruta y query
+        string) y las versiones. Las respuestas paginadas llevan enlaces
+        ``next``/``previous`` absolutos, así que cada host tiene las suyas
+    """
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f"api:response:{url}:{'.'.join(str(v) for v in versions)}"
+
+
+def _count(key):
+    """Incrementa uno de los contadores de aciertos y fallos."""
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def _cached(request, dependencies):
+    """Busca la respuesta de una petición en la caché.
+
+    Returns:
+        tuple: Clave de la respuesta y la respuesta guardada, o None
+    """
+    key = response_key(request, table_versions(dependencies))
+    entry = get_cache().get(key)
+    if entry is None:
+        _count(MISSES_KEY)
+        return key, None
+    _count(HITS_KEY)
+    response = Response(entry['data'], status=entry['status'])
+    response['X-Cache'] = 'HIT'
+    return key, response
+
+
+def _store(key, response):
+    """Guarda los datos de una respuesta recién construida."""
+    # Las respuestas en streaming no se guardan: se generan al enviarse
+    if response.status_code == 200 and isinstance(response, Response):
+        get_cache().set(key, {'data': response.data, 'status': 200}, _timeout())
+    response['X-Cache'] = 'MISS'
+
+
+def cached_response(request, dependencies, build):
+    """Sirve una respuesta desde la caché o la construye y la guarda.
+
+    Solo se guardan respuestas ``200`` a peticiones ``GET``/``HEAD``. Se
+    almacenan los datos sin renderizar, por lo que la negociación de
+    contenido sigue aplicándose a cada petición.
+
+    Args:
+        request: Objeto de petición HTTP
+        dependencies: Modelos cuyas tablas lee la vista
+        build: Función sin argumentos que genera la respuesta
+
+    Returns:
+        Response: La respuesta, con la cabecera ``X-Cache`` (HIT o MISS)
+    """
+    if request.method not in CACHEABLE_METHODS:
+        return build()
+    key, response = _cached(request, dependencies)
+    if response is None:
+        response = build()
+        _store(key, response)
+    return response
+
+
+async def acached_response(request, dependencies, build):
+    """Variante asíncrona de :func:`cached_response`.
+
+    Args:
+        request: Objeto de petición HTTP
+        dependencies: Modelos cuyas tablas lee la vista
+        build: Función sin argumentos que retorna una corrutina con la
+            respuesta
+
+    Returns:
+        Response: La respuesta, con la cabecera ``X-Cache`` (HIT o MISS)
+    """
+    if request.method not in CACHEABLE_METHODS:
+        return await build()
+    key, response = await sync_to_async(_cached)(request, dependencies)
+    if response is None:
+        response = await build()
+        await sync_to_async(_store)(key, response)
+    return response
+
+
+def cache_response(*dependencies):
+    """Decorador para vistas función de DRF cuya respuesta se cachea.
+
+    Debe aplicarse debajo de ``@api_view`` (o de
+    :func:`~api_server.async_views.async_api_view` en vistas asíncronas)
+    para que la autenticación y los permisos se comprueben antes de
+    consultar la caché.
+
+    Args:
+        *dependencies: Modelos cuyas tablas lee la vista
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                return await acached_response(
+                    request, dependencies, lambda: view(request, *args, **kwargs)
+                )
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return cached_response(
+                request, dependencies, lambda: view(request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+class CachedResponseMixin:
+    """Mixin para ViewSets que cachea ``list`` y ``retrieve``.
+
+    Las vistas declaran en ``cache_dependencies`` los modelos cuyas tablas
+    leen su serializer y su queryset.
+    """
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        """Lista los objetos, desde la caché si es posible."""
+        build = super().list
+        return cached_response(
+            request, self.cache_dependencies,
+            lambda: build(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Obtiene un objeto, desde la caché si es posible."""
+        build = super().retrieve
+        return cached_response(
+            request, self.cache_dependencies,
+            lambda: build(request, *args, **kwargs)
+        )
+
+
+def cache_statistics():
+    """Contadores de aciertos y fallos de la caché de respuestas.
+
+    Returns:
+        dict: ``hits``, ``misses`` y ``hit_ratio`` (entre 0 y 1)
+    """
+    counts = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits = counts.get(HITS_KEY, 0)
+    misses = counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_cache_statistics():
+    """Pone a cero los contadores de aciertos y fallos."""
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,65 @@
+"""Consultas concurrentes desde vistas asíncronas.
+
+Los métodos asíncronos del ORM (``aget``, ``acount``, ``aaggregate``...)
+ejecutan la consulta con ``sync_to_async`` en un único hilo compartido, de
+modo que varias consultas lanzadas con ``asyncio.gather`` se ejecutan una
+detrás de otra. :func:`gather_queries` ejecuta cada función en un hilo del
+pool (``thread_sensitive=False``), cada uno con su propia conexión, para
+que el tiempo total se acerque al de la consulta más lenta.
+
+En SQLite las consultas se ejecutan en secuencia en el hilo compartido:
+los escritores se bloquean entre sí y las conexiones de otros hilos no ven
+los datos de una transacción abierta (por ejemplo en los tests). También
+puede desactivarse la concurrencia con ``ASYNC_CONCURRENT_QUERIES``.
+"""
+import asyncio
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+
+def concurrent_queries_enabled(using=DEFAULT_DB_ALIAS):
+    """Indica si las consultas pueden ejecutarse en hilos separados.
+
+    Args:
+        using: Alias de la base de datos
+
+    Returns:
+        bool: False en SQLite o si ``ASYNC_CONCURRENT_QUERIES`` es False
+    """
+    if not getattr(settings, 'ASYNC_CONCURRENT_QUERIES', True):
+        return False
+    return connections[using].vendor != 'sqlite'
+
+
+def _with_own_connection(func):
+    """Ejecuta ``func`` en un hilo del pool gestionando su conexión.
+
+    Como al empezar y terminar una petición, se cierran las conexiones
+    caducadas o con errores (todas si ``CONN_MAX_AGE`` es 0), para no dejar
+    conexiones abiertas en los hilos del pool.
+    """
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def gather_queries(*calls):
+    """Ejecuta funciones síncronas que consultan la base de datos a la vez.
+
+    Args:
+        *calls: Funciones sin argumentos (se pueden usar ``functools.partial``
+            o lambdas) con una consulta independiente cada una
+
+    Returns:
+        list: El resultado de cada función, en el mismo orden
+    """
+    if not concurrent_queries_enabled():
+        return [await sync_to_async(call)() for call in calls]
+    return await asyncio.gather(*(
+        sync_to_async(partial(_with_own_connection, call), thread_sensitive=False)()
+        for call in calls
+    ))
@@ -0,0 +1,66 @@
+"""Peticiones GET condicionales a partir de las versiones de tabla.
+
+Las vistas decoradas con :func:`conditional_on` responden con las
+cabeceras ``ETag`` y ``Last-Modified`` calculadas a partir de las
+versiones y horas de escritura que mantiene :mod:`api_server.cache` para
+las tablas de las que dependen. Si el cliente envía ``If-None-Match`` o
+``If-Modified-Since`` y nada ha cambiado, se responde ``304`` sin ejecutar
+la vista, es decir, sin consultas de serialización ni de agregación.
+
+``Last-Modified`` tiene resolución de segundos; ``ETag`` cambia con cada
+escritura y es el validador que conviene usar.
+"""
+import hashlib
+from datetime import datetime, timezone
+from django.views.decorators.http import condition
+from api_server.cache import table_versions, table_modified
+
+
+def table_etag(request, models):
+    """ETag de una respuesta según la petición y las versiones de tabla.
+
+    Incluye la ruta completa (paginación y filtros) y el tipo de contenido
+    negociado, para que cada representación tenga su propio ETag.
+
+    Args:
+        request: Objeto de petición HTTP
+        models: Modelos cuyas tablas lee la vista
+
+    Returns:
+        str: ETag fuerte entre comillas
+    """
+    versions = '.'.join(str(v) for v in table_versions(models))
+    media_type = getattr(request, 'accepted_media_type', '')
+    raw = f'{request.get_full_path()}|{media_type}|{versions}'
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def table_last_modified(models):
+    """Fecha de la última escritura en las tablas indicadas.
+
+    Args:
+        models: Modelos cuyas tablas lee la vista
+
+    Returns:
+        datetime: Fecha en UTC
+    """
+    return datetime.fromtimestamp(table_modified(models), tz=timezone.utc)
+
+
+def conditional_on(*models):
+    """Decorador que añade GET condicional a una vista de DRF.
+
+    Se aplica debajo de ``@api_view`` o, con ``method_decorator``, sobre la
+    acción de un ViewSet, de modo que la autenticación, los permisos y la
+    negociación de contenido se resuelven antes de comparar los validadores.
+
+    Args:
+        *models: Modelos cuyas tablas lee la vista
+    """
+    def etag(request, *args, **kwargs):
+        return table_etag(request, models)
+
+    def last_modified(request, *args, **kwargs):
+        return table_last_modified(models)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
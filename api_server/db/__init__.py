@@ -0,0 +1 @@
+"""Utilidades de conexión a la base de datos (pool de conexiones)."""
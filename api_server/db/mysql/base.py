@@ -0,0 +1,50 @@
+"""Backend MySQL con pool de conexiones acotado.
+
+Igual que ``django.db.backends.mysql`` pero las conexiones se toman y se
+devuelven a un :class:`~api_server.db.pool.ConnectionPool` compartido por
+todos los hilos del proceso, en lugar de abrirse y cerrarse en cada
+petición. Se configura en ``OPTIONS['pool']`` como el pool de PostgreSQL
+de Django::
+
+    'ENGINE': 'api_server.db.mysql',
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {'pool': {'max_size': 10, 'timeout': 10, 'max_lifetime': 3600}},
+
+Con ``CONN_MAX_AGE = 0`` Django "cierra" la conexión al terminar cada
+petición, lo que aquí la devuelve al pool.
+"""
+from django.db.backends.mysql import base
+from api_server.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Conexión de Django a MySQL que usa el pool del proceso."""
+
+    def get_connection_params(self):
+        """Parámetros de conexión sin las opciones del pool."""
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    @property
+    def pool(self):
+        """Pool compartido de esta base de datos."""
+        settings_dict = self.settings_dict
+        key = (self.alias, settings_dict['HOST'], settings_dict['PORT'],
+               settings_dict['NAME'], settings_dict['USER'])
+        options = settings_dict['OPTIONS'].get('pool') or {}
+        return get_pool(key, self._connect_new, **options)
+
+    def _connect_new(self):
+        """Abre una conexión nueva para el pool."""
+        return super().get_new_connection(self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        """Toma una conexión del pool en lugar de abrir una nueva."""
+        return self.pool.acquire()
+
+    def _close(self):
+        """Devuelve la conexión al pool; la descarta si hubo errores."""
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection, discard=self.errors_occurred)
@@ -0,0 +1,147 @@
+"""Pool de conexiones acotado y con comprobación de salud.
+
+Django solo trae pool de conexiones para PostgreSQL. Con MySQL, las
+conexiones persistentes (``CONN_MAX_AGE``) son por hilo: bajo ASGI cada
+petición síncrona puede ejecutarse en un hilo distinto, así que el número
+de conexiones abiertas no está acotado. :class:`ConnectionPool` comparte
+un número máximo de conexiones entre todos los hilos del proceso; lo usa
+el backend ``api_server.db.mysql``.
+"""
+import queue
+import threading
+import time
+from django.db.utils import OperationalError
+
+
+class ConnectionPool:
+    """Conexiones reutilizables entre hilos, con un máximo abiertas a la vez.
+
+    Al tomar una conexión se reutiliza la última devuelta (LIFO, la que más
+    probablemente sigue viva); si llevaba más de ``ping_after`` segundos
+    sin usarse se comprueba con ``ping()`` y las que fallan o superan
+    ``max_lifetime`` se cierran y se sustituyen por otras nuevas.
+
+    Args:
+        connect: Función sin argumentos que abre una conexión DB-API
+        max_size: Conexiones abiertas como máximo (en uso u ociosas)
+        timeout: Segundos que se espera una conexión libre antes de fallar
+        max_lifetime: Segundos tras los que una conexión se renueva
+        ping_after: Segundos de inactividad tras los que se comprueba
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10, max_lifetime=3600, ping_after=5):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = queue.LifoQueue()
+        self._created = {}
+
+    def acquire(self):
+        """Toma una conexión sana del pool o abre una nueva.
+
+        Returns:
+            Conexión DB-API
+
+        Raises:
+            OperationalError: Si no queda ninguna libre tras ``timeout`` segundos
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Pool de conexiones agotado: {self.max_size} en uso durante {self.timeout} s'
+            )
+        try:
+            while True:
+                try:
+                    connection, released = self._idle.get_nowait()
+                except queue.Empty:
+                    connection = self.connect()
+                    self._created[id(connection)] = time.monotonic()
+                    return connection
+                if self._healthy(connection, released):
+                    return connection
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        """Devuelve una conexión al pool.
+
+        Args:
+            connection: Conexión obtenida con :meth:`acquire`
+            discard: Si es True se cierra en lugar de reutilizarse (por
+                ejemplo tras un error)
+        """
+        try:
+            if discard:
+                self._discard(connection)
+            else:
+                try:
+                    # No debe quedar ninguna transacción abierta al reutilizarla
+                    connection.rollback()
+                except Exception:
+                    self._discard(connection)
+                else:
+                    self._idle.put((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        """Cierra las conexiones ociosas."""
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(connection)
+
+    @property
+    def idle(self):
+        """Número de conexiones ociosas."""
+        return self._idle.qsize()
+
+    def _healthy(self, connection, released):
+        """Comprueba la edad de una conexión y, si estaba inactiva, su estado."""
+        now = time.monotonic()
+        if now - self._created.get(id(connection), now) > self.max_lifetime:
+            return False
+        if now - released < self.ping_after:
+            return True
+        try:
+            connection.ping()
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, connection):
+        """Cierra una conexión sin propagar errores."""
+        self._created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, **options):
+    """Pool del proceso para una base de datos, creándolo la primera vez.
+
+    Args:
+        key: Identificador de la base de datos (alias y parámetros)
+        connect: Función que abre una conexión nueva
+        **options: Argumentos de :class:`ConnectionPool`
+
+    Returns:
+        ConnectionPool: El pool compartido por todos los hilos
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(connect, **options)
+        return pool
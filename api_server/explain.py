@@ -0,0 +1,65 @@
+"""Utilidades para comprobar en los tests qué índices usa una consulta.
+
+Ejecutan ``EXPLAIN`` sobre un queryset y extraen los nombres de los índices
+del plan, tanto en SQLite (desarrollo y tests) como en MySQL (producción).
+"""
+import json
+import re
+from django.db import connections
+
+_SQLITE_INDEX = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+_POSTGRES_INDEX = re.compile(r'Index (?:Only )?Scan(?: Backward)? using (\w+)')
+
+
+def _json_keys(node, key):
+    """Recorre un plan JSON de MySQL y devuelve los valores de ``key``."""
+    if isinstance(node, dict):
+        for name, value in node.items():
+            if name == key and isinstance(value, str):
+                yield value
+            else:
+                yield from _json_keys(value, key)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _json_keys(item, key)
+
+
+def used_indexes(queryset):
+    """Nombres de los índices que el plan de ejecución usa para un queryset.
+
+    Args:
+        queryset: QuerySet a analizar (puede estar recortado con ``[:n]``)
+
+    Returns:
+        set: Nombres de índices presentes en el plan
+
+    Raises:
+        NotImplementedError: Si el motor de base de datos no está soportado
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'mysql':
+        plan = json.loads(queryset.explain(format='json'))
+        return set(_json_keys(plan, 'key'))
+    if vendor == 'sqlite':
+        return set(_SQLITE_INDEX.findall(queryset.explain()))
+    if vendor == 'postgresql':
+        return set(_POSTGRES_INDEX.findall(queryset.explain()))
+    raise NotImplementedError(f'EXPLAIN no soportado para {vendor}')
+
+
+class ExplainTestMixin:
+    """Mixin para ``TestCase`` con aserciones sobre el plan de las consultas."""
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Falla si el plan del queryset no usa el índice indicado.
+
+        Args:
+            queryset: QuerySet a analizar
+            index_name: Nombre del índice esperado
+        """
+        indexes = used_indexes(queryset)
+        self.assertIn(
+            index_name, indexes,
+            f'La consulta no usa {index_name} (usa {sorted(indexes)}):\n'
+            f'{queryset.explain()}'
+        )
@@ -0,0 +1,133 @@
+"""Exportación de tablas completas en NDJSON o CSV sin cargarlas en memoria.
+
+Las filas se leen como tuplas con ``values_list()`` (sin instancias de
+modelo ni serializers de DRF) en lotes de ``EXPORT_CHUNK_SIZE`` filas
+paginados por clave primaria (``WHERE id > último ORDER BY id LIMIT n``).
+Se usa paginación por clave en lugar de ``.iterator()`` porque el backend
+de MySQL (PyMySQL) no tiene cursores de servidor y ``.iterator()``
+descargaría todo el resultado en el cliente; así la memoria depende solo
+del tamaño del lote y cada consulta es corta y usa el índice primario.
+
+La exportación no es una instantánea: las filas creadas durante la
+descarga con un id mayor que el último leído también se incluyen.
+"""
+import csv
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+#: Formatos de exportación y su tipo de contenido
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def iter_rows(queryset, lookups, chunk_size=None, descending=False):
+    """Recorre un queryset por lotes ordenados por clave primaria.
+
+    Args:
+        queryset: QuerySet a exportar (puede estar filtrado)
+        lookups: Campos a leer, incluidos los de relaciones (``book__title``)
+        chunk_size: Filas por consulta; por defecto ``EXPORT_CHUNK_SIZE``
+        descending: Si es True recorre de la clave más alta a la más baja
+
+    Yields:
+        list: Lotes de tuplas con los valores de ``lookups``
+    """
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    queryset = queryset.order_by('-pk' if descending else 'pk').values_list('pk', *lookups)
+    after = 'pk__lt' if descending else 'pk__gt'
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(**{after: last_pk})
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield [row[1:] for row in rows]
+        if len(rows) < chunk_size:
+            return
+
+
+class _Echo:
+    """Buffer mínimo para ``csv.writer`` que devuelve lo escrito."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(columns, batches):
+    """Convierte lotes de filas en bloques de texto NDJSON.
+
+    Args:
+        columns: Nombres de las columnas de salida
+        batches: Lotes de tuplas, como los de :func:`iter_rows`
+
+    Yields:
+        str: Un bloque por lote, con un objeto JSON por línea
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for rows in batches:
+        yield ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in rows)
+
+
+def csv_lines(columns, batches):
+    """Convierte lotes de filas en bloques de texto CSV con cabecera.
+
+    Args:
+        columns: Nombres de las columnas de salida
+        batches: Lotes de tuplas, como los de :func:`iter_rows`
+
+    Yields:
+        str: La cabecera y después un bloque por lote
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for rows in batches:
+        yield ''.join(writer.writerow(row) for row in rows)
+
+
+def json_document_lines(head, key, items):
+    """Genera un documento JSON cuyo último campo es una lista en streaming.
+
+    Args:
+        head: Campos del documento que se envían antes de la lista
+        key: Nombre del campo de la lista
+        items: Lotes de elementos (diccionarios) de la lista
+
+    Yields:
+        str: La cabecera del documento, un bloque por lote y el cierre
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    prefix = encoder.encode(head)[:-1]
+    yield f'{prefix}{", " if head else ""}{encoder.encode(key)}: ['
+    separator = ''
+    for batch in items:
+        if batch:
+            yield separator + ', '.join(encoder.encode(item) for item in batch)
+            separator = ', '
+    yield ']}'
+
+
+def export_response(queryset, fields, fmt, filename):
+    """Respuesta en streaming con todas las filas de un queryset.
+
+    Args:
+        queryset: QuerySet a exportar
+        fields: Pares ``(columna, lookup)`` con el nombre de salida y el
+            campo a leer
+        fmt: ``ndjson`` o ``csv``
+        filename: Nombre del fichero sin extensión
+
+    Returns:
+        StreamingHttpResponse: Respuesta que genera el fichero por lotes
+    """
+    columns = [column for column, _ in fields]
+    batches = iter_rows(queryset, [lookup for _, lookup in fields])
+    lines = ndjson_lines if fmt == 'ndjson' else csv_lines
+    response = StreamingHttpResponse(
+        lines(columns, batches), content_type=CONTENT_TYPES[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
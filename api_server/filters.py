@@ -0,0 +1,161 @@
+"""Filtros de los listados de la API que siempre usan un índice.
+
+Cada vista declara en ``query_filters`` los parámetros de la URL que admite
+y :class:`IndexedFilterBackend` los aplica. Cada filtro indica si su
+consulta se resuelve con un índice:
+
+- :class:`ExactFilter`: igualdad sobre una columna indexada (claves ajenas,
+  columnas ``unique``)
+- :class:`PrefixFilter`: prefijo sin distinguir mayúsculas, como rango
+  sobre un índice funcional ``Lower(columna)`` (``LIKE 'abc%'`` no usa
+  índices en SQLite ni sobre ``LOWER()`` en MySQL)
+- :class:`ContainsFilter`: subcadena (``LIKE '%abc%'``), que ningún índice
+  B-tree puede resolver
+
+Un ``contains`` solo recorre pocas filas si otro filtro indexado reduce
+antes el conjunto (por ejemplo ``?writer=`` o un prefijo). Si no hay
+ninguno la petición se rechaza con ``400`` para no recorrer la tabla
+entera, salvo con ``FILTER_ALLOW_FULL_SCAN = True`` (tablas pequeñas).
+"""
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Lower
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+#: Carácter mayor que cualquier otro, cota superior de los rangos de prefijo
+_MAX_CHAR = '\U0010ffff'
+
+
+def allow_full_scan():
+    """Indica si se admiten filtros que recorren la tabla entera."""
+    return getattr(settings, 'FILTER_ALLOW_FULL_SCAN', False)
+
+
+class QueryFilter:
+    """Filtro de un parámetro de la URL.
+
+    Attributes:
+        param: Nombre del parámetro
+        indexed: Si la consulta se resuelve con un índice
+    """
+    indexed = True
+
+    def __init__(self, param, field=None):
+        """Declara el filtro.
+
+        Args:
+            param: Nombre del parámetro de la URL
+            field: Campo del modelo; por defecto el nombre del parámetro
+        """
+        self.param = param
+        self.field = field or param
+
+    def filter(self, queryset, request):
+        """Aplica el filtro si la petición incluye su parámetro.
+
+        Args:
+            queryset: QuerySet a filtrar
+            request: Petición HTTP actual
+
+        Returns:
+            tuple: El queryset y si se ha aplicado el filtro
+        """
+        value = request.query_params.get(self.param)
+        if value in (None, ''):
+            return queryset, False
+        return self.apply(queryset, self.parse(value)), True
+
+    def parse(self, value):
+        """Convierte el valor recibido o lanza ``ValidationError``."""
+        return value
+
+    def apply(self, queryset, value):
+        """Filtra el queryset con el valor ya convertido."""
+        raise NotImplementedError('apply() debe implementarse')
+
+
+class ExactFilter(QueryFilter):
+    """Igualdad sobre una columna indexada (por defecto un id entero)."""
+
+    def __init__(self, param, field=None, parse=int):
+        """Declara el filtro.
+
+        Args:
+            param: Nombre del parámetro de la URL
+            field: Campo del modelo; por defecto el nombre del parámetro
+            parse: Conversión del valor recibido
+        """
+        super().__init__(param, field)
+        self._parse = parse
+
+    def parse(self, value):
+        try:
+            return self._parse(value)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError({self.param: 'Valor inválido.'})
+
+    def apply(self, queryset, value):
+        return queryset.filter(**{self.field: value})
+
+
+class PrefixFilter(QueryFilter):
+    """Prefijo sin distinguir mayúsculas sobre el índice ``Lower(campo)``.
+
+    Se expresa como ``LOWER(campo) >= LOWER(prefijo)`` y
+    ``< LOWER(prefijo) || U+10FFFF``, un rango que tanto SQLite como MySQL
+    resuelven con el índice funcional de la columna.
+    """
+
+    def apply(self, queryset, value):
+        column = f'_{self.param}_lower'
+        return queryset.alias(**{column: Lower(self.field)}).filter(**{
+            f'{column}__gte': Lower(Value(value)),
+            f'{column}__lt': Lower(Value(value + _MAX_CHAR)),
+        })
+
+
+class ContainsFilter(QueryFilter):
+    """Subcadena sin distinguir mayúsculas; no puede usar índices."""
+    indexed = False
+
+    def apply(self, queryset, value):
+        return queryset.filter(**{f'{self.field}__icontains': value})
+
+
+class IndexedFilterBackend(BaseFilterBackend):
+    """Aplica los ``query_filters`` de la vista y rechaza los recorridos completos.
+
+    Los parámetros vacíos se ignoran. Si solo se usan filtros sin índice
+    responde ``400`` indicando qué filtros indexados pueden acompañarlos.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """Filtra el queryset de la vista según la query string.
+
+        Args:
+            request: Petición HTTP actual
+            queryset: QuerySet de la vista
+            view: Vista con el atributo ``query_filters``
+
+        Returns:
+            QuerySet: El queryset filtrado
+
+        Raises:
+            ValidationError: Si un valor no es válido o la combinación de
+                filtros obligaría a recorrer la tabla entera
+        """
+        filters = getattr(view, 'query_filters', ())
+        applied = []
+        for query_filter in filters:
+            queryset, used = query_filter.filter(queryset, request)
+            if used:
+                applied.append(query_filter)
+        unindexed = [f.param for f in applied if not f.indexed]
+        if unindexed and not any(f.indexed for f in applied) and not allow_full_scan():
+            indexed = ', '.join(f.param for f in filters if f.indexed)
+            raise serializers.ValidationError({
+                unindexed[0]: f'Este filtro recorre la tabla entera; combínelo con '
+                              f'alguno de: {indexed}.'
+            })
+        return queryset
@@ -0,0 +1,332 @@
+"""Métricas de coste por vista: consultas SQL, tiempos y tamaño de respuesta.
+
+:class:`MetricsMiddleware` mide cada petición y la agrega por nombre de
+vista resuelta (``loan-list``, ``library-statistics``...). Cada respuesta
+lleva una cabecera ``Server-Timing`` con sus propios tiempos y la vista
+``/metrics`` expone los agregados en formato de texto de Prometheus.
+
+El coste está acotado para poder dejarlo activo en producción:
+
+- por consulta SQL solo se suman un contador y un ``perf_counter``; el
+  envoltorio se instala una vez en cada conexión y encuentra el contador de
+  la petición en curso en una ``ContextVar``, que también ven los hilos de
+  ``sync_to_async`` de las vistas asíncronas
+- por vista se guardan unos pocos totales y una ventana circular de las
+  últimas ``METRICS_WINDOW`` duraciones, de la que se calculan los
+  percentiles al exportar
+- las vistas se agrupan por nombre de ruta, no por URL, así que el número
+  de series no crece con los ids; las rutas no resueltas van a
+  ``unresolved``
+
+Las métricas son de cada proceso: con varios workers, Prometheus debe
+consultar cada uno o sumar las series por instancia.
+"""
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+#: Cuantiles que se exportan de las duraciones y del número de consultas
+QUANTILES = (0.5, 0.9, 0.99)
+
+#: Nombre de la serie de las peticiones que no resuelven a ninguna vista
+UNRESOLVED = 'unresolved'
+
+
+def _window():
+    """Peticiones por vista que se conservan para calcular percentiles."""
+    return getattr(settings, 'METRICS_WINDOW', 1000)
+
+
+def percentile(values, quantile):
+    """Percentil por rango más cercano de una lista ordenada.
+
+    Args:
+        values: Valores ordenados de menor a mayor
+        quantile: Cuantil entre 0 y 1
+
+    Returns:
+        float: El valor del percentil, o 0 si no hay valores
+    """
+    if not values:
+        return 0
+    index = max(0, min(len(values) - 1, round(quantile * len(values)) - 1))
+    return values[index]
+
+
+class QueryTimer:
+    """Envoltorio de ejecución SQL que cuenta consultas y suma su duración.
+
+    Admite consultas simultáneas desde varios hilos (ver
+    :func:`api_server.concurrency.gather_queries`).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.count += 1
+                self.duration += elapsed
+
+
+#: Contador de consultas de la petición en curso
+_current_timer = ContextVar('api_metrics_query_timer', default=None)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    """Envoltorio permanente que pasa cada consulta al contador en curso."""
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(connection, **kwargs):
+    """Instala el envoltorio de métricas en una conexión, una sola vez.
+
+    Se añade al principio de la lista porque ``execute_wrapper()`` retira
+    sus envoltorios con ``pop()`` y no debe retirar este.
+    """
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _timed_execute)
+
+
+connection_created.connect(install_query_timer, dispatch_uid='api-metrics-query-timer')
+
+
+class ViewMetrics:
+    """Totales y ventana de duraciones de una vista."""
+    __slots__ = ('requests', 'duration', 'queries', 'db_time', 'render_time',
+                 'response_bytes', 'durations', 'query_counts')
+
+    def __init__(self, window):
+        self.requests = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.response_bytes = 0
+        self.durations = deque(maxlen=window)
+        self.query_counts = deque(maxlen=window)
+
+
+class MetricsRegistry:
+    """Métricas agregadas por vista, compartidas por los hilos del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, duration, queries, db_time, render_time, response_bytes):
+        """Añade una petición a las métricas de su vista.
+
+        Args:
+            view: Nombre de la vista resuelta
+            duration: Segundos totales de la petición
+            queries: Consultas SQL ejecutadas
+            db_time: Segundos dentro de la base de datos
+            render_time: Segundos renderizando la respuesta
+            response_bytes: Tamaño del cuerpo, o None si se envía en streaming
+        """
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics(_window())
+            metrics.requests += 1
+            metrics.duration += duration
+            metrics.queries += queries
+            metrics.db_time += db_time
+            metrics.render_time += render_time
+            metrics.response_bytes += response_bytes or 0
+            metrics.durations.append(duration)
+            metrics.query_counts.append(queries)
+
+    def snapshot(self):
+        """Copia de las métricas con los percentiles ya calculados.
+
+        Returns:
+            dict: Por vista, los totales y ``duration_quantiles`` y
+            ``query_quantiles`` (cuantil -> valor)
+        """
+        with self._lock:
+            views = {
+                view: (
+                    {name: getattr(metrics, name) for name in (
+                        'requests', 'duration', 'queries', 'db_time',
+                        'render_time', 'response_bytes',
+                    )},
+                    sorted(metrics.durations),
+                    sorted(metrics.query_counts),
+                )
+                for view, metrics in self._views.items()
+            }
+        result = {}
+        for view, (totals, durations, query_counts) in sorted(views.items()):
+            totals['duration_quantiles'] = {q: percentile(durations, q) for q in QUANTILES}
+            totals['query_quantiles'] = {q: percentile(query_counts, q) for q in QUANTILES}
+            result[view] = totals
+        return result
+
+    def reset(self):
+        """Descarta todas las métricas."""
+        with self._lock:
+            self._views.clear()
+
+
+#: Registro de métricas del proceso
+registry = MetricsRegistry()
+
+
+def view_name(request):
+    """Nombre con el que se agrupan las métricas de una petición."""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNRESOLVED
+
+
+def server_timing(queries, db_time, render_time, duration):
+    """Valor de la cabecera ``Server-Timing`` (duraciones en milisegundos)."""
+    return (
+        f'db;dur={db_time * 1000:.1f};desc="{queries} queries", '
+        f'render;dur={render_time * 1000:.1f}, '
+        f'total;dur={duration * 1000:.1f}'
+    )
+
+
+class MetricsMiddleware:
+    """Middleware que mide consultas, tiempos y tamaño de cada respuesta.
+
+    Debe ser el primero de ``MIDDLEWARE`` para que el tiempo total incluya
+    al resto de middlewares. El tiempo de renderizado (serialización a
+    JSON o HTML de las respuestas de DRF) se mide con un callback de
+    ``post_render``. En las respuestas en streaming solo cuenta lo ocurrido
+    antes de empezar a enviar el cuerpo y no se suma su tamaño.
+
+    Funciona en modo síncrono y asíncrono, de modo que bajo ASGI no obliga
+    a ejecutar las vistas asíncronas en un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Conexiones abiertas antes de cargar el middleware
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer, token, start = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        return self._finish(request, response, timer, start)
+
+    async def __acall__(self, request):
+        timer, token, start = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        return self._finish(request, response, timer, start)
+
+    def _start(self, request):
+        """Activa el contador de consultas de la petición."""
+        timer = QueryTimer()
+        request._metrics_render_time = 0.0
+        return timer, _current_timer.set(timer), time.perf_counter()
+
+    def _finish(self, request, response, timer, start):
+        """Registra las métricas de la petición y añade ``Server-Timing``."""
+        duration = time.perf_counter() - start
+        render_time = request._metrics_render_time
+        response_bytes = None if response.streaming else len(response.content)
+        registry.record(
+            view_name(request), duration, timer.count, timer.duration,
+            render_time, response_bytes,
+        )
+        if getattr(settings, 'METRICS_SERVER_TIMING', True):
+            response['Server-Timing'] = server_timing(
+                timer.count, timer.duration, render_time, duration
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        """Mide el renderizado, que Django hace justo después de este método."""
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render_time = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def _label(value):
+    """Escapa el valor de una etiqueta de Prometheus."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(views, cache_counts):
+    """Formatea las métricas en el formato de texto de Prometheus 0.0.4.
+
+    Args:
+        views: Resultado de :meth:`MetricsRegistry.snapshot`
+        cache_counts: Contadores de la caché de respuestas (``hits``, ``misses``)
+
+    Returns:
+        str: Texto de exposición de Prometheus
+    """
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            label_text = ','.join(f'{key}="{_label(str(val))}"' for key, val in labels)
+            lines.append(f'{name}{suffix}{{{label_text}}} {value}' if label_text
+                         else f'{name}{suffix} {value}')
+
+    def summary(metrics_key, total_key, view, data):
+        samples = [('', (('view', view), ('quantile', q)), value)
+                   for q, value in data[metrics_key].items()]
+        samples.append(('_sum', (('view', view),), data[total_key]))
+        samples.append(('_count', (('view', view),), data['requests']))
+        return samples
+
+    family('api_request_duration_seconds', 'summary',
+           'Duración de las peticiones por vista.',
+           [s for view, data in views.items()
+            for s in summary('duration_quantiles', 'duration', view, data)])
+    family('api_db_queries', 'summary',
+           'Consultas SQL por petición y vista.',
+           [s for view, data in views.items()
+            for s in summary('query_quantiles', 'queries', view, data)])
+    for name, key, help_text in (
+        ('api_db_duration_seconds_total', 'db_time', 'Tiempo total en la base de datos por vista.'),
+        ('api_render_duration_seconds_total', 'render_time', 'Tiempo total de renderizado por vista.'),
+        ('api_response_bytes_total', 'response_bytes', 'Bytes de respuesta enviados por vista.'),
+    ):
+        family(name, 'counter', help_text,
+               [('', (('view', view),), data[key]) for view, data in views.items()])
+    family('api_cache_hits_total', 'counter', 'Aciertos de la caché de respuestas.',
+           [('', (), cache_counts['hits'])])
+    family('api_cache_misses_total', 'counter', 'Fallos de la caché de respuestas.',
+           [('', (), cache_counts['misses'])])
+    return '\n'.join(lines) + '\n'
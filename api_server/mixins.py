@@ -0,0 +1,129 @@
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from api_server.serializers import values_representation
+
+
+class EagerLoadingViewMixin:
+    """Mixin para vistas de DRF que aplica la carga declarada por su serializer.
+
+    Sobrescribe ``get_queryset`` para que el queryset de la vista pase por
+    ``setup_eager_loading`` del serializer (ver
+    :class:`api_server.serializers.EagerLoadingMixin`). Las acciones
+    personalizadas pueden usar ``eager_load`` para preparar querysets que
+    no provienen de ``get_queryset``.
+    """
+
+    def get_queryset(self):
+        """Retorna el queryset de la vista con las relaciones precargadas."""
+        return self.eager_load(super().get_queryset())
+
+    def eager_load(self, queryset, serializer_class=None):
+        """Aplica la carga del serializer indicado (o el de la vista).
+
+        Args:
+            queryset: QuerySet a preparar
+            serializer_class: Serializer con el que se serializará; por
+                defecto el de la vista
+
+        Returns:
+            QuerySet: El queryset preparado
+        """
+        serializer_class = serializer_class or self.get_serializer_class()
+        setup = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup is None:
+            return queryset
+        return setup(queryset, request=getattr(self, 'request', None))
+
+
+class ValuesListViewMixin:
+    """Mixin para vistas de DRF que sirve ``list`` sin instanciar modelos.
+
+    Si el serializer de la vista se puede reproducir desde ``values()``
+    (ver :func:`api_server.serializers.values_representation`), el listado
+    lee solo las columnas que el serializer muestra (o las pedidas con
+    ``?fields=``/``?exclude=``) y construye cada elemento con la
+    representación precompilada, con la misma salida que el serializer. Si
+    no, se usa el ``list`` de DRF sin cambios.
+
+    Las acciones que devuelven listas pueden usar :meth:`list_response`.
+
+    Attributes:
+        values_list_enabled: Permite desactivar el modo rápido en una vista
+    """
+    values_list_enabled = True
+
+    def list(self, request, *args, **kwargs):
+        """Lista los objetos con la representación rápida si es posible."""
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+
+    def list_response(self, queryset, serializer_class=None):
+        """Respuesta paginada con los objetos de un queryset.
+
+        Args:
+            queryset: QuerySet ya filtrado
+            serializer_class: Serializer de los elementos; por defecto el
+                de la vista
+
+        Returns:
+            Response con la página (o la lista completa sin paginación)
+        """
+        serializer_class = serializer_class or self.get_serializer_class()
+        selected_fields = getattr(serializer_class, 'selected_fields', None)
+        fields = selected_fields(self.request) if selected_fields else None
+        representation = (self.values_list_enabled
+                          and values_representation(serializer_class, fields))
+        if not representation:
+            page = self.paginate_queryset(queryset)
+            items = page if page is not None else queryset
+            data = serializer_class(items, many=True, context=self.get_serializer_context()).data
+        else:
+            lookups = dict.fromkeys(representation.lookups + self._ordering_lookups(queryset))
+            rows = queryset.values(*lookups)
+            page = self.paginate_queryset(rows)
+            data = representation.many(page if page is not None else rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def _ordering_lookups(self, queryset):
+        """Campos que la paginación por cursor lee de cada fila."""
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is None:
+            return ()
+        return tuple(field.lstrip('-') for field in get_ordering(self.request, queryset, self))
+
+
+class BulkCreateViewMixin:
+    """Mixin para ViewSets que añade la acción ``POST <recurso>/bulk/``.
+
+    Recibe una lista JSON de elementos y los crea con el serializer
+    ``bulk_serializer_class``, cuyo ``list_serializer_class`` debe heredar
+    de :class:`api_server.serializers.BulkCreateListSerializer`. Si algún
+    elemento no es válido no se crea ninguno y se responde ``400`` con una
+    lista de errores alineada con la recibida.
+
+    Attributes:
+        bulk_serializer_class: Serializer de cada elemento
+        bulk_batch_size: Filas por ``INSERT``; por defecto
+            ``BULK_CREATE_BATCH_SIZE``
+    """
+    bulk_serializer_class = None
+    bulk_batch_size = None
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Crea todos los elementos de la lista recibida.
+
+        Args:
+            request: Objeto de petición HTTP con una lista en el cuerpo
+
+        Returns:
+            Response con el número de elementos creados o los errores
+        """
+        context = dict(self.get_serializer_context(), batch_size=self.bulk_batch_size)
+        serializer = self.bulk_serializer_class(data=request.data, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+        instances = serializer.save()
+        return Response({'created': len(instances)}, status=status.HTTP_201_CREATED)
+
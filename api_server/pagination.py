@@ -0,0 +1,160 @@
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Paginación por cursor (keyset) para todos los listados de la API.
+
+    En lugar de ``OFFSET`` filtra por la posición del último elemento de
+    la página anterior, de modo que el coste de una página es constante sin
+    importar su profundidad, siempre que exista un índice sobre el orden
+    usado.
+
+    El orden se toma de ``Meta.ordering`` del modelo paginado (por ejemplo
+    ``-loan_date`` en ``Loan``) y se completa con ``id`` como desempate.
+    A diferencia de ``CursorPagination`` de DRF, que solo compara el
+    primer campo y resuelve los empates con un desplazamiento dentro del
+    cursor (lineal en el número de filas con el mismo valor), la posición
+    guarda todos los campos del orden y se compara como una fila:
+    ``loan_date <= x AND (loan_date < x OR id < y)``. Como ``id`` es único
+    no hay empates y los cursores nunca llevan desplazamiento. Si el modelo
+    no declara orden se pagina por ``id``. Los campos del orden no pueden
+    ser nulos.
+
+    Las vistas pueden ajustar el tamaño de página con el atributo
+    ``page_size`` y los clientes con el parámetro ``?page_size=``,
+    limitado por ``max_page_size``.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Devuelve la página que sigue a la posición del cursor.
+
+        Args:
+            queryset: QuerySet a paginar
+            request: Objeto de petición HTTP
+            view: Vista que solicita la paginación; su atributo
+                ``page_size`` sustituye al tamaño por defecto
+
+        Returns:
+            list: Elementos de la página, o ``None`` sin paginación
+
+        Raises:
+            NotFound: Si el cursor no es válido
+        """
+        view_page_size = getattr(view, 'page_size', None)
+        if view_page_size:
+            self.page_size = view_page_size
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._following(queryset.model, ordering, current_position)
+            )
+
+        # Un elemento de más indica si hay página siguiente
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Calcula el orden del cursor a partir del modelo paginado.
+
+        Args:
+            request: Objeto de petición HTTP
+            queryset: QuerySet que se va a paginar
+            view: Vista que solicita la paginación
+
+        Returns:
+            tuple: Campos de orden, terminados siempre en ``id``/``-id``
+        """
+        ordering = list(queryset.model._meta.ordering) or ['id']
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            descending = ordering[0].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return tuple(ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Posición de un elemento: los valores de todos los campos del orden."""
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            values = [instance[field] for field in fields]
+        else:
+            values = [getattr(instance, field) for field in fields]
+        return json.dumps([str(value) for value in values], separators=(',', ':'))
+
+    def _following(self, model, ordering, position):
+        """Condición de las filas que van después de ``position`` en ``ordering``.
+
+        Args:
+            model: Modelo paginado
+            ordering: Campos de orden de la consulta
+            position: Posición codificada por :meth:`_get_position_from_instance`
+
+        Returns:
+            Q: ``f1 <= v1 AND (f1 < v1 OR (f1 = v1 AND f2 < v2) ...)``
+            (con ``>`` en los campos ascendentes)
+
+        Raises:
+            NotFound: Si la posición no corresponde al orden
+        """
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError(position)
+            values = [
+                model._meta.get_field(order.lstrip('-')).to_python(value)
+                for order, value in zip(ordering, values)
+            ]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        def lookup(order, strict):
+            field = order.lstrip('-')
+            operator = 'lt' if order.startswith('-') else 'gt'
+            return f'{field}__{operator}' if strict else f'{field}__{operator}e'
+
+        condition = Q(**{lookup(ordering[-1], True): values[-1]})
+        for order, value in zip(ordering[-2::-1], values[-2::-1]):
+            condition = Q(**{lookup(order, True): value}) | (
+                Q(**{order.lstrip('-'): value}) & condition
+            )
+        # El rango sobre el primer campo permite recorrer su índice
+        return Q(**{lookup(ordering[0], False): values[0]}) & condition
+
+
+def _reverse_ordering(ordering):
+    """Invierte la dirección de cada campo de un orden."""
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
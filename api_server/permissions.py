@@ -1,5 +1,83 @@
+import threading
+import time
+from django.conf import settings
 from rest_framework import permissions
 
+
+def _default_ttl():
+    """Segundos que se reutiliza el conjunto de emails de bibliotecarios."""
+    return getattr(settings, 'BIBLIOTECARY_CACHE_TTL', 60)
+
+
+class BibliotecaryEmailCache:
+    """Caché de proceso con los emails de todos los bibliotecarios.
+
+    Evita consultar la tabla de bibliotecarios en cada comprobación de
+    permisos: el conjunto se carga con una sola consulta y se reutiliza
+    durante ``ttl`` segundos. Por defecto es ``BIBLIOTECARY_CACHE_TTL``,
+    que se lee en cada recarga y no al importar el módulo. Las señales de
+    ``Bibliotecary`` lo vacían al guardar o borrar (ver
+    :mod:`viewset_bibliotecary.signals`).
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._emails = None
+        self._expires_at = 0.0
+
+    @property
+    def ttl(self):
+        """Segundos de validez del conjunto cargado."""
+        return _default_ttl() if self._ttl is None else self._ttl
+
+    def emails(self):
+        """Retorna el conjunto de emails, recargándolo si ha caducado.
+
+        Returns:
+            frozenset: Emails de todos los bibliotecarios
+        """
+        with self._lock:
+            if self._emails is None or time.monotonic() >= self._expires_at:
+                from viewset_bibliotecary.models import Bibliotecary
+                self._emails = frozenset(
+                    Bibliotecary.objects.values_list('email', flat=True)
+                )
+                self._expires_at = time.monotonic() + self.ttl
+            return self._emails
+
+    def clear(self):
+        """Descarta el conjunto para que se recargue en la próxima consulta."""
+        with self._lock:
+            self._emails = None
+
+
+bibliotecary_emails = BibliotecaryEmailCache()
+
+
+def is_bibliotecary(request):
+    """Indica si el usuario de la petición es un bibliotecario.
+
+    El resultado se memoriza en la propia petición, de modo que las
+    comprobaciones de ``has_permission`` y de cada objeto en
+    ``has_object_permission`` no repiten el trabajo.
+
+    Args:
+        request: Objeto de petición HTTP
+
+    Returns:
+        bool: True si el email del usuario pertenece a un bibliotecario
+    """
+    if not (hasattr(request, 'user') and request.user.is_authenticated):
+        return False
+    email = request.user.email
+    memo = getattr(request, '_bibliotecary_memo', None)
+    if memo is None or memo[0] != email:
+        memo = (email, email in bibliotecary_emails.emails())
+        request._bibliotecary_memo = memo
+    return memo[1]
+
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
     Bibliotecarios (admins): pueden hacer todo
@@ -11,21 +89,14 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             return True
         
         # Verificar si es bibliotecario para escritura
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            from viewset_bibliotecary.models import Bibliotecary
-            return Bibliotecary.objects.filter(email=request.user.email).exists()
-        
-        return False
+        return is_bibliotecary(request)
 
 class IsBibliotecary(permissions.BasePermission):
     """
     Solo bibliotecarios pueden acceder
     """
     def has_permission(self, request, view):
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            from viewset_bibliotecary.models import Bibliotecary
-            return Bibliotecary.objects.filter(email=request.user.email).exists()
-        return False
+        return is_bibliotecary(request)
 
 class IsOwnerOrBibliotecary(permissions.BasePermission):
     """
@@ -48,11 +119,8 @@ class IsOwnerOrBibliotecary(permissions.BasePermission):
             return True
         
         if hasattr(request, 'user') and request.user.is_authenticated:
-            from viewset_bibliotecary.models import Bibliotecary
-            from viewset_users.models import User
-            
             # Si es bibliotecario, puede hacer todo
-            if Bibliotecary.objects.filter(email=request.user.email).exists():
+            if is_bibliotecary(request):
                 return True
             
             # Si es usuario, solo sus propios datos
@@ -0,0 +1,93 @@
+"""Renderer y parser JSON de la API basados en ``orjson``.
+
+``orjson`` codifica en C los tipos que más aparecen en las respuestas
+(``dict``, ``list``, cadenas, números, ``datetime``, ``date`` y ``UUID``),
+varias veces más rápido que el módulo ``json`` de la biblioteca estándar.
+La salida es la misma que la de ``JSONRenderer`` de DRF con los ajustes por
+defecto (compacta, UTF-8 sin escapar, fechas ISO 8601 con ``Z`` en UTC y
+``\\u2028``/``\\u2029`` escapados). El resto de tipos (``Decimal``,
+``timedelta``, querysets, textos traducibles...) pasan por el codificador
+de DRF.
+
+Si ``orjson`` no está instalado, o en los casos que no admite (sangrado
+``; indent=N``, enteros de más de 64 bits, claves que no son cadenas,
+ajustes ``UNICODE_JSON``/``COMPACT_JSON``/``STRICT_JSON`` distintos de los
+por defecto), se usa la implementación de DRF, de modo que el resultado no
+depende de que el paquete esté disponible.
+
+La única diferencia conocida: ``orjson`` escribe ``NaN`` e ``Infinity``
+como ``null`` en lugar de fallar como ``json`` con ``STRICT_JSON``.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+#: Separadores de línea que DRF escapa para que el JSON sea JavaScript válido
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+#: Codificaciones que ``orjson.loads`` puede leer directamente
+_UTF8 = ('utf-8', 'utf8')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` que codifica con ``orjson`` cuando es posible."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Codifica ``data`` como JSON en bytes.
+
+        Args:
+            data: Datos de la respuesta
+            accepted_media_type: Tipo aceptado, con ``indent`` opcional
+            renderer_context: Contexto de DRF
+
+        Returns:
+            bytes: El documento JSON
+        """
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in _LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """``JSONParser`` que decodifica con ``orjson`` los cuerpos en UTF-8."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Decodifica el cuerpo JSON de la petición.
+
+        Args:
+            stream: Cuerpo de la petición
+            media_type: Tipo del contenido
+            parser_context: Contexto de DRF, con la codificación
+
+        Returns:
+            Los datos decodificados
+
+        Raises:
+            ParseError: Si el cuerpo no es JSON válido
+        """
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower() not in _UTF8:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,534 @@
+import unicodedata
+from functools import lru_cache
+from operator import itemgetter
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+class EagerLoadingMixin:
+    """Mixin para serializers que declaran cómo cargar sus relaciones.
+
+    Los serializers que leen campos de modelos relacionados (por ejemplo
+    ``source='book.title'``) provocan una consulta adicional por fila si el
+    queryset no carga esas relaciones de antemano. Con este mixin el
+    serializer declara qué relaciones necesita y las vistas lo aplican
+    automáticamente sobre su queryset.
+
+    Attributes:
+        select_related_fields: Relaciones ``ForeignKey`` a cargar con JOIN
+        prefetch_related_fields: Relaciones inversas o ``ManyToMany`` a
+            cargar con una consulta adicional por relación
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        """Prepara un queryset para ser serializado con este serializer.
+
+        Args:
+            queryset: QuerySet del modelo del serializer
+            request: Petición HTTP actual, para serializers cuya carga
+                depende de parámetros de la URL
+
+        Returns:
+            QuerySet: El queryset con las relaciones necesarias cargadas
+        """
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+
+#: Métodos HTTP en los que se aplican ``?fields=`` y ``?exclude=``
+SPARSE_FIELDS_METHODS = ('GET', 'HEAD')
+
+
+def _query_names(request, param):
+    """Nombres separados por comas de un parámetro de la URL, o None."""
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return [name for name in (part.strip() for part in value.split(',')) if name]
+
+
+class SparseFieldsMixin(EagerLoadingMixin):
+    """Mixin para serializers que admiten ``?fields=`` y ``?exclude=``.
+
+    ``?fields=id,title`` limita la salida a esos campos y ``?exclude=``
+    quita los indicados; los nombres desconocidos responden ``400``. Solo
+    se aplica en peticiones de lectura: las escrituras validan y devuelven
+    siempre el serializer completo.
+
+    La selección también recorta la consulta: ``setup_eager_loading``
+    solo carga las relaciones de ``select_related_fields`` y
+    ``prefetch_related_fields`` que usan los campos elegidos y, si todos
+    ellos leen columnas del modelo (o de relaciones hacia delante), limita
+    las columnas con ``only()``. Las columnas del orden del modelo se
+    cargan siempre porque la paginación por cursor las lee de cada objeto.
+    """
+
+    @classmethod
+    def readable_sources(cls):
+        """``source`` de cada campo de salida, en el orden del serializer.
+
+        Returns:
+            dict: ``{nombre: source}``
+        """
+        return _readable_sources(cls)
+
+    @classmethod
+    def selected_fields(cls, request):
+        """Campos pedidos con ``?fields=``/``?exclude=``.
+
+        Args:
+            request: Petición HTTP actual o None
+
+        Returns:
+            tuple: Nombres de los campos a incluir, en el orden del
+            serializer, o None si no hay selección
+
+        Raises:
+            ValidationError: Si se piden campos que el serializer no tiene
+        """
+        if request is None or request.method not in SPARSE_FIELDS_METHODS:
+            return None
+        fields = _query_names(request, 'fields')
+        exclude = _query_names(request, 'exclude')
+        if not fields and not exclude:
+            return None
+        available = cls.readable_sources()
+        for param, names in (('fields', fields), ('exclude', exclude)):
+            unknown = [name for name in names or () if name not in available]
+            if unknown:
+                raise serializers.ValidationError(
+                    {param: f"Campos desconocidos: {', '.join(unknown)}."}
+                )
+        return tuple(
+            name for name in available
+            if (not fields or name in fields) and name not in (exclude or ())
+        )
+
+    def __init__(self, *args, **kwargs):
+        """Quita los campos que no se han pedido."""
+        super().__init__(*args, **kwargs)
+        selected = self.selected_fields(self.context.get('request'))
+        if selected is not None:
+            for name in list(self.readable_sources()):
+                if name not in selected:
+                    self.fields.pop(name, None)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        """Prepara un queryset cargando solo lo que usan los campos pedidos.
+
+        Args:
+            queryset: QuerySet del modelo del serializer
+            request: Petición HTTP actual, con ``?fields=``/``?exclude=``
+
+        Returns:
+            QuerySet: El queryset con las relaciones y columnas necesarias
+        """
+        selected = cls.selected_fields(request)
+        if selected is None:
+            return super().setup_eager_loading(queryset, request)
+        sources = [cls.readable_sources()[name] for name in selected]
+        lookups = [_only_lookup(queryset.model, source) for source in sources]
+        if None in lookups:
+            # Algún campo lee una propiedad o una relación inversa: se
+            # cargan todas las columnas y relaciones declaradas
+            return super().setup_eager_loading(queryset, request)
+
+        def used(relation):
+            return any(lookup == relation or lookup.startswith(relation + '__')
+                       for lookup in lookups)
+
+        select_related = [r for r in cls.select_related_fields if used(r)]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        prefetch_related = [r for r in cls.prefetch_related_fields if used(r)]
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        ordering = [
+            field.lstrip('-') for field in queryset.model._meta.ordering
+            if isinstance(field, str)
+        ]
+        return queryset.only(*dict.fromkeys(lookups + ordering))
+
+
+@lru_cache(maxsize=None)
+def _readable_sources(serializer_class):
+    """Campos de salida de un serializer y su ``source`` (ver SparseFieldsMixin).
+
+    Se leen de ``get_fields()`` y no de ``fields`` para incluir también los
+    campos que el ``__init__`` del serializer quita según otros parámetros.
+    """
+    return {
+        name: field.source or name
+        for name, field in serializer_class(context={}).get_fields().items()
+        if not field.write_only
+    }
+
+
+def _only_lookup(model, source):
+    """Lookup de ``only()`` que carga la columna de un ``source`` de DRF.
+
+    Returns:
+        str: El lookup (``book__title``), o None si el ``source`` no es un
+        campo concreto alcanzable por relaciones hacia delante
+    """
+    if source == '*':
+        return None
+    *relations, name = source.split('.')
+    for relation in relations:
+        try:
+            field = model._meta.get_field(relation)
+        except FieldDoesNotExist:
+            return None
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return None
+        model = field.related_model
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not field.concrete or field.many_to_many:
+        return None
+    return source.replace('.', '__')
+
+
+def in_chunks(values, connection=None, params_per_value=1):
+    """Divide valores en grupos que caben en un filtro ``__in``.
+
+    MySQL admite listas de cualquier tamaño y devuelve un único grupo;
+    SQLite limita el número de parámetros por consulta.
+
+    Args:
+        values: Valores a filtrar
+        connection: Conexión de base de datos; por defecto la principal
+        params_per_value: Parámetros que la consulta usa por cada valor
+            (por ejemplo si también aparece en un ``CASE``)
+
+    Yields:
+        list: Grupos consecutivos de valores
+    """
+    values = list(values)
+    size = (connection or connections[DEFAULT_DB_ALIAS]).features.max_query_params
+    size = size // params_per_value if size else len(values) or 1
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def comparison_key(value, connection=None):
+    """Clave con la que la base de datos compara un valor.
+
+    La collation por defecto de MySQL (``utf8mb4_0900_ai_ci``) no distingue
+    mayúsculas ni tildes: ``name__in=['borges']`` encuentra ``Borges`` y la
+    restricción ``UNIQUE`` los considera iguales. En ese motor las cadenas
+    se comparan sin mayúsculas (``casefold()``) ni marcas diacríticas; en
+    los demás, y para valores que no son cadenas, la clave es el valor.
+
+    Args:
+        value: Valor a comparar
+        connection: Conexión de base de datos; por defecto la principal
+
+    Returns:
+        La clave de comparación
+    """
+    if not isinstance(value, str):
+        return value
+    if (connection or connections[DEFAULT_DB_ALIAS]).vendor != 'mysql':
+        return value
+    decomposed = unicodedata.normalize('NFKD', value.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def existing_values(model, field, values):
+    """Valores de un campo que ya existen en la tabla de un modelo.
+
+    Args:
+        model: Modelo a consultar
+        field: Nombre del campo
+        values: Valores candidatos
+
+    Returns:
+        set: Claves (ver :func:`comparison_key`) de los valores de
+        ``values`` presentes en la base de datos
+    """
+    existing = set()
+    for chunk in in_chunks(set(values)):
+        existing.update(
+            comparison_key(value) for value in
+            model.objects.filter(**{f'{field}__in': chunk}).values_list(field, flat=True)
+        )
+    return existing
+
+
+def duplicate_errors(items, field, existing, message):
+    """Errores de unicidad de un campo dentro del lote y frente a la BD.
+
+    Args:
+        items: Datos validados de cada elemento
+        field: Campo que debe ser único
+        existing: Claves de los valores del campo que ya existen en la base
+            de datos (ver :func:`existing_values`)
+        message: Mensaje de error
+
+    Returns:
+        dict: Errores por índice del elemento
+    """
+    errors = {}
+    seen = set()
+    for index, item in enumerate(items):
+        value = comparison_key(item[field])
+        if value in existing or value in seen:
+            errors.setdefault(index, {})[field] = [message]
+        seen.add(value)
+    return errors
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """``ListSerializer`` para altas masivas con ``bulk_create``.
+
+    La validación de cada elemento no debe consultar la base de datos: las
+    comprobaciones que sí la necesitan (unicidad, existencia de claves
+    ajenas) se hacen para todo el lote en :meth:`validate_items` con unas
+    pocas consultas, y sus errores se devuelven por elemento, alineados
+    con la lista recibida como hace DRF.
+
+    Las subclases implementan :meth:`build_instances` y, si tienen efectos
+    que las señales no cubren (``bulk_create`` no las emite),
+    :meth:`after_create`.
+
+    Attributes:
+        batch_size: Filas por ``INSERT``; por defecto
+            ``BULK_CREATE_BATCH_SIZE`` (1000), leído en cada alta. Se puede
+            sobrescribir desde el contexto del serializer con la clave
+            ``batch_size``
+    """
+    batch_size = None
+
+    def get_batch_size(self):
+        """Tamaño de lote del contexto, de la clase o de la configuración."""
+        return (
+            self.context.get('batch_size')
+            or self.batch_size
+            or getattr(settings, 'BULK_CREATE_BATCH_SIZE', 1000)
+        )
+
+    def to_internal_value(self, data):
+        """Valida cada elemento y después las reglas que afectan al lote.
+
+        Raises:
+            ValidationError: Lista de errores por elemento (vacíos los
+                elementos válidos)
+        """
+        items = super().to_internal_value(data)
+        errors = self.validate_items(items)
+        if errors:
+            raise serializers.ValidationError([errors.get(i, {}) for i in range(len(items))])
+        return items
+
+    def validate_items(self, items):
+        """Comprobaciones que requieren ver todo el lote o la base de datos.
+
+        Args:
+            items: Datos validados de cada elemento
+
+        Returns:
+            dict: Errores por índice del elemento, ``{i: {campo: [...]}}``
+        """
+        return {}
+
+    def build_instances(self, items):
+        """Construye las instancias (sin guardar) a partir de los datos.
+
+        Args:
+            items: Datos validados de cada elemento
+
+        Returns:
+            list: Instancias del modelo
+        """
+        raise NotImplementedError('build_instances() debe implementarse')
+
+    def after_create(self, instances):
+        """Actualiza lo que mantendrían las señales de un alta individual.
+
+        Args:
+            instances: Instancias insertadas
+        """
+
+    def create(self, validated_data):
+        """Inserta todas las instancias por lotes en una transacción.
+
+        Args:
+            validated_data: Datos validados de cada elemento
+
+        Returns:
+            list: Instancias creadas
+        """
+        model = self.child.Meta.model
+        with transaction.atomic():
+            instances = model.objects.bulk_create(
+                self.build_instances(validated_data), batch_size=self.get_batch_size()
+            )
+            self.after_create(instances)
+        return instances
+
+
+#: Campos de DRF que no se pueden calcular a partir de una fila de ``values()``
+UNSUPPORTED_FIELDS = (
+    serializers.BaseSerializer, RelatedField, ManyRelatedField,
+    serializers.SerializerMethodField, serializers.HiddenField,
+    serializers.ModelField, serializers.FileField,
+)
+
+#: Pares (campo de DRF, campo de modelo) cuya representación es el propio
+#: valor que devuelve la base de datos
+PASSTHROUGH_FIELDS = (
+    (serializers.CharField, (models.CharField, models.TextField)),
+    (serializers.IntegerField, (models.IntegerField,)),
+    (serializers.BooleanField, (models.BooleanField,)),
+    (serializers.ReadOnlyField, (models.Field,)),
+)
+
+
+def _model_field(model, source):
+    """Campo de modelo al que apunta un ``source`` de DRF.
+
+    Solo se admiten cadenas de ``ForeignKey``/``OneToOneField`` hacia
+    delante terminadas en un campo concreto (``book.writer.name``).
+
+    Returns:
+        tuple: El campo del modelo y el lookup de la primera relación
+        nula del camino (o None), o ``(None, None)`` si el ``source`` pasa
+        por una propiedad, un método o una relación inversa
+    """
+    *relations, name = source.split('.')
+    nullable = None
+    for index, relation in enumerate(relations):
+        try:
+            field = model._meta.get_field(relation)
+        except FieldDoesNotExist:
+            return None, None
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return None, None
+        if field.null and nullable is None:
+            nullable = '__'.join(relations[:index + 1])
+        model = field.related_model
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None, None
+    if not field.concrete or field.is_relation:
+        return None, None
+    return field, nullable
+
+
+class ValuesRepresentation:
+    """Representación de solo lectura de un serializer sobre filas de ``values()``.
+
+    Produce los mismos diccionarios que ``serializer.data`` sin crear un
+    serializer ni recorrer los campos por fila: las claves y los
+    ``lookups`` se calculan una vez por serializer y cada fila se copia con
+    un ``itemgetter``. Solo los campos cuya representación no coincide con
+    el valor de la base de datos (fechas, por ejemplo) pasan por el
+    ``to_representation`` de su campo de DRF, y como en DRF los ``None``
+    se devuelven sin convertir y se omiten los campos que atraviesan una
+    relación nula (``bibliotecary.username`` sin bibliotecario) salvo que
+    admitan ``null``.
+
+    Attributes:
+        keys: Claves de salida, en el orden del serializer
+        lookups: Argumentos para ``QuerySet.values()``
+    """
+
+    def __init__(self, fields):
+        """Prepara la copia de las filas.
+
+        Args:
+            fields: Tuplas ``(clave, lookup, conversión o None, relación
+                que omite el campo si es nula o None)`` en el orden del
+                serializer
+        """
+        self.keys = tuple(field[0] for field in fields)
+        lookups = [field[1] for field in fields]
+        relations = [field[3] for field in fields if field[3] is not None]
+        self.lookups = tuple(dict.fromkeys(lookups + relations))
+        if len(lookups) > 1:
+            self._values = itemgetter(*lookups)
+        elif lookups:
+            getter = itemgetter(*lookups)
+            self._values = lambda row: (getter(row),)
+        else:
+            self._values = lambda row: ()
+        self._optional = tuple(
+            (key, relation) for key, _, _, relation in fields if relation is not None
+        )
+        self._converted = tuple(
+            (key, convert) for key, _, convert, _ in fields if convert is not None
+        )
+
+    def __call__(self, row):
+        """Representación de una fila de ``values(*self.lookups)``."""
+        data = dict(zip(self.keys, self._values(row)))
+        for key, relation in self._optional:
+            if row[relation] is None:
+                del data[key]
+        for key, convert in self._converted:
+            value = data.get(key)
+            if value is not None:
+                data[key] = convert(value)
+        return data
+
+    def many(self, rows):
+        """Representación de una lista de filas."""
+        return [self(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def values_representation(serializer_class, fields=None):
+    """Compila la representación rápida de un ``ModelSerializer``.
+
+    Args:
+        serializer_class: Clase del serializer
+        fields: Nombres de los campos a incluir (ver
+            :meth:`SparseFieldsMixin.selected_fields`); por defecto todos
+
+    Returns:
+        ValuesRepresentation: La representación, o None si el serializer
+        no se puede reproducir desde ``values()`` (campos anidados,
+        relacionados, calculados o ``to_representation`` propio)
+    """
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return None
+    if serializer_class.to_representation is not serializers.Serializer.to_representation:
+        return None
+    model = serializer_class.Meta.model
+    selected = fields
+    fields = []
+    for field in serializer_class().fields.values():
+        if field.write_only or selected is not None and field.field_name not in selected:
+            continue
+        if isinstance(field, UNSUPPORTED_FIELDS) or field.source == '*':
+            return None
+        model_field, nullable = _model_field(model, field.source)
+        if model_field is None:
+            return None
+        if nullable is not None:
+            if field.default is not empty or field.required and not field.allow_null:
+                return None
+            if field.allow_null:
+                nullable = None
+        passthrough = any(
+            isinstance(field, drf_class) and isinstance(model_field, model_classes)
+            for drf_class, model_classes in PASSTHROUGH_FIELDS
+        )
+        convert = None if passthrough else field.to_representation
+        fields.append((field.field_name, field.source.replace('.', '__'), convert, nullable))
+    return ValuesRepresentation(fields)
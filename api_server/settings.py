@@ -29,9 +29,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-&np3*_*$$%8&b&!4@b)y^!_f51%)s^9)uh%nwp#1mxt3(w6x5o'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# En producción: DJANGO_DEBUG=0 y DJANGO_ALLOWED_HOSTS=api.example.com,...
+DEBUG = os.getenv('DJANGO_DEBUG', '1').lower() not in ('0', 'false', 'no')
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.getenv('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -50,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que sus tiempos incluyan al resto de middlewares
+    'api_server.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,16 +85,51 @@ WSGI_APPLICATION = 'api_server.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': os.getenv('DB_NAME', 'tareadjango'),
-        'USER': os.getenv('DB_USER', 'root'),
-        'PASSWORD': os.getenv('DB_PASSWORD', 'Fg20180418'),
-        'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', '3306'),
+# Reutilización de conexiones:
+# - DB_CONN_MAX_AGE: segundos que se mantiene abierta la conexión de cada
+#   hilo entre peticiones (0 = una conexión por petición)
+# - DB_CONN_HEALTH_CHECKS: comprueba una conexión reutilizada antes de usarla
+# - DB_POOL_SIZE: si es mayor que 0 usa un pool de ese tamaño compartido por
+#   todos los hilos (recomendado con ASGI, donde las conexiones por hilo no
+#   están acotadas); DB_POOL_TIMEOUT y DB_POOL_MAX_LIFETIME en segundos
+# Con DB_ENGINE=sqlite se usa SQLite (DB_NAME o db.sqlite3) para pruebas
+# locales sin servidor MySQL.
+DB_ENGINE = os.getenv('DB_ENGINE', 'mysql')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '0'))
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'api_server.db.mysql' if DB_POOL_SIZE else 'django.db.backends.mysql',
+            'NAME': os.getenv('DB_NAME', 'tareadjango'),
+            'USER': os.getenv('DB_USER', 'root'),
+            'PASSWORD': os.getenv('DB_PASSWORD', 'Fg20180418'),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '3306'),
+            'OPTIONS': {},
+        }
+    }
+
+DATABASES['default'].update({
+    'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+    'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', '1') == '1',
+})
+
+if DB_ENGINE != 'sqlite' and DB_POOL_SIZE:
+    # Django devuelve la conexión al pool al terminar cada petición
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'max_size': DB_POOL_SIZE,
+        'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'max_lifetime': int(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
     }
-}
 
 
 # Password validation
@@ -117,8 +155,69 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [],
     'DEFAULT_PERMISSION_CLASSES': [],
+    'DEFAULT_PAGINATION_CLASS': 'api_server.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50,
+    # Filtros declarados en ``query_filters`` de cada vista (api_server.filters)
+    'DEFAULT_FILTER_BACKENDS': ['api_server.filters.IndexedFilterBackend'],
+    # JSON con orjson (si no está instalado, con el módulo json de DRF). La
+    # API navegable solo se ofrece en desarrollo: en producción cada
+    # petición sin Accept explícito pagaría la plantilla HTML.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api_server.renderers.ORJSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api_server.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Caché: en memoria local por defecto. Con REDIS_URL (por ejemplo
+# redis://localhost:6379/0) se usa Redis, compartido por todos los procesos
+# del servidor, que es lo necesario para que las escrituras de un proceso
+# invaliden las respuestas cacheadas en los demás (requiere el paquete redis).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'api-server',
+        }
+    }
+
+# Alias de CACHES y segundos de vida de la caché de respuestas de la API
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 300
+
+# Filas por INSERT en las altas masivas (POST /books/bulk/, etc.)
+BULK_CREATE_BATCH_SIZE = 1000
+
+# Filas por consulta en las exportaciones en streaming (/api/export/...)
+EXPORT_CHUNK_SIZE = 2000
+
+# Segundos que los permisos reutilizan la lista de emails de bibliotecarios
+BIBLIOTECARY_CACHE_TTL = 60
+
+# Peticiones por vista usadas para los percentiles de /metrics y si se
+# añade la cabecera Server-Timing a las respuestas
+METRICS_WINDOW = 1000
+METRICS_SERVER_TIMING = True
+
+# Las vistas asíncronas (/api/async/...) lanzan sus consultas independientes
+# en hilos separados, cada uno con su conexión (nunca en SQLite)
+ASYNC_CONCURRENT_QUERIES = True
+
+# Los filtros sin índice (?title__contains=...) se rechazan si no los
+# acompaña otro filtro indexado; True lo permite en tablas pequeñas
+FILTER_ALLOW_FULL_SCAN = False
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -0,0 +1,38 @@
+import threading
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from api_server import concurrency
+from api_server.concurrency import concurrent_queries_enabled, gather_queries
+
+
+class GatherQueriesTest(TestCase):
+    """Tests para la ejecución concurrente de consultas"""
+
+    def test_sqlite_en_secuencia(self):
+        """Test: En SQLite no se usan hilos del pool"""
+        self.assertFalse(concurrent_queries_enabled())
+        results = async_to_sync(gather_queries)(threading.get_ident, lambda: 2)
+        self.assertEqual(results, [threading.get_ident(), 2])
+
+    @override_settings(ASYNC_CONCURRENT_QUERIES=False)
+    def test_desactivado_por_ajuste(self):
+        """Test: ASYNC_CONCURRENT_QUERIES=False desactiva la concurrencia"""
+        with mock.patch.object(concurrency, 'connections') as connections:
+            connections.__getitem__.return_value.vendor = 'postgresql'
+            self.assertFalse(concurrent_queries_enabled())
+
+    def test_hilos_separados(self):
+        """Test: Con concurrencia cada función corre a la vez en otro hilo"""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def query(value):
+            # Solo pasa la barrera si las tres funciones se ejecutan a la vez
+            barrier.wait()
+            return value, threading.get_ident()
+
+        calls = [lambda value=value: query(value) for value in 'abc']
+        with mock.patch.object(concurrency, 'concurrent_queries_enabled', return_value=True):
+            results = async_to_sync(gather_queries)(*calls)
+        self.assertEqual([value for value, _ in results], ['a', 'b', 'c'])
+        self.assertNotIn(threading.get_ident(), {ident for _, ident in results})
@@ -0,0 +1,89 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from api_server.cache import get_cache
+from api_server.metrics import MetricsRegistry, percentile, prometheus_text, registry
+from viewset_books.models import Writer, Book
+
+
+class PercentileTest(TestCase):
+    """Tests para el cálculo de percentiles"""
+
+    def test_rango_mas_cercano(self):
+        """Test: Percentil por rango más cercano"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.9), 7)
+        self.assertEqual(percentile([], 0.5), 0)
+
+    @override_settings(METRICS_WINDOW=3)
+    def test_ventana_acotada(self):
+        """Test: Los percentiles usan solo las últimas peticiones"""
+        metrics = MetricsRegistry()
+        for duration in (10.0, 1.0, 1.0, 1.0):
+            metrics.record('v', duration, 1, 0.0, 0.0, 10)
+        data = metrics.snapshot()['v']
+        self.assertEqual(data['requests'], 4)
+        self.assertEqual(data['duration'], 13.0)
+        self.assertEqual(data['duration_quantiles'][0.99], 1.0)
+
+
+class MetricsMiddlewareTest(APITestCase):
+    """Tests para el middleware de métricas y la vista /metrics"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        get_cache().clear()
+        registry.reset()
+        writer = Writer.objects.create(name='Metrics W')
+        Book.objects.create(title='Metrics', writer=writer)
+
+    def test_server_timing(self):
+        """Test: Cada respuesta lleva sus consultas y tiempos"""
+        response = self.client.get('/books/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('render;dur=', header)
+        self.assertIn('total;dur=', header)
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_desactivado(self):
+        """Test: La cabecera puede desactivarse"""
+        response = self.client.get('/books/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_metricas_por_vista(self):
+        """Test: Se agregan por nombre de vista resuelta"""
+        self.client.get('/books/')
+        self.client.get('/books/')
+        self.client.get('/no-existe/')
+        views = registry.snapshot()
+        self.assertEqual(views['book-list']['requests'], 2)
+        self.assertGreater(views['book-list']['queries'], 0)
+        self.assertGreater(views['book-list']['render_time'], 0)
+        self.assertGreater(views['book-list']['response_bytes'], 0)
+        self.assertEqual(views['unresolved']['requests'], 1)
+
+    def test_formato_prometheus(self):
+        """Test: /metrics expone las series y los contadores de la caché"""
+        self.client.get('/books/')
+        self.client.get('/books/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE api_request_duration_seconds summary', text)
+        self.assertIn('api_request_duration_seconds_count{view="book-list"} 2', text)
+        self.assertIn('api_request_duration_seconds{view="book-list",quantile="0.99"}', text)
+        self.assertIn('api_db_queries_sum{view="book-list"}', text)
+        self.assertIn('api_cache_hits_total 1', text)
+        self.assertIn('api_cache_misses_total 1', text)
+
+    def test_escapado_de_etiquetas(self):
+        """Test: Las comillas de las etiquetas se escapan"""
+        metrics = MetricsRegistry()
+        metrics.record('a"b', 0.1, 0, 0.0, 0.0, None)
+        text = prometheus_text(metrics.snapshot(), {'hits': 0, 'misses': 0})
+        self.assertIn('api_response_bytes_total{view="a\\"b"} 0', text)
@@ -1,9 +1,11 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
 from rest_framework.test import APITestCase, APIClient, APIRequestFactory
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
 from api_server.permissions import IsAdminOrReadOnly, IsBibliotecary, IsOwnerOrBibliotecary
+from api_server.permissions import bibliotecary_emails
 from viewset_users.models import User
 from viewset_bibliotecary.models import Bibliotecary
 from viewset_books.models import Writer, Book, Loan
@@ -253,3 +255,81 @@ class PermissionIntegrationTest(APITestCase):
         }
         response = self.client.post('/books/', data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class BibliotecaryCacheTest(TestCase):
+    """Tests para la caché de bibliotecarios usada por los permisos"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.user = User.objects.create(
+            username='cache_user',
+            email='cache@example.com',
+            full_name='Cache User'
+        )
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='cache_admin',
+            email='cache_admin@example.com',
+            full_name='Cache Admin'
+        )
+        self.writer = Writer.objects.create(name='Cache Writer')
+        self.book = Book.objects.create(title='Cache Book', writer=self.writer)
+        self.loans = [
+            Loan.objects.create(book=self.book, user=self.user)
+            for _ in range(5)
+        ]
+        self.view = MockView()
+        bibliotecary_emails.clear()
+
+    def test_una_consulta_por_peticion(self):
+        """Test: Permiso global y de cada objeto cuestan una sola consulta"""
+        request = MockRequest(self.user, method='PUT')
+        with self.assertNumQueries(1):
+            IsAdminOrReadOnly().has_permission(request, self.view)
+            IsBibliotecary().has_permission(request, self.view)
+            for loan in self.loans:
+                IsOwnerOrBibliotecary().has_object_permission(request, self.view, loan)
+
+    def test_cache_compartida_entre_peticiones(self):
+        """Test: Peticiones posteriores reutilizan la caché de proceso"""
+        IsBibliotecary().has_permission(MockRequest(self.user, 'POST'), self.view)
+        with self.assertNumQueries(0):
+            self.assertTrue(IsBibliotecary().has_permission(
+                MockRequest(self.bibliotecary, 'POST'), self.view
+            ))
+
+    def test_alta_de_bibliotecario_invalida_cache(self):
+        """Test: Crear un bibliotecario vacía la caché"""
+        request = MockRequest(self.user, method='POST')
+        self.assertFalse(IsBibliotecary().has_permission(request, self.view))
+        Bibliotecary.objects.create(
+            username='cache_user',
+            email='cache@example.com',
+            full_name='Cache User'
+        )
+        request = MockRequest(self.user, method='POST')
+        self.assertTrue(IsBibliotecary().has_permission(request, self.view))
+
+    def test_baja_de_bibliotecario_invalida_cache(self):
+        """Test: Borrar un bibliotecario vacía la caché"""
+        request = MockRequest(self.bibliotecary, method='POST')
+        self.assertTrue(IsBibliotecary().has_permission(request, self.view))
+        self.bibliotecary.delete()
+        request = MockRequest(self.bibliotecary, method='POST')
+        self.assertFalse(IsBibliotecary().has_permission(request, self.view))
+
+    def test_cache_caduca(self):
+        """Test: La caché se recarga al expirar el TTL"""
+        IsBibliotecary().has_permission(MockRequest(self.user, 'POST'), self.view)
+        expired = bibliotecary_emails._expires_at + 1
+        with mock.patch('api_server.permissions.time.monotonic', return_value=expired):
+            with self.assertNumQueries(1):
+                IsBibliotecary().has_permission(MockRequest(self.user, 'POST'), self.view)
+
+    def test_ttl_se_lee_de_la_configuracion(self):
+        """Test: BIBLIOTECARY_CACHE_TTL se lee al recargar, no al importar"""
+        with override_settings(BIBLIOTECARY_CACHE_TTL=0):
+            self.assertEqual(bibliotecary_emails.ttl, 0)
+            IsBibliotecary().has_permission(MockRequest(self.user, 'POST'), self.view)
+            with self.assertNumQueries(1):
+                IsBibliotecary().has_permission(MockRequest(self.user, 'POST'), self.view)
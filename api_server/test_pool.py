@@ -0,0 +1,101 @@
+import threading
+from unittest import mock
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+from api_server.db.pool import ConnectionPool
+
+
+class FakeConnection:
+    """Conexión DB-API falsa que registra las llamadas"""
+
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def ping(self):
+        if not self.alive:
+            raise OSError('conexión perdida')
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Tests para el pool de conexiones acotado"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.created = []
+        self.pool = ConnectionPool(self._connect, max_size=2, timeout=0.05, ping_after=0)
+
+    def _connect(self):
+        connection = FakeConnection()
+        self.created.append(connection)
+        return connection
+
+    def test_reutiliza_conexiones(self):
+        """Test: Una conexión devuelta se reutiliza sin abrir otra"""
+        first = self.pool.acquire()
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(), first)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(first.rollbacks, 1)
+
+    def test_tamano_maximo(self):
+        """Test: Con todas las conexiones en uso se espera y luego falla"""
+        self.pool.acquire()
+        second = self.pool.acquire()
+        with self.assertRaises(OperationalError):
+            self.pool.acquire()
+        self.pool.release(second)
+        self.assertIs(self.pool.acquire(), second)
+
+    def test_espera_una_conexion_libre(self):
+        """Test: Un hilo obtiene la conexión que otro devuelve"""
+        pool = ConnectionPool(self._connect, max_size=1, timeout=5)
+        connection = pool.acquire()
+        result = []
+        thread = threading.Thread(target=lambda: result.append(pool.acquire()))
+        thread.start()
+        pool.release(connection)
+        thread.join()
+        self.assertEqual(result, [connection])
+
+    def test_descarta_conexiones_caidas(self):
+        """Test: Una conexión que no responde al ping se sustituye"""
+        first = self.pool.acquire()
+        self.pool.release(first)
+        first.alive = False
+        second = self.pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+
+    def test_descarta_tras_errores(self):
+        """Test: release(discard=True) cierra la conexión y libera su hueco"""
+        first = self.pool.acquire()
+        self.pool.release(first, discard=True)
+        self.assertTrue(first.closed)
+        self.assertEqual(self.pool.idle, 0)
+        self.pool.acquire()
+        self.pool.acquire()
+
+    def test_renueva_conexiones_antiguas(self):
+        """Test: Las conexiones que superan max_lifetime se renuevan"""
+        pool = ConnectionPool(self._connect, max_size=1, max_lifetime=60)
+        first = pool.acquire()
+        pool.release(first)
+        with mock.patch('api_server.db.pool.time.monotonic', return_value=10 ** 9):
+            second = pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+
+    def test_error_al_conectar_libera_el_hueco(self):
+        """Test: Si conectar falla no se pierde capacidad del pool"""
+        pool = ConnectionPool(mock.Mock(side_effect=OSError), max_size=1, timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                pool.acquire()
@@ -0,0 +1,97 @@
+import datetime
+import decimal
+import io
+import uuid
+from unittest import mock
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from api_server.renderers import ORJSONParser, ORJSONRenderer
+from viewset_books.models import Writer, Book, Loan
+from viewset_users.models import User
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    """Tests: ORJSONRenderer produce los mismos bytes que JSONRenderer"""
+
+    def assertSameBytes(self, data, accepted_media_type=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_tipos_habituales(self):
+        """Test: Fechas, nulos, unicode y tipos que resuelve el codificador de DRF"""
+        now = timezone.now()
+        self.assertSameBytes({
+            'id': 1, 'title': 'Cien años de soledad', 'active': True, 'none': None,
+            'loan_date': now, 'naive': now.replace(tzinfo=None), 'day': now.date(),
+            'price': decimal.Decimal('9.50'), 'delay': datetime.timedelta(days=1),
+            'uuid': uuid.UUID(int=1), 'nested': [{'a': 1.5}],
+            'separators': 'a b c',
+        })
+
+    def test_casos_no_admitidos_usan_json(self):
+        """Test: Sangrado, enteros enormes y claves no textuales caen a json"""
+        self.assertSameBytes({'a': [1, 2]}, 'application/json; indent=4')
+        self.assertSameBytes({'big': 2 ** 70})
+        self.assertSameBytes({1: 'uno'})
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_sin_orjson(self):
+        """Test: Sin el paquete orjson se usa la implementación de DRF"""
+        with mock.patch('api_server.renderers.orjson', None):
+            self.assertSameBytes({'loan_date': timezone.now()})
+
+
+class ORJSONParserTest(SimpleTestCase):
+    """Tests para ORJSONParser"""
+
+    def test_decodifica_json(self):
+        """Test: Mismo resultado que JSONParser"""
+        body = '{"title": "Ñandú", "ids": [1, 2], "ok": true}'.encode()
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_json_invalido(self):
+        """Test: Un cuerpo inválido produce ParseError (400)"""
+        for body in (b'{"title": ', b'{"n": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+    def test_otras_codificaciones(self):
+        """Test: Los cuerpos que no son UTF-8 se decodifican con json"""
+        body = '{"title": "Ñandú"}'.encode('latin-1')
+        data = ORJSONParser().parse(io.BytesIO(body), parser_context={'encoding': 'latin-1'})
+        self.assertEqual(data, {'title': 'Ñandú'})
+
+
+class ORJSONApiTest(APITestCase):
+    """Tests: la API responde y recibe JSON con orjson"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        writer = Writer.objects.create(name='Orjson W')
+        self.book = Book.objects.create(title='Orjson', writer=writer)
+        self.user = User.objects.create(
+            username='orjson_reader', email='orjson@example.com', full_name='Orjson Reader'
+        )
+        Loan.objects.create(book=self.book, user=self.user)
+
+    def test_listado_igual_que_json(self):
+        """Test: GET /loans/ devuelve los mismos bytes que JSONRenderer"""
+        response = self.client.get('/loans/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_alta_con_cuerpo_json(self):
+        """Test: POST /loans/ con JSON se decodifica con ORJSONParser"""
+        response = self.client.post(
+            '/loans/', {'book_id': self.book.id, 'user_id': self.user.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()['loan_date'].endswith('Z'))
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, TestCase
+from rest_framework import serializers
+from api_server.serializers import comparison_key, duplicate_errors, values_representation
+from viewset_books.models import Writer, Book, Loan
+from viewset_books.serializer import BookSerializer, LoanSerializer, WriterSerializer
+from viewset_users.models import User
+from viewset_users.serializer import UserSerializer
+from viewset_bibliotecary.models import Bibliotecary
+from viewset_bibliotecary.serializer import BibliotecarySerializer
+
+
+class ValuesRepresentationTest(TestCase):
+    """Tests: la representación desde values() coincide con los serializers"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        writer = Writer.objects.create(name='Values W')
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='values_librarian', email='vl@example.com', full_name='Values Librarian'
+        )
+        for i in range(3):
+            book = Book.objects.create(title=f'Values {i}', writer=writer)
+            user = User.objects.create(
+                username=f'values{i}', email=f'values{i}@example.com', full_name=f'Values {i}'
+            )
+            Loan.objects.create(
+                book=book, user=user, bibliotecary=self.bibliotecary if i else None
+            )
+        loan = Loan.objects.order_by('id').first()
+        loan.is_active = False
+        loan.return_date = loan.loan_date
+        loan.save()
+
+    def assertSameOutput(self, serializer_class):
+        representation = values_representation(serializer_class)
+        self.assertIsNotNone(representation)
+        queryset = serializer_class.Meta.model.objects.order_by('id')
+        expected = serializer_class(queryset, many=True).data
+        self.assertEqual(representation.many(queryset.values(*representation.lookups)), expected)
+        self.assertEqual(
+            [list(item) for item in representation.many(queryset.values(*representation.lookups))],
+            [list(item) for item in expected],
+        )
+
+    def test_mismos_datos_que_los_serializers(self):
+        """Test: Misma salida y mismo orden de claves que serializer.data"""
+        for serializer_class in (BookSerializer, LoanSerializer, UserSerializer,
+                                 BibliotecarySerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertSameOutput(serializer_class)
+
+    def test_fechas_y_nulos(self):
+        """Test: Fechas con el formato de DRF; sin bibliotecario se omite su nombre"""
+        representation = values_representation(LoanSerializer)
+        rows = Loan.objects.order_by('id').values(*representation.lookups)
+        first, second = representation.many(rows)[:2]
+        self.assertNotIn('bibliotecary_name', first)
+        self.assertEqual(second['bibliotecary_name'], 'values_librarian')
+        self.assertTrue(first['return_date'].endswith('Z'))
+        self.assertIsNone(second['return_date'])
+        self.assertNotIn('book_id', first)
+
+    def test_serializers_no_reproducibles(self):
+        """Test: Serializers anidados o calculados no tienen modo rápido"""
+        class MethodSerializer(serializers.ModelSerializer):
+            upper = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Book
+                fields = ['id', 'upper']
+
+            def get_upper(self, book):
+                return book.title.upper()
+
+        self.assertIsNone(values_representation(WriterSerializer))
+        self.assertIsNone(values_representation(MethodSerializer))
+
+
+class ComparisonKeyTest(SimpleTestCase):
+    """Tests: los valores se comparan como en la collation del motor"""
+
+    def test_mysql_ignora_mayusculas_y_tildes(self):
+        """Test: En MySQL 'borges' y 'García' equivalen a 'Borges' y 'garcia'"""
+        mysql = SimpleNamespace(vendor='mysql')
+        self.assertEqual(comparison_key('borges', mysql), comparison_key('Borges', mysql))
+        self.assertEqual(comparison_key('García', mysql), comparison_key('GARCIA', mysql))
+        self.assertEqual(comparison_key(7, mysql), 7)
+
+    def test_otros_motores_distinguen(self):
+        """Test: En SQLite la clave es el propio valor"""
+        sqlite = SimpleNamespace(vendor='sqlite')
+        self.assertEqual(comparison_key('Borges', sqlite), 'Borges')
+
+    def test_duplicados_con_la_collation_del_motor(self):
+        """Test: duplicate_errors detecta repetidos que solo difieren en mayúsculas"""
+        items = [{'title': 'Ficciones'}, {'title': 'FICCIONES'}, {'title': 'El Aleph'}]
+        with patch.object(connections[DEFAULT_DB_ALIAS], 'vendor', 'mysql'):
+            errors = duplicate_errors(items, 'title', {comparison_key('el aleph')}, 'Repetido')
+        self.assertEqual(set(errors), {1, 2})
@@ -16,9 +16,12 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from api_server.views import response_cache_statistics, metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/cache/statistics/', response_cache_statistics, name='cache-statistics'),
+    path('metrics', metrics, name='metrics'),
     path('', include('viewset_users.urls')),
     path('', include('viewset_books.urls')),
     path('', include('viewset_bibliotecary.urls')),
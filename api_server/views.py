@@ -0,0 +1,41 @@
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from api_server.cache import cache_statistics
+from api_server.metrics import prometheus_text, registry
+
+#: Tipo de contenido del formato de texto de Prometheus
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@api_view(['GET'])
+def response_cache_statistics(request):
+    """Vista con los contadores de aciertos y fallos de la caché de respuestas.
+
+    Args:
+        request: Objeto de petición HTTP
+
+    Returns:
+        Response con ``hits``, ``misses`` y ``hit_ratio``
+    """
+    return Response(cache_statistics())
+
+
+@require_GET
+def metrics(request):
+    """Métricas por vista y de la caché en formato de texto de Prometheus.
+
+    Es una vista de Django, sin negociación de contenido de DRF, para que
+    Prometheus reciba siempre el formato de texto.
+
+    Args:
+        request: Objeto de petición HTTP
+
+    Returns:
+        HttpResponse con las métricas del proceso
+    """
+    return HttpResponse(
+        prometheus_text(registry.snapshot(), cache_statistics()),
+        content_type=PROMETHEUS_CONTENT_TYPE,
+    )
@@ -0,0 +1,5 @@
+"""Benchmarks de rendimiento del proyecto.
+
+Cada módulo se ejecuta con ``python -m benchmarks.<nombre>`` desde la raíz
+del repositorio y muestra sus resultados por la salida estándar.
+"""
@@ -0,0 +1,310 @@
+"""Benchmark de los endpoints más usados de la API sobre SQLite.
+
+Crea una base de datos SQLite con el volumen de préstamos indicado
+(insertado con ``bulk_create``), ejecuta cada endpoint con el cliente de
+pruebas de Django y mide por endpoint los percentiles de latencia, el
+número de consultas SQL y el pico de memoria asignada durante una
+petición. Los resultados pueden guardarse como referencia y compararse
+con ella en ejecuciones posteriores: si alguna métrica empeora más de lo
+tolerado el proceso termina con código 1.
+
+Uso::
+
+    python -m benchmarks.bench_api --scale 100k
+    python -m benchmarks.bench_api --scale 1k --save-baseline benchmarks/baselines/api-1k.json
+    python -m benchmarks.bench_api --scale 1k --baseline benchmarks/baselines/api-1k.json
+
+Las latencias dependen de la máquina: la referencia guardada en el
+repositorio sirve sobre todo para las consultas, que son deterministas;
+para comparar tiempos genere la referencia en la misma máquina.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+#: Préstamos creados en cada escala predefinida
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+#: Filas por INSERT al poblar la base de datos
+SEED_BATCH_SIZE = 5000
+
+#: Métricas que pueden empeorar hasta ``--tolerance`` respecto a la referencia
+COMPARED = ('p50_ms', 'peak_kb')
+
+
+def setup_django(db_path):
+    """Configura Django con la base de datos SQLite del benchmark.
+
+    Args:
+        db_path: Ruta del fichero SQLite (se crea si no existe)
+    """
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_server.settings')
+    from django.conf import settings
+    settings.DATABASES = {
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': db_path},
+    }
+    settings.DEBUG = False
+    import django
+    django.setup()
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0, interactive=False)
+
+
+def seed(loans, seed_value=0):
+    """Puebla la base de datos con ``loans`` préstamos y su catálogo.
+
+    Crea un usuario cada 10 préstamos, un libro cada 20, un escritor cada
+    10 libros y 10 bibliotecarios. Un 20 % de los préstamos está activo y
+    las fechas se reparten en los dos últimos años. Al final recalcula los
+    contadores y la instantánea de estadísticas, como ``fastload``.
+
+    Args:
+        loans: Número de préstamos
+        seed_value: Semilla del generador aleatorio
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from viewset_books import counters, statistics
+    from viewset_books.management.commands.fastload import preserve_auto_dates
+    from viewset_books.models import Writer, Book, Loan
+    from viewset_users.models import User
+    from viewset_bibliotecary.models import Bibliotecary
+
+    rng = random.Random(seed_value)
+    n_users = max(1, loans // 10)
+    n_books = max(1, loans // 20)
+    n_writers = max(1, n_books // 10)
+    now = timezone.now()
+
+    def insert(model, rows):
+        for start in range(0, len(rows), SEED_BATCH_SIZE):
+            model.objects.bulk_create(rows[start:start + SEED_BATCH_SIZE])
+
+    with transaction.atomic():
+        insert(Writer, [Writer(id=i, name=f'Escritor {i}') for i in range(1, n_writers + 1)])
+        insert(Book, [
+            Book(id=i, title=f'Libro {i}', writer_id=rng.randint(1, n_writers))
+            for i in range(1, n_books + 1)
+        ])
+        insert(User, [
+            User(id=i, username=f'usuario{i}', email=f'usuario{i}@example.com',
+                 full_name=f'Usuario {i}')
+            for i in range(1, n_users + 1)
+        ])
+        insert(Bibliotecary, [
+            Bibliotecary(id=i, username=f'bibliotecario{i}',
+                         email=f'bibliotecario{i}@example.com', full_name=f'Bibliotecario {i}')
+            for i in range(1, 11)
+        ])
+        with preserve_auto_dates(Loan):
+            for start in range(1, loans + 1, SEED_BATCH_SIZE):
+                batch = []
+                for i in range(start, min(start + SEED_BATCH_SIZE, loans + 1)):
+                    loan_date = now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+                    active = rng.random() < 0.2
+                    batch.append(Loan(
+                        id=i, book_id=rng.randint(1, n_books), user_id=rng.randint(1, n_users),
+                        bibliotecary_id=rng.randint(1, 10), loan_date=loan_date,
+                        return_date=None if active else loan_date + timedelta(days=14),
+                        is_active=active,
+                    ))
+                Loan.objects.bulk_create(batch)
+        counters.recount_loan_counters()
+        statistics.rebuild_snapshot()
+
+
+def endpoints(iterations):
+    """Endpoints medidos: nombre, método y función que da cada ruta.
+
+    Args:
+        iterations: Peticiones que se harán por endpoint
+
+    Returns:
+        list: Tuplas ``(nombre, método, ruta())``
+    """
+    from viewset_books.models import Book, Loan
+    from viewset_users.models import User
+    from viewset_bibliotecary.models import Bibliotecary
+
+    loan = Loan.objects.order_by('-pk').values_list('pk', flat=True).first()
+    book = Book.objects.order_by('-total_loans').values_list('pk', flat=True).first()
+    user = User.objects.order_by('-total_loans').values_list('pk', flat=True).first()
+    bibliotecary = Bibliotecary.objects.order_by('-total_loans').values_list('pk', flat=True).first()
+    # Cada devolución necesita un préstamo activo distinto
+    returnable = iter(
+        Loan.objects.filter(is_active=True).order_by('pk')
+        .values_list('pk', flat=True)[:iterations + 2]
+    )
+    return [
+        ('book-list', 'get', lambda: '/books/'),
+        ('book-detail', 'get', lambda: f'/books/{book}/'),
+        ('loan-list', 'get', lambda: '/loans/'),
+        ('loan-detail', 'get', lambda: f'/loans/{loan}/'),
+        ('loan-active', 'get', lambda: '/loans/active/'),
+        ('loan-return-book', 'post', lambda: f'/loans/{next(returnable)}/return_book/'),
+        ('user-loan-history', 'get', lambda: f'/api/users/{user}/loan-history/'),
+        ('book-loan-statistics', 'get', lambda: f'/api/books/{book}/loan-statistics/'),
+        ('library-statistics', 'get', lambda: '/api/library/statistics/'),
+        ('bibliotecary-managed-loans', 'get',
+         lambda: f'/bibliotecaries/{bibliotecary}/managed_loans/'),
+        ('bibliotecary-active-loans', 'get',
+         lambda: f'/bibliotecaries/{bibliotecary}/active_loans/'),
+        ('bibliotecary-statistics', 'get',
+         lambda: f'/bibliotecaries/{bibliotecary}/statistics/'),
+    ]
+
+
+def measure(client, method, path, iterations, warm_cache=False):
+    """Ejecuta un endpoint varias veces y resume sus métricas.
+
+    Se hace una petición de calentamiento (importaciones y cachés internas
+    de Django) y otra con ``tracemalloc`` activo para medir el pico de
+    memoria; ninguna se cuenta en las latencias. Salvo con
+    ``warm_cache`` la caché de respuestas se vacía antes de cada petición,
+    para medir el coste real de la vista.
+
+    Args:
+        client: Cliente de pruebas de Django
+        method: ``get`` o ``post``
+        path: Función que devuelve la ruta de cada petición
+        iterations: Peticiones medidas
+        warm_cache: Si es True no se vacía la caché entre peticiones
+
+    Returns:
+        dict: ``p50_ms``, ``p95_ms``, ``p99_ms``, ``queries`` (máximo por
+        petición) y ``peak_kb``
+    """
+    from django.db import connection
+    from api_server.cache import get_cache
+    from api_server.metrics import QueryTimer, percentile
+
+    def request():
+        if not warm_cache:
+            get_cache().clear()
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = getattr(client, method)(path())
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method.upper()} {response.request["PATH_INFO"]}: '
+                               f'{response.status_code}')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return elapsed, timer.count
+
+    request()
+    tracemalloc.start()
+    request()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    samples = [request() for _ in range(iterations)]
+    durations = sorted(elapsed * 1000 for elapsed, _ in samples)
+    return {
+        'p50_ms': round(percentile(durations, 0.5), 3),
+        'p95_ms': round(percentile(durations, 0.95), 3),
+        'p99_ms': round(percentile(durations, 0.99), 3),
+        'queries': max(queries for _, queries in samples),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Busca regresiones respecto a una referencia.
+
+    Las consultas no pueden aumentar; la mediana de latencia y el pico de
+    memoria pueden empeorar como mucho un ``tolerance`` relativo.
+
+    Args:
+        results: Métricas por endpoint de esta ejecución
+        baseline: Métricas por endpoint de la referencia
+        tolerance: Empeoramiento relativo admitido (0.25 = 25 %)
+
+    Returns:
+        list: Descripción de cada regresión encontrada
+    """
+    failures = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result['queries'] > reference['queries']:
+            failures.append(f"{name}: {result['queries']} consultas (referencia {reference['queries']})")
+        for key in COMPARED:
+            limit = reference[key] * (1 + tolerance)
+            if result[key] > limit:
+                failures.append(f'{name}: {key} {result[key]} > {limit:.1f} '
+                                f'(referencia {reference[key]})')
+    return failures
+
+
+def main(argv=None):
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='1k', help='Préstamos a crear')
+    parser.add_argument('--loans', type=int, help='Número exacto de préstamos (ignora --scale)')
+    parser.add_argument('--iterations', type=int, default=30, help='Peticiones por endpoint')
+    parser.add_argument('--db', help='Fichero SQLite a reutilizar entre ejecuciones')
+    parser.add_argument('--warm-cache', action='store_true',
+                        help='No vacía la caché de respuestas entre peticiones')
+    parser.add_argument('--baseline', help='Referencia JSON con la que comparar')
+    parser.add_argument('--save-baseline', help='Guarda los resultados como referencia')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Empeoramiento relativo admitido frente a la referencia')
+    args = parser.parse_args(argv)
+    loans = args.loans or SCALES[args.scale]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(args.db or os.path.join(tmp, 'bench.sqlite3'))
+        from django.test import Client
+        from viewset_books.models import Loan
+
+        existing = Loan.objects.count()
+        if existing not in (0, loans):
+            parser.error(f'{args.db} tiene {existing} préstamos, no {loans}')
+        if not existing:
+            start = time.perf_counter()
+            seed(loans)
+            print(f'{loans} préstamos creados en {time.perf_counter() - start:.1f} s\n')
+
+        client = Client()
+        results = {}
+        print(f"{'endpoint':<30}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'consultas':>11}{'pico KB':>10}")
+        for name, method, path in endpoints(args.iterations):
+            result = results[name] = measure(client, method, path, args.iterations, args.warm_cache)
+            print(f"{name:<30}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                  f"{result['p99_ms']:>9.2f}{result['queries']:>11}{result['peak_kb']:>10.1f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'loans': loans, 'endpoints': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['loans'] != loans:
+            parser.error(f"La referencia es de {baseline['loans']} préstamos, no de {loans}")
+        failures = compare(results, baseline['endpoints'], args.tolerance)
+        if failures:
+            print('\nRegresiones respecto a la referencia:')
+            for failure in failures:
+                print(f'  {failure}')
+            sys.exit(1)
+        print('\nSin regresiones respecto a la referencia')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Peticiones por segundo según la estrategia de conexión a la base de datos.
+
+Compara, contra la base de datos configurada con las variables ``DB_*``:
+
+- una conexión nueva por petición (``DB_CONN_MAX_AGE=0``)
+- conexiones persistentes por hilo con comprobación de salud
+- el pool acotado compartido (``DB_POOL_SIZE``), solo con MySQL
+
+Cada variante se ejecuta en un proceso aparte (los ajustes de Django son
+globales) con varios hilos que llaman al manejador WSGI de Django, como un
+servidor con hilos; a diferencia del cliente de pruebas, así se emiten las
+señales de inicio y fin de petición que abren y cierran las conexiones.
+El endpoint por defecto no pasa por la caché de respuestas, de modo que
+cada petición consulta la base de datos.
+
+Uso::
+
+    python -m benchmarks.bench_connections --threads 8 --seconds 10
+    DB_ENGINE=sqlite DB_NAME=/tmp/bench.sqlite3 python -m benchmarks.bench_connections
+
+Con SQLite abrir una conexión es casi gratis: la diferencia se aprecia con
+MySQL, sobre todo si el servidor está en otra máquina.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+ROOT = Path(__file__).resolve().parent.parent
+
+#: Variantes comparadas y las variables de entorno que las activan
+VARIANTS = {
+    'sin reutilización': {'DB_CONN_MAX_AGE': '0', 'DB_POOL_SIZE': '0'},
+    'persistentes': {'DB_CONN_MAX_AGE': '60', 'DB_CONN_HEALTH_CHECKS': '1', 'DB_POOL_SIZE': '0'},
+    'pool': {'DB_POOL_SIZE': None},
+}
+
+
+def worker(path, threads, seconds):
+    """Ejecuta peticiones desde varios hilos durante un tiempo fijo.
+
+    Args:
+        path: Ruta de la petición, con query string si hace falta
+        threads: Hilos que hacen peticiones a la vez
+        seconds: Duración de la medición
+
+    Returns:
+        dict: ``requests``, ``errors`` y ``connections`` (conexiones abiertas)
+    """
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_server.settings')
+    from django.conf import settings
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    import django
+    django.setup()
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db.backends.signals import connection_created
+
+    handler = WSGIHandler()
+    counts = {'requests': 0, 'errors': 0, 'connections': 0}
+    lock = threading.Lock()
+
+    def opened(**kwargs):
+        with lock:
+            counts['connections'] += 1
+
+    connection_created.connect(opened, weak=False)
+    route, _, query = path.partition('?')
+    deadline = time.perf_counter() + seconds
+
+    def loop():
+        requests = errors = 0
+        while time.perf_counter() < deadline:
+            environ = {'PATH_INFO': route, 'QUERY_STRING': query, 'wsgi.input': io.BytesIO()}
+            setup_testing_defaults(environ)
+            status = []
+            response = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+            b''.join(response)
+            response.close()
+            requests += 1
+            errors += not status[0].startswith('2')
+        with lock:
+            counts['requests'] += requests
+            counts['errors'] += errors
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return counts
+
+
+def run_variant(env, args):
+    """Lanza una variante en un subproceso y devuelve sus resultados."""
+    command = [sys.executable, '-m', 'benchmarks.bench_connections', '--worker',
+               '--path', args.path, '--threads', str(args.threads),
+               '--seconds', str(args.seconds)]
+    output = subprocess.run(
+        command, cwd=ROOT, env={**os.environ, **env}, check=True,
+        stdout=subprocess.PIPE, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--path', default='/loans/?page_size=1', help='Ruta a solicitar')
+    parser.add_argument('--threads', type=int, default=8, help='Hilos concurrentes')
+    parser.add_argument('--seconds', type=float, default=5, help='Duración de cada variante')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.path, args.threads, args.seconds)))
+        return
+
+    sqlite = os.getenv('DB_ENGINE') == 'sqlite'
+    print(f'{args.threads} hilos, {args.seconds:g} s por variante, GET {args.path}\n')
+    print(f"{'variante':<20}{'peticiones/s':>14}{'conexiones':>12}{'errores':>9}")
+    for name, env in VARIANTS.items():
+        if name == 'pool':
+            if sqlite:
+                print(f"{name:<20}{'(solo MySQL)':>14}")
+                continue
+            env = {'DB_POOL_SIZE': str(args.threads)}
+        result = run_variant(env, args)
+        rate = result['requests'] / args.seconds
+        print(f"{name:<20}{rate:>14.1f}{result['connections']:>12}{result['errors']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Compara ``fix_encoding.py`` con el comando ``manage.py fix_encoding``.
+
+Genera un volcado en UTF-16 (lo que produce ``dumpdata > datadump.json`` en
+PowerShell) del tamaño indicado y convierte una copia con cada variante en
+un proceso aparte, midiendo el tiempo y el pico de memoria residente.
+
+Uso::
+
+    python -m benchmarks.bench_fix_encoding --size-mb 200
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+STREAMING = (
+    'import sys; sys.path.insert(0, {root!r}); '
+    'from viewset_books.management.commands.fix_encoding import fix_encoding; '
+    "fix_encoding('datadump.json', use_mmap={mmap})"
+)
+
+VARIANTS = {
+    'fix_encoding.py': [sys.executable, str(ROOT / 'fix_encoding.py')],
+    'comando (bloques)': [sys.executable, '-c', STREAMING.format(root=str(ROOT), mmap=False)],
+    'comando (mmap)': [sys.executable, '-c', STREAMING.format(root=str(ROOT), mmap=True)],
+}
+
+
+def write_dump(path, size_mb, encoding='utf-16'):
+    """Escribe un volcado JSON de préstamos de ``size_mb`` megabytes aprox.
+
+    Args:
+        path: Ruta del fichero a generar
+        size_mb: Tamaño aproximado en megabytes (en la codificación dada)
+        encoding: Codificación del fichero
+    """
+    target = size_mb * 1024 * 1024
+    with open(path, 'w', encoding=encoding) as f:
+        f.write('[\n')
+        pk = 0
+        while f.tell() < target:
+            record = {
+                'model': 'viewset_books.book',
+                'pk': pk,
+                'fields': {'title': f'Cien años de soledad, edición {pk} — «Macondo»', 'writer': pk % 97},
+            }
+            f.write((',\n' if pk else '') + json.dumps(record, ensure_ascii=False))
+            pk += 1
+        f.write('\n]\n')
+
+
+def run(command, cwd):
+    """Ejecuta un comando y mide su duración y su pico de memoria.
+
+    Returns:
+        tuple: ``(segundos, MB de memoria residente máxima o None)``
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.DEVNULL)
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        peak = usage.ru_maxrss / divisor
+    else:
+        process.wait()
+        peak = None
+    elapsed = time.perf_counter() - start
+    if process.returncode:
+        raise RuntimeError(f'{command[1]} terminó con código {process.returncode}')
+    return elapsed, peak
+
+
+def main(argv=None):
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=50, help='Tamaño del volcado')
+    parser.add_argument('--repeat', type=int, default=1, help='Ejecuciones por variante')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.json')
+        write_dump(source, args.size_mb)
+        size = os.path.getsize(source) / (1024 * 1024)
+        print(f'Volcado UTF-16 de {size:.1f} MB\n')
+        print(f"{'variante':<20}{'segundos':>10}{'pico MB':>10}")
+        for name, command in VARIANTS.items():
+            results = []
+            for _ in range(args.repeat):
+                workdir = tempfile.mkdtemp(dir=tmp)
+                shutil.copy(source, os.path.join(workdir, 'datadump.json'))
+                results.append(run(command, workdir))
+                shutil.rmtree(workdir)
+            elapsed, peak = min(results)
+            peak = f'{peak:.1f}' if peak is not None else '-'
+            print(f'{name:<20}{elapsed:>10.2f}{peak:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Codificación y decodificación JSON: DRF (``json``) frente a ``orjson``.
+
+Mide, sin base de datos, ``render`` de ``JSONRenderer`` y
+:class:`api_server.renderers.ORJSONRenderer` y ``parse`` de los parsers
+correspondientes sobre cuerpos con la forma de los listados de la API:
+páginas de préstamos (con fechas como cadenas, como las devuelve el
+serializer, o como ``datetime``) y de libros, de 50 (tamaño por defecto) y
+500 (máximo) elementos. Comprueba que ambos renderers producen los mismos
+bytes.
+
+Uso::
+
+    python -m benchmarks.bench_json --repeat 200
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def payloads():
+    """Cuerpos de respuesta medidos, por nombre."""
+    from django.utils import timezone
+
+    now = timezone.now()
+
+    def loan(i, as_text):
+        loan_date = now - timedelta(minutes=i * 37)
+        return_date = None if i % 5 == 0 else loan_date + timedelta(days=14)
+        if as_text:
+            loan_date = loan_date.isoformat().replace('+00:00', 'Z')
+            return_date = return_date and return_date.isoformat().replace('+00:00', 'Z')
+        return {
+            'id': 1_000_000 - i, 'book_title': f'Libro {i % 997}',
+            'user_username': f'usuario{i % 4999}', 'bibliotecary_name': f'bibliotecario{i % 10}',
+            'loan_date': loan_date, 'return_date': return_date, 'is_active': i % 5 == 0,
+        }
+
+    def page(results):
+        return {'next': 'http://testserver/loans/?cursor=cD0yMDI2LTEwLTE4', 'previous': None,
+                'results': results}
+
+    result = {}
+    for size in (50, 500):
+        result[f'loans-{size}'] = page([loan(i, True) for i in range(size)])
+        result[f'loans-{size}-datetime'] = page([loan(i, False) for i in range(size)])
+        result[f'books-{size}'] = page([
+            {'id': i, 'title': f'Libro número {i}', 'writer_name': f'Escritor {i % 97}'}
+            for i in range(size)
+        ])
+    return result
+
+
+def best_time(function, repeat):
+    """Mejor tiempo en microsegundos de ``repeat`` ejecuciones."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1_000_000
+
+
+def main(argv=None):
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help='Repeticiones por medida')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_server.settings')
+    import django
+    django.setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from api_server.renderers import ORJSONParser, ORJSONRenderer, orjson
+
+    if orjson is None:
+        print('orjson no está instalado: ORJSONRenderer usa json\n')
+    print(f"{'cuerpo':<22}{'KB':>7}{'render json':>13}{'orjson':>9}{'mejora':>8}"
+          f"{'parse json':>12}{'orjson':>9}{'mejora':>8}")
+    for name, data in payloads().items():
+        body = ORJSONRenderer().render(data)
+        if body != JSONRenderer().render(data):
+            raise SystemExit(f'{name}: los renderers no producen los mismos bytes')
+        times = [
+            best_time(lambda: renderer().render(data), args.repeat)
+            for renderer in (JSONRenderer, ORJSONRenderer)
+        ] + [
+            best_time(lambda: parser_class().parse(io.BytesIO(body)), args.repeat)
+            for parser_class in (JSONParser, ORJSONParser)
+        ]
+        print(f'{name:<22}{len(body) / 1024:>7.1f}'
+              f'{times[0]:>11.0f}µs{times[1]:>7.0f}µs{times[0] / times[1]:>7.1f}x'
+              f'{times[2]:>10.0f}µs{times[3]:>7.0f}µs{times[2] / times[3]:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Latencia de la búsqueda de texto completo frente a ``LIKE '%palabra%'``.
+
+Crea una base de datos SQLite con ``--titles`` libros (por defecto un
+millón) cuyos títulos combinan palabras de un vocabulario sintético con
+frecuencias de tipo Zipf, construye el índice FTS5 con
+:func:`viewset_books.search.rebuild_index` y mide, para consultas de
+palabras frecuentes, raras, de varias palabras y de prefijo, los
+percentiles de latencia de:
+
+- ``fts``: :func:`viewset_books.search.search_books` (20 resultados por
+  relevancia)
+- ``endpoint``: ``GET /books/search/`` completo, sin caché de respuestas
+- ``like``: ``title__icontains`` de cada palabra con los 20 primeros por id,
+  lo que ofrecía ``?title__contains=`` con ``FILTER_ALLOW_FULL_SCAN``. Para
+  las palabras frecuentes termina pronto; para las raras recorre la tabla
+
+Uso::
+
+    python -m benchmarks.bench_search
+    python -m benchmarks.bench_search --titles 100000 --db /tmp/search.sqlite3
+
+Con ``--db`` la base de datos (y su índice) se reutiliza entre ejecuciones.
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_api import SEED_BATCH_SIZE, setup_django
+
+#: Palabras distintas del vocabulario de títulos
+VOCABULARY_SIZE = 20_000
+
+#: Resultados por búsqueda, como ``/books/search/`` por defecto
+LIMIT = 20
+
+_SYLLABLES = ('ma', 'ra', 'sol', 'lu', 'ne', 'to', 'ca', 'mi', 'dor', 'ven', 'ti',
+              'bre', 'al', 'es', 'pa', 'zo', 'gri', 'fan', 'que')
+
+
+def vocabulary(rng):
+    """Palabras sintéticas distintas, de la más a la menos frecuente."""
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add(''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda word: (len(word), word))
+
+
+def seed_titles(titles, seed_value=0):
+    """Puebla el catálogo con ``titles`` libros y un escritor cada 10.
+
+    Args:
+        titles: Número de libros
+        seed_value: Semilla del generador aleatorio
+
+    Returns:
+        list: El vocabulario, de la palabra más a la menos frecuente
+    """
+    from django.db import transaction
+    from viewset_books.models import Book, Writer
+
+    rng = random.Random(seed_value)
+    words = vocabulary(rng)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    n_writers = max(1, titles // 10)
+    with transaction.atomic():
+        for start in range(1, n_writers + 1, SEED_BATCH_SIZE):
+            Writer.objects.bulk_create([
+                Writer(id=i, name=f'{rng.choice(words).title()} {rng.choice(words).title()} {i}')
+                for i in range(start, min(start + SEED_BATCH_SIZE, n_writers + 1))
+            ])
+        for start in range(1, titles + 1, SEED_BATCH_SIZE):
+            Book.objects.bulk_create([
+                Book(id=i, writer_id=rng.randint(1, n_writers), title=' '.join(
+                    rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 6))
+                ).capitalize() + f' {i}')
+                for i in range(start, min(start + SEED_BATCH_SIZE, titles + 1))
+            ])
+    return words
+
+
+def queries(words):
+    """Consultas medidas, por nombre."""
+    return {
+        'palabra frecuente': words[0],
+        'palabra media': words[500],
+        'palabra rara': words[-1],
+        'dos palabras': f'{words[3]} {words[40]}',
+        'prefijo': words[10][:3],
+    }
+
+
+def percentiles(function, iterations):
+    """Mediana y percentil 95 en milisegundos de ``iterations`` ejecuciones."""
+    function()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.95))]
+
+
+def main(argv=None):
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=1_000_000, help='Libros a crear')
+    parser.add_argument('--iterations', type=int, default=50, help='Búsquedas por consulta')
+    parser.add_argument('--like-iterations', type=int, default=5,
+                        help='Consultas LIKE por consulta (recorren la tabla)')
+    parser.add_argument('--db', help='Fichero SQLite a reutilizar entre ejecuciones')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(args.db or os.path.join(tmp, 'search.sqlite3'))
+        from django.test import Client
+        from api_server.cache import get_cache
+        from viewset_books import search
+        from viewset_books.models import Book
+
+        if Book.objects.exists():
+            words = vocabulary(random.Random(0))
+        else:
+            start = time.perf_counter()
+            words = seed_titles(args.titles)
+            print(f'{args.titles:,} libros creados en {time.perf_counter() - start:.1f} s')
+            start = time.perf_counter()
+            count = search.rebuild_index()
+            print(f'{count:,} documentos indexados en {time.perf_counter() - start:.1f} s\n')
+
+        client = Client()
+
+        def endpoint(q):
+            get_cache().clear()
+            response = client.get('/books/search/', {'q': q})
+            assert response.status_code == 200, response.status_code
+
+        def like(q):
+            books = Book.objects.order_by('id')
+            for word in q.split():
+                books = books.filter(title__icontains=word)
+            return list(books.values_list('id', flat=True)[:LIMIT])
+
+        print(f"{'consulta':<20}{'q':<24}{'fts p50':>9}{'p95':>8}"
+              f"{'endpoint p50':>14}{'p95':>8}{'like p50':>10}{'p95':>8}  (ms)")
+        for name, q in queries(words).items():
+            fts = percentiles(lambda: search.search_books(q, LIMIT), args.iterations)
+            api = percentiles(lambda: endpoint(q), args.iterations)
+            scan = percentiles(lambda: like(q), args.like_iterations)
+            print(f'{name:<20}{q:<24}{fts[0]:>9.2f}{fts[1]:>8.2f}'
+                  f'{api[0]:>14.2f}{api[1]:>8.2f}{scan[0]:>10.2f}{scan[1]:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
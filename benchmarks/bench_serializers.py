@@ -0,0 +1,94 @@
+"""Filas por segundo de los serializers de DRF frente al modo ``values()``.
+
+Para cada serializer de listado serializa repetidamente una página de
+filas de dos maneras y comprueba que ambas producen la misma salida:
+
+- ``serializer``: instancias del ORM con la carga del serializer
+  (``setup_eager_loading``) y ``Serializer(..., many=True).data``, como
+  hacía ``list`` de DRF
+- ``values``: ``values()`` con las columnas del serializer y la
+  representación precompilada de
+  :func:`api_server.serializers.values_representation`
+
+Ambas variantes incluyen la consulta. Usa la misma base de datos SQLite
+que ``bench_api`` (``--db`` para reutilizarla).
+
+Uso::
+
+    python -m benchmarks.bench_serializers --rows 500 --repeat 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_api import seed, setup_django
+
+
+def serializers_to_compare():
+    """Serializers medidos y el queryset de cada uno."""
+    from viewset_books.models import Book, Loan
+    from viewset_books.serializer import BookSerializer, LoanSerializer
+    from viewset_users.models import User
+    from viewset_users.serializer import UserSerializer
+    from viewset_bibliotecary.models import Bibliotecary
+    from viewset_bibliotecary.serializer import BibliotecarySerializer
+
+    return [
+        ('BookSerializer', BookSerializer, Book.objects.order_by('id')),
+        ('UserSerializer', UserSerializer, User.objects.order_by('id')),
+        ('BibliotecarySerializer', BibliotecarySerializer, Bibliotecary.objects.order_by('id')),
+        ('LoanSerializer', LoanSerializer, Loan.objects.order_by('-loan_date', '-id')),
+    ]
+
+
+def best_rate(function, rows, repeat):
+    """Filas por segundo de la mejor de ``repeat`` ejecuciones."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return rows / best
+
+
+def main(argv=None):
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--loans', type=int, default=10_000, help='Préstamos a crear')
+    parser.add_argument('--rows', type=int, default=500, help='Filas por serialización')
+    parser.add_argument('--repeat', type=int, default=20, help='Repeticiones por variante')
+    parser.add_argument('--db', help='Fichero SQLite a reutilizar entre ejecuciones')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(args.db or os.path.join(tmp, 'bench.sqlite3'))
+        from api_server.serializers import values_representation
+        from viewset_books.models import Loan
+
+        if not Loan.objects.exists():
+            seed(args.loans)
+
+        print(f"{'serializer':<24}{'filas':>7}{'serializer/s':>15}{'values/s':>13}{'mejora':>9}")
+        for name, serializer_class, queryset in serializers_to_compare():
+            queryset = serializer_class.setup_eager_loading(queryset) \
+                if hasattr(serializer_class, 'setup_eager_loading') else queryset
+            representation = values_representation(serializer_class)
+
+            def with_serializer():
+                return serializer_class(queryset[:args.rows], many=True).data
+
+            def with_values():
+                return representation.many(queryset.values(*representation.lookups)[:args.rows])
+
+            expected = with_serializer()
+            if with_values() != expected:
+                raise SystemExit(f'{name}: la salida de values() no coincide')
+            rows = len(expected)
+            slow = best_rate(with_serializer, rows, args.repeat)
+            fast = best_rate(with_values, rows, args.repeat)
+            print(f'{name:<24}{rows:>7}{slow:>15,.0f}{fast:>13,.0f}{fast / slow:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
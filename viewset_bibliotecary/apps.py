@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ViewsetBibliotecaryConfig(AppConfig):
     name = 'viewset_bibliotecary'
+
+    def ready(self):
+        """Registra las señales que invalidan la caché de bibliotecarios."""
+        from viewset_bibliotecary import signals  # noqa: F401
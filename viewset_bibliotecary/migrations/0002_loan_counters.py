@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_bibliotecary', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bibliotecary',
+            name='active_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='bibliotecary',
+            name='completed_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='bibliotecary',
+            name='total_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
@@ -4,11 +4,15 @@ class Bibliotecary(models.Model):
     """Modelo que representa a un bibliotecario.
     
     Los bibliotecarios gestionan los préstamos y tienen permisos
-    especiales en el sistema.
+    especiales en el sistema. Incluye contadores desnormalizados de los
+    préstamos que ha gestionado (ver :mod:`viewset_books.counters`).
     """
     username = models.CharField(max_length=150, unique=True)
     email = models.EmailField(unique=True)
     full_name = models.CharField(max_length=150)
+    total_loans = models.IntegerField(default=0, editable=False)
+    active_loans = models.IntegerField(default=0, editable=False)
+    completed_loans = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         """Retorna el nombre de usuario del bibliotecario."""
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import Bibliotecary
+from api_server.serializers import SparseFieldsMixin
 
-class BibliotecarySerializer(serializers.ModelSerializer):
+class BibliotecarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para el modelo Bibliotecary.
     
     Incluye validación personalizada del campo email.
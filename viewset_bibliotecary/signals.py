@@ -0,0 +1,26 @@
+"""Invalidación de las cachés que dependen de los bibliotecarios.
+
+Cualquier alta, modificación o baja de un bibliotecario vacía
+:data:`api_server.permissions.bibliotecary_emails` e invalida las
+respuestas cacheadas que leen la tabla (ver :mod:`api_server.cache`). Se vacía también al
+confirmar la transacción para que otro hilo no deje en caché los datos
+anteriores al cambio mientras la transacción seguía abierta.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from api_server.cache import track_versions
+from api_server.permissions import bibliotecary_emails
+from viewset_bibliotecary.models import Bibliotecary
+
+
+@receiver(post_save, sender=Bibliotecary)
+@receiver(post_delete, sender=Bibliotecary)
+def clear_bibliotecary_cache(sender, **kwargs):
+    """Vacía la caché de emails de bibliotecarios."""
+    bibliotecary_emails.clear()
+    transaction.on_commit(bibliotecary_emails.clear)
+
+
+# Las escrituras invalidan las respuestas cacheadas que leen la tabla
+track_versions(Bibliotecary)
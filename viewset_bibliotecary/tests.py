@@ -82,7 +82,7 @@ class BibliotecaryAPITest(APITestCase):
         """Test: GET /bibliotecaries/ - Listar bibliotecarios"""
         response = self.client.get('/bibliotecaries/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
     
     def test_obtener_bibliotecario(self):
         """Test: GET /bibliotecaries/{id}/ - Obtener detalle"""
@@ -135,7 +135,7 @@ class BibliotecaryAPITest(APITestCase):
         
         response = self.client.get(f'/bibliotecaries/{self.bibliotecary.id}/managed_loans/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.data['results']), 1)
     
     def test_active_loans_action(self):
         """Test: GET /bibliotecaries/{id}/active_loans/ - Préstamos activos"""
@@ -158,8 +158,8 @@ class BibliotecaryAPITest(APITestCase):
         response = self.client.get(f'/bibliotecaries/{self.bibliotecary.id}/active_loans/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Solo debe devolver el préstamo activo
-        self.assertEqual(len(response.data), 1)
-        self.assertTrue(response.data[0]['is_active'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertTrue(response.data['results'][0]['is_active'])
     
     def test_statistics_action(self):
         """Test: GET /bibliotecaries/{id}/statistics/ - Estadísticas"""
@@ -198,3 +198,42 @@ class BibliotecaryAPITest(APITestCase):
         response = self.client.post('/bibliotecaries/', data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+
+class BibliotecaryAsyncStatisticsTest(TestCase):
+    """Tests para la variante asíncrona de las estadísticas del bibliotecario"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='async_b', email='async_b@example.com', full_name='Async B'
+        )
+        writer = Writer.objects.create(name='Async W')
+        book = Book.objects.create(title='Async', writer=writer)
+        user = User.objects.create(username='async_u', email='async_u@example.com', full_name='Async U')
+        Loan.objects.create(book=book, user=user, bibliotecary=self.bibliotecary)
+    
+    async def test_estadisticas(self):
+        """Test: Devuelve los mismos contadores que la acción síncrona"""
+        response = await self.async_client.get(
+            f'/api/async/bibliotecaries/{self.bibliotecary.id}/statistics/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'bibliotecary': 'async_b', 'total_loans': 1, 'active_loans': 1, 'completed_loans': 0
+        })
+    
+    async def test_no_existente(self):
+        """Test: 404 si el bibliotecario no existe"""
+        response = await self.async_client.get('/api/async/bibliotecaries/9999/statistics/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_mismo_contenido_que_la_version_sincrona(self):
+        """Test: Misma respuesta renderizada que la acción del ViewSet"""
+        for id in (self.bibliotecary.id, 9999):
+            with self.subTest(id=id):
+                sincrona = self.client.get(f'/bibliotecaries/{id}/statistics/')
+                asincrona = self.client.get(f'/api/async/bibliotecaries/{id}/statistics/')
+                self.assertEqual(asincrona.status_code, sincrona.status_code)
+                self.assertEqual(asincrona['Content-Type'], sincrona['Content-Type'])
+                self.assertEqual(asincrona.content, sincrona.content)
@@ -5,7 +5,8 @@ from .views import (
     BibliotecaryListView,
     BibliotecaryCreateView,
     BibliotecaryDetailView,
-    BibliotecaryUpdateView
+    BibliotecaryUpdateView,
+    bibliotecary_statistics_async
 )
 
 router = DefaultRouter()
@@ -17,4 +18,7 @@ urlpatterns = [
     path('generic/bibliotecaries/create/', BibliotecaryCreateView.as_view(), name='bibliotecary-create-generic'),
     path('generic/bibliotecaries/<int:pk>/', BibliotecaryDetailView.as_view(), name='bibliotecary-detail-generic'),
     path('generic/bibliotecaries/<int:pk>/update/', BibliotecaryUpdateView.as_view(), name='bibliotecary-update-generic'),
+    # Variante asíncrona de las estadísticas
+    path('api/async/bibliotecaries/<int:id>/statistics/', bibliotecary_statistics_async,
+         name='bibliotecary-statistics-async'),
 ] + router.urls
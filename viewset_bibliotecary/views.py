@@ -1,15 +1,17 @@
-from django.shortcuts import render
+from django.shortcuts import render, aget_object_or_404
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import viewsets, generics
 from rest_framework import status
 from .models import Bibliotecary
 from .serializer import BibliotecarySerializer
+from api_server.mixins import EagerLoadingViewMixin, ValuesListViewMixin
+from api_server.async_views import async_api_view
 import logging
 
 logger = logging.getLogger(__name__)
 
-class BibliotecaryViewSet(viewsets.ModelViewSet):
+class BibliotecaryViewSet(ValuesListViewMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar bibliotecarios.
     
     Proporciona operaciones CRUD completas y acciones personalizadas
@@ -26,9 +28,10 @@ class BibliotecaryViewSet(viewsets.ModelViewSet):
         from viewset_books.models import Loan
         from viewset_books.serializer import LoanSerializer
         
-        loans = Loan.objects.filter(bibliotecary=bibliotecary)
-        serializer = LoanSerializer(loans, many=True)
-        return Response(serializer.data)
+        loans = self.eager_load(
+            Loan.objects.filter(bibliotecary=bibliotecary), LoanSerializer
+        )
+        return self.list_response(loans, LoanSerializer)
     
     @action(detail=True, methods=['get'])
     def active_loans(self, request, id=None):
@@ -37,30 +40,57 @@ class BibliotecaryViewSet(viewsets.ModelViewSet):
         from viewset_books.models import Loan
         from viewset_books.serializer import LoanSerializer
         
-        loans = Loan.objects.filter(bibliotecary=bibliotecary, is_active=True)
-        serializer = LoanSerializer(loans, many=True)
-        return Response(serializer.data)
+        loans = self.eager_load(
+            Loan.objects.filter(bibliotecary=bibliotecary, is_active=True),
+            LoanSerializer
+        )
+        return self.list_response(loans, LoanSerializer)
     
     @action(detail=True, methods=['get'])
     def statistics(self, request, id=None):
-        """Estadísticas de préstamos del bibliotecario"""
-        bibliotecary = self.get_object()
-        from viewset_books.models import Loan
+        """Estadísticas de préstamos del bibliotecario.
         
-        total_loans = Loan.objects.filter(bibliotecary=bibliotecary).count()
-        active_loans = Loan.objects.filter(bibliotecary=bibliotecary, is_active=True).count()
-        completed_loans = Loan.objects.filter(bibliotecary=bibliotecary, is_active=False).count()
-        
-        return Response({
-            'bibliotecary': bibliotecary.username,
-            'total_loans': total_loans,
-            'active_loans': active_loans,
-            'completed_loans': completed_loans
-        })
+        Se leen de los contadores desnormalizados del bibliotecario,
+        sin recorrer la tabla de préstamos.
+        """
+        bibliotecary = self.get_object()
+        return Response(bibliotecary_statistics_data(bibliotecary))
+
+
+def bibliotecary_statistics_data(bibliotecary):
+    """Estadísticas de préstamos de un bibliotecario según sus contadores."""
+    return {
+        'bibliotecary': bibliotecary.username,
+        'total_loans': bibliotecary.total_loans,
+        'active_loans': bibliotecary.active_loans,
+        'completed_loans': bibliotecary.completed_loans
+    }
+
+
+@async_api_view
+async def bibliotecary_statistics_async(request, id):
+    """Variante asíncrona de ``BibliotecaryViewSet.statistics``.
+
+    Lee el bibliotecario con el ORM asíncrono, sin ocupar un hilo mientras
+    espera a la base de datos. Responde lo mismo que la acción síncrona,
+    incluido el 404 de ``get_object``.
+
+    Args:
+        request: Objeto de petición HTTP
+        id: ID del bibliotecario
+
+    Returns:
+        Response con los contadores de préstamos del bibliotecario
+
+    Raises:
+        Http404: Si el bibliotecario no existe
+    """
+    bibliotecary = await aget_object_or_404(Bibliotecary, id=id)
+    return Response(bibliotecary_statistics_data(bibliotecary))
 
 
 # Vistas genéricas basadas en clases
-class BibliotecaryListView(generics.ListAPIView):
+class BibliotecaryListView(ValuesListViewMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """Vista genérica para listar todos los bibliotecarios"""
     queryset = Bibliotecary.objects.all()
     serializer_class = BibliotecarySerializer
@@ -72,7 +102,7 @@ class BibliotecaryCreateView(generics.CreateAPIView):
     serializer_class = BibliotecarySerializer
 
 
-class BibliotecaryDetailView(generics.RetrieveAPIView):
+class BibliotecaryDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """Vista genérica para obtener detalles de un bibliotecario"""
     queryset = Bibliotecary.objects.all()
     serializer_class = BibliotecarySerializer
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ViewsetBooksConfig(AppConfig):
     name = 'viewset_books'
+
+    def ready(self):
+        """Registra las señales que mantienen la instantánea de estadísticas."""
+        from viewset_books import signals  # noqa: F401
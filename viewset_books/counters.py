@@ -0,0 +1,316 @@
+"""Contadores desnormalizados de préstamos.
+
+``Book``, ``Writer``, ``User`` y ``Bibliotecary`` guardan cuántos préstamos
+tienen en total, activos y completados. Todas las altas, devoluciones y
+bajas de préstamos pasan por :func:`loan_changed`, los borrados en
+cascada de libros y usuarios por :func:`loans_cascaded` y los cambios de
+escritor de un libro por :func:`book_reassigned`. Ambas actualizan
+esos contadores con expresiones ``F()`` (un ``UPDATE`` atómico por tabla)
+y mantienen también los contadores de la instantánea de estadísticas
+globales. Los rankings no se recalculan aquí: se marcan como desfasados y
+se leen de estos contadores en la siguiente consulta.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from api_server.cache import invalidate
+from api_server.serializers import in_chunks
+from viewset_books.models import Book, Writer, Loan
+from viewset_books import statistics
+from viewset_users.models import User
+from viewset_bibliotecary.models import Bibliotecary
+
+#: Campos de estado de un préstamo que afectan a los contadores
+STATE_FIELDS = ('book_id', 'user_id', 'bibliotecary_id', 'book__writer_id', 'is_active')
+
+#: Modelo contado y clave del estado que lo identifica
+COUNTED_MODELS = (
+    (Book, 'book_id'),
+    (User, 'user_id'),
+    (Bibliotecary, 'bibliotecary_id'),
+    (Writer, 'book__writer_id'),
+)
+
+#: Relación de los préstamos con cada modelo contado
+LOAN_LOOKUPS = {Book: 'book', User: 'user', Bibliotecary: 'bibliotecary', Writer: 'book__writer'}
+
+COUNTER_FIELDS = ('total_loans', 'active_loans', 'completed_loans')
+
+
+def loan_state(loan):
+    """Estado contable de una instancia de préstamo.
+
+    Args:
+        loan: Instancia de Loan
+
+    Returns:
+        dict: Valores de :data:`STATE_FIELDS`
+    """
+    if Loan.book.is_cached(loan):
+        writer_id = loan.book.writer_id
+    else:
+        writer_id = Book.objects.filter(pk=loan.book_id).values_list(
+            'writer_id', flat=True
+        ).first()
+    return {
+        'book_id': loan.book_id,
+        'user_id': loan.user_id,
+        'bibliotecary_id': loan.bibliotecary_id,
+        'book__writer_id': writer_id,
+        'is_active': loan.is_active,
+    }
+
+
+def stored_loan_state(pk, lock=False):
+    """Estado contable de un préstamo tal y como está en la base de datos.
+
+    Args:
+        pk: Id del préstamo
+        lock: Si es True bloquea la fila hasta el final de la transacción
+
+    Returns:
+        dict o None: Valores de :data:`STATE_FIELDS`, o None si no existe
+    """
+    queryset = Loan.objects.filter(pk=pk)
+    if lock:
+        queryset = queryset.select_for_update()
+    return queryset.values(*STATE_FIELDS).first()
+
+
+def _state_deltas(state, sign):
+    """Incrementos de contadores que aporta un estado con el signo dado."""
+    status_field = 'active_loans' if state['is_active'] else 'completed_loans'
+    return {'total_loans': sign, status_field: sign}
+
+
+def loan_changed(before, after):
+    """Aplica a los contadores el paso de un préstamo de un estado a otro.
+
+    Args:
+        before: Estado previo (None si el préstamo es nuevo)
+        after: Estado nuevo (None si el préstamo se ha eliminado)
+    """
+    loans_changed([(before, after)])
+
+
+def _add_deltas(deltas, global_deltas, state, sign, skip=None):
+    """Acumula los incrementos que aporta un estado, salvo los de ``skip``."""
+    for field, delta in _state_deltas(state, sign).items():
+        global_deltas[field] += delta
+        for model, key in COUNTED_MODELS:
+            if model is not skip and state[key] is not None:
+                deltas[model][state[key]][field] += delta
+
+
+def _apply_deltas(deltas):
+    """Suma a cada fila sus incrementos con un ``UPDATE`` por tabla.
+
+    Cada fila recibe su propio incremento mediante ``CASE``; solo se
+    divide en varios ``UPDATE`` si las filas no caben en una consulta.
+
+    Args:
+        deltas: ``{modelo: {id: {campo: incremento}}}``
+    """
+    for model, rows in deltas.items():
+        rows = {pk: fields for pk, fields in rows.items() if any(fields.values())}
+        for chunk in in_chunks(rows, params_per_value=1 + 2 * len(COUNTER_FIELDS)):
+            updates = {}
+            for field in COUNTER_FIELDS:
+                whens = [When(pk=pk, then=Value(rows[pk][field]))
+                         for pk in chunk if rows[pk][field]]
+                if whens:
+                    updates[field] = F(field) + Case(*whens, default=Value(0))
+            model.objects.filter(pk__in=chunk).update(**updates)
+
+
+def _nested_counter():
+    """Acumulador ``{modelo: {id: {campo: incremento}}}``."""
+    return defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+
+
+def loans_changed(changes):
+    """Aplica a los contadores los cambios de estado de varios préstamos.
+
+    Los incrementos se acumulan por fila y se aplican con un ``UPDATE``
+    por tabla, de modo que un alta masiva cuesta unas pocas consultas en
+    lugar de varias por préstamo.
+
+    Args:
+        changes: Pares ``(antes, después)`` como los de :func:`loan_changed`
+    """
+    deltas = _nested_counter()
+    global_deltas = defaultdict(int)
+    rankings_changed = False
+    for before, after in changes:
+        for state, sign in ((before, -1), (after, 1)):
+            if state is not None:
+                _add_deltas(deltas, global_deltas, state, sign)
+
+        # Los rankings dependen del total de préstamos de cada entidad, que
+        # solo cambia en altas, bajas y reasignaciones de libro o usuario
+        reassigned = before is not None and after is not None and (
+            before['book_id'] != after['book_id']
+            or before['user_id'] != after['user_id']
+        )
+        if before is None or after is None or reassigned:
+            rankings_changed = True
+
+    with transaction.atomic():
+        _apply_deltas(deltas)
+        # Los rankings se recalculan al leerlos (ver statistics.get_snapshot)
+        statistics.adjust_counters(rankings_changed=rankings_changed, **global_deltas)
+
+
+def delete_loan(loan, delete):
+    """Borra un préstamo y lo descuenta de los contadores.
+
+    Bloquea la fila antes de borrarla: si dos peticiones borran el mismo
+    préstamo a la vez, la segunda ya no lo encuentra y no descuenta nada.
+
+    Args:
+        loan: Instancia de Loan a borrar
+        delete: Función que ejecuta el borrado (``Model.delete``)
+
+    Returns:
+        El resultado de ``delete``
+    """
+    with transaction.atomic():
+        before = stored_loan_state(loan.pk, lock=True)
+        result = delete()
+        if before is not None:
+            loan_changed(before, None)
+            invalidate(Loan)
+    return result
+
+
+def loans_cascaded(model, pk):
+    """Descuenta los préstamos que se borran en cascada con un libro o usuario.
+
+    ``Loan`` no tiene receptores de ``pre_delete`` ni ``post_delete``, así
+    que Django borra en cascada los préstamos de la entidad con un único
+    ``DELETE``. Esta función se llama desde el ``pre_delete`` de la entidad,
+    dentro de la transacción del borrado: agrupa sus préstamos con un
+    ``GROUP BY`` por las demás relaciones y aplica los incrementos con un
+    ``UPDATE`` por tabla.
+
+    Args:
+        model: Modelo de la entidad que se borra (``Book`` o ``User``)
+        pk: Id de la entidad
+    """
+    # Se ejecuta dentro de la transacción del borrado: sin punto de guardado
+    with transaction.atomic(savepoint=False):
+        # Un borrado simultáneo de la misma entidad espera aquí y ya no la
+        # encuentra, así que sus préstamos solo se descuentan una vez
+        if model.objects.select_for_update().filter(pk=pk).values_list('pk').first() is None:
+            return
+        rows = Loan.objects.filter(**{LOAN_LOOKUPS[model]: pk}).order_by().values(
+            *STATE_FIELDS
+        ).annotate(count=Count('id'))
+        deltas = _nested_counter()
+        global_deltas = defaultdict(int)
+        for row in rows:
+            _add_deltas(deltas, global_deltas, row, -row['count'], skip=model)
+        if not global_deltas:
+            return
+        _apply_deltas(deltas)
+        statistics.adjust_counters(rankings_changed=True, **global_deltas)
+        invalidate(Loan)
+
+
+def book_reassigned(book_id, previous_writer_id, writer_id):
+    """Traslada los préstamos de un libro de su escritor anterior al nuevo.
+
+    Los préstamos de un libro cuentan para su escritor, así que al cambiar
+    ``Book.writer`` los contadores del libro se restan del escritor
+    anterior y se suman al nuevo con un único ``UPDATE``.
+
+    Args:
+        book_id: Id del libro reasignado
+        previous_writer_id: Id del escritor anterior
+        writer_id: Id del escritor nuevo
+    """
+    with transaction.atomic():
+        counts = Book.objects.filter(pk=book_id).values(*COUNTER_FIELDS).first()
+        if not counts or not counts['total_loans']:
+            return
+        deltas = _nested_counter()
+        for field, count in counts.items():
+            deltas[Writer][previous_writer_id][field] -= count
+            deltas[Writer][writer_id][field] += count
+        _apply_deltas(deltas)
+        invalidate(Writer)
+
+
+def return_loan(loan):
+    """Marca un préstamo como devuelto de forma atómica.
+
+    Usa un ``UPDATE`` condicionado a ``is_active=True``, de modo que si
+    dos peticiones devuelven el mismo préstamo a la vez solo una de ellas
+    lo consigue y los contadores se ajustan una única vez.
+
+    Args:
+        loan: Instancia de Loan a devolver; se actualiza en memoria
+
+    Returns:
+        bool: True si se ha devuelto, False si ya estaba devuelto
+    """
+    return_date = timezone.now()
+    with transaction.atomic():
+        updated = Loan.objects.filter(pk=loan.pk, is_active=True).update(
+            is_active=False, return_date=return_date
+        )
+        if not updated:
+            return False
+        after = stored_loan_state(loan.pk)
+        loan_changed(dict(after, is_active=True), after)
+        invalidate(Loan)
+    loan.is_active = False
+    loan.return_date = return_date
+    return True
+
+
+def _count_subquery(lookup, **filters):
+    """Subconsulta que cuenta los préstamos de la fila exterior."""
+    loans = Loan.objects.filter(**{lookup: OuterRef('pk')}, **filters).order_by()
+    return Coalesce(
+        Subquery(loans.values(lookup).annotate(count=Count('id')).values('count')),
+        0,
+    )
+
+
+def recount_loan_counters():
+    """Recalcula desde cero los contadores de todas las filas.
+
+    Ejecuta un ``UPDATE`` con subconsultas por modelo. Se usa tras cargas
+    masivas que no emiten señales y desde ``rebuild_statistics``.
+    """
+    with transaction.atomic():
+        for model, lookup in LOAN_LOOKUPS.items():
+            model.objects.update(
+                total_loans=_count_subquery(lookup),
+                active_loans=_count_subquery(lookup, is_active=True),
+                completed_loans=_count_subquery(lookup, is_active=False),
+            )
+        invalidate(*LOAN_LOOKUPS)
+
+
+def counter_drift():
+    """Filas cuyos contadores no coinciden con los préstamos reales.
+
+    Returns:
+        list: Tuplas ``(modelo, id)`` con contadores desviados
+    """
+    drift = []
+    for model, lookup in LOAN_LOOKUPS.items():
+        rows = model.objects.annotate(
+            real_total=_count_subquery(lookup),
+            real_active=_count_subquery(lookup, is_active=True),
+        ).exclude(
+            total_loans=F('real_total'),
+            active_loans=F('real_active'),
+            completed_loans=F('real_total') - F('real_active'),
+        ).values_list('pk', flat=True)
+        drift.extend((model.__name__, pk) for pk in rows)
+    return drift
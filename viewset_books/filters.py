@@ -0,0 +1,138 @@
+"""Filtros de préstamos comunes a las vistas de historial y estadísticas.
+
+Parámetros admitidos en la query string:
+
+- ``status``: ``active`` (préstamos activos) o ``returned`` (devueltos)
+- ``from`` / ``to``: rango de fechas de préstamo (``YYYY-MM-DD``), ambos
+  extremos incluidos
+- ``buckets``: agrupación temporal de los recuentos (``daily``, ``weekly``
+  o ``monthly``), ver :func:`parse_buckets`
+
+Los filtros se combinan con el libro, usuario o bibliotecario de la vista,
+de modo que las consultas usan los índices compuestos
+``(relación, is_active, -loan_date)`` de :class:`~viewset_books.models.Loan`.
+
+:data:`LOAN_FILTERS` y :data:`BOOK_FILTERS` son los filtros de los
+listados ``/loans/`` y ``/books/`` (ver :mod:`api_server.filters`).
+"""
+import datetime
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from api_server.filters import ContainsFilter, ExactFilter, PrefixFilter, QueryFilter
+from viewset_books.statistics import BUCKET_KINDS
+
+#: Valores de ``?status=`` y el valor de ``is_active`` que seleccionan
+STATUS_VALUES = {'active': True, 'returned': False}
+
+
+def _parse_day(params, name):
+    """Lee un parámetro de fecha ``YYYY-MM-DD`` o None si no se indica."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise serializers.ValidationError({name: 'Fecha inválida. Use el formato YYYY-MM-DD.'})
+    return day
+
+
+def _day_start(day):
+    """Primer instante de un día en la zona horaria actual."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def parse_loan_filters(request):
+    """Interpreta los filtros de préstamos de la petición.
+
+    Args:
+        request: Petición HTTP actual
+
+    Returns:
+        dict: Argumentos para ``Loan.objects.filter``; vacío si no hay filtros
+
+    Raises:
+        ValidationError: Si algún parámetro no es válido
+    """
+    params = request.query_params
+    filters = {}
+    status = params.get('status')
+    if status:
+        if status not in STATUS_VALUES:
+            raise serializers.ValidationError({'status': "Valor inválido. Use 'active' o 'returned'."})
+        filters['is_active'] = STATUS_VALUES[status]
+    date_from = _parse_day(params, 'from')
+    date_to = _parse_day(params, 'to')
+    if date_from and date_to and date_from > date_to:
+        raise serializers.ValidationError({'from': "'from' no puede ser posterior a 'to'."})
+    if date_from:
+        filters['loan_date__gte'] = _day_start(date_from)
+    if date_to:
+        filters['loan_date__lt'] = _day_start(date_to + datetime.timedelta(days=1))
+    return filters
+
+
+def parse_buckets(request):
+    """Lee el periodo de agrupación de ``?buckets=``.
+
+    Args:
+        request: Petición HTTP actual
+
+    Returns:
+        str: Clave de ``BUCKET_KINDS`` o None si no se pide agrupación
+
+    Raises:
+        ValidationError: Si el periodo no es válido
+    """
+    period = request.query_params.get('buckets')
+    if not period:
+        return None
+    if period not in BUCKET_KINDS:
+        raise serializers.ValidationError(
+            {'buckets': f"Valor inválido. Use {', '.join(map(repr, BUCKET_KINDS))}."}
+        )
+    return period
+
+
+class LoanPeriodFilter(QueryFilter):
+    """``?status=``, ``?from=`` y ``?to=`` como filtro de listado.
+
+    Sin relación, ``is_active`` y el rango de fechas usan los índices
+    ``(is_active, -loan_date)`` y ``(-loan_date, -id)``; junto a
+    ``?user=``, ``?book=`` o ``?bibliotecary=`` los compuestos de cada
+    relación.
+    """
+
+    def __init__(self):
+        """Declara el filtro con los tres parámetros."""
+        super().__init__('status/from/to')
+
+    def filter(self, queryset, request):
+        """Aplica los filtros de :func:`parse_loan_filters`."""
+        filters = parse_loan_filters(request)
+        return queryset.filter(**filters), bool(filters)
+
+
+#: Filtros de ``/loans/``: todos usan un índice de ``Loan``
+LOAN_FILTERS = (
+    ExactFilter('user', 'user_id'),
+    ExactFilter('book', 'book_id'),
+    ExactFilter('bibliotecary', 'bibliotecary_id'),
+    LoanPeriodFilter(),
+)
+
+#: Filtros de ``/books/``; ``title__contains`` necesita otro filtro indexado
+BOOK_FILTERS = (
+    ExactFilter('writer', 'writer_id'),
+    PrefixFilter('title__startswith', 'title'),
+    ContainsFilter('title__contains', 'title'),
+)
+
+#: Filtros de ``/writers/``
+WRITER_FILTERS = (
+    PrefixFilter('name__startswith', 'name'),
+    ContainsFilter('name__contains', 'name'),
+)
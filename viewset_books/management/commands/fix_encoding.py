@@ -0,0 +1,192 @@
+import codecs
+import mmap
+import os
+import tempfile
+import chardet
+from django.core.management.base import BaseCommand, CommandError
+
+#: Bytes leídos para detectar la codificación
+SAMPLE_SIZE = 64 * 1024
+
+#: Bytes transcodificados en cada paso
+CHUNK_SIZE = 1024 * 1024
+
+#: Marcas de orden de bytes y la codificación que indican (las de UTF-32
+#: primero porque empiezan igual que las de UTF-16)
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(path, sample_size=SAMPLE_SIZE):
+    """Detecta la codificación de un fichero a partir de una muestra.
+
+    Si el fichero empieza por una marca de orden de bytes (BOM), como los
+    generados por ``dumpdata > fichero`` en PowerShell, se usa esa
+    codificación; si no, se analiza con ``chardet`` solo el principio del
+    fichero. ASCII se trata como UTF-8, del que es un subconjunto.
+
+    Args:
+        path: Ruta del fichero
+        sample_size: Bytes como máximo que se analizan
+
+    Returns:
+        str: Nombre de la codificación, normalizado por :mod:`codecs`
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(sample_size)
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    encoding = chardet.detect(sample)['encoding'] or 'utf-8'
+    encoding = codecs.lookup(encoding).name
+    return 'utf-8' if encoding == 'ascii' else encoding
+
+
+def iter_chunks(f, chunk_size=CHUNK_SIZE, use_mmap=False):
+    """Recorre un fichero binario en bloques de tamaño fijo.
+
+    Args:
+        f: Fichero abierto en modo binario
+        chunk_size: Bytes por bloque
+        use_mmap: Si es True lee el fichero mapeado en memoria, sin copiar
+            los bloques a buffers intermedios del sistema de ficheros
+
+    Yields:
+        bytes: Bloques consecutivos del fichero
+    """
+    if not use_mmap:
+        yield from iter(lambda: f.read(chunk_size), b'')
+        return
+    if os.fstat(f.fileno()).st_size == 0:
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for start in range(0, len(mapped), chunk_size):
+            yield mapped[start:start + chunk_size]
+
+
+def transcode(source, target, encoding, chunk_size=CHUNK_SIZE, use_mmap=False):
+    """Transcodifica un fichero a UTF-8 por bloques.
+
+    Usa un decodificador incremental, de modo que los caracteres
+    multibyte partidos entre dos bloques se decodifican correctamente y la
+    memoria usada no depende del tamaño del fichero. La BOM de la entrada
+    se descarta.
+
+    Args:
+        source: Ruta del fichero de entrada
+        target: Fichero de salida abierto en modo binario
+        encoding: Codificación de la entrada
+        chunk_size: Bytes leídos por bloque
+        use_mmap: Si es True lee la entrada mapeada en memoria
+
+    Returns:
+        int: Bytes escritos
+
+    Raises:
+        UnicodeDecodeError: Si la entrada no es válida en ``encoding``
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+    written = 0
+    with open(source, 'rb') as f:
+        for chunk in iter_chunks(f, chunk_size, use_mmap):
+            data = decoder.decode(chunk).encode('utf-8')
+            target.write(data)
+            written += len(data)
+        data = decoder.decode(b'', final=True).encode('utf-8')
+        target.write(data)
+    return written + len(data)
+
+
+def fix_encoding(source, output=None, encoding=None, chunk_size=CHUNK_SIZE,
+                 use_mmap=False, sample_size=SAMPLE_SIZE):
+    """Convierte un fichero a UTF-8 y lo sustituye de forma atómica.
+
+    La salida se escribe en un fichero temporal del mismo directorio que
+    el destino y se renombra con :func:`os.replace` al terminar, así que
+    si el proceso falla el fichero original queda intacto.
+
+    Args:
+        source: Ruta del fichero de entrada
+        output: Ruta de salida; por defecto se reemplaza la entrada
+        encoding: Codificación de la entrada; por defecto se detecta
+        chunk_size: Bytes leídos por bloque
+        use_mmap: Si es True lee la entrada mapeada en memoria
+        sample_size: Bytes analizados para detectar la codificación
+
+    Returns:
+        tuple: ``(codificación, bytes escritos)``; 0 bytes si la entrada ya
+        estaba en UTF-8 sin BOM y se convierte sobre sí misma
+    """
+    encoding = encoding or detect_encoding(source, sample_size)
+    output = output or source
+    if encoding == 'utf-8' and output == source:
+        # Ya es UTF-8 sin BOM: basta con comprobar que es válido
+        with open(os.devnull, 'wb') as sink:
+            transcode(source, sink, encoding, chunk_size, use_mmap)
+        return encoding, 0
+    directory = os.path.dirname(os.path.abspath(output))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.fix_encoding-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as target:
+            written = transcode(source, target, encoding, chunk_size, use_mmap)
+            target.flush()
+            os.fsync(target.fileno())
+        if os.path.exists(output):
+            os.chmod(tmp_path, os.stat(output).st_mode & 0o777)
+        os.replace(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return encoding, written
+
+
+class Command(BaseCommand):
+    """Convierte un volcado (por ejemplo ``datadump.json``) a UTF-8.
+
+    Sustituye al script ``fix_encoding.py``: detecta la codificación con una
+    muestra acotada en lugar de analizar el fichero completo y transcodifica
+    por bloques de tamaño fijo sin cargar ni reescribir el JSON, por lo que
+    la memoria usada es constante aunque el volcado ocupe varios gigabytes.
+    """
+    help = 'Convierte un fichero a UTF-8 por bloques, sustituyéndolo de forma atómica'
+
+    def add_arguments(self, parser):
+        """Define las opciones del comando."""
+        parser.add_argument('path', nargs='?', default='datadump.json',
+                            help='Fichero a convertir (por defecto datadump.json)')
+        parser.add_argument('--output', help='Escribe en otro fichero en lugar de reemplazar la entrada')
+        parser.add_argument('--encoding', help='Codificación de la entrada; por defecto se detecta')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Bytes transcodificados por bloque')
+        parser.add_argument('--sample-size', type=int, default=SAMPLE_SIZE,
+                            help='Bytes analizados para detectar la codificación')
+        parser.add_argument('--mmap', action='store_true',
+                            help='Lee la entrada mapeada en memoria')
+
+    def handle(self, *args, **options):
+        """Detecta la codificación y convierte el fichero."""
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'No existe el fichero {path}')
+        encoding = options['encoding'] or detect_encoding(path, options['sample_size'])
+        self.stdout.write(f'Codificación detectada: {encoding}')
+        try:
+            _, written = fix_encoding(
+                path, output=options['output'], encoding=encoding,
+                chunk_size=options['chunk_size'], use_mmap=options['mmap'],
+            )
+        except (UnicodeDecodeError, LookupError) as exc:
+            raise CommandError(
+                f'No se pudo convertir desde {encoding}: {exc}. '
+                'Indique la codificación con --encoding.'
+            )
+        if written == 0 and not options['output']:
+            self.stdout.write(self.style.SUCCESS('El archivo ya está en UTF-8'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Archivo convertido a UTF-8 exitosamente'))
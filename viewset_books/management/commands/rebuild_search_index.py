@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from viewset_books import search
+
+
+class Command(BaseCommand):
+    """Reconstruye el índice de búsqueda de texto completo del catálogo.
+
+    Compara el índice con las tablas de libros y escritores, informa de los
+    documentos desfasados y lo reconstruye en una sola transacción (ver
+    :func:`viewset_books.search.rebuild_index`). Con ``--check`` solo
+    comprueba y termina con error si encuentra diferencias.
+    """
+    help = 'Reconstruye el índice de búsqueda de libros y escritores'
+
+    def add_arguments(self, parser):
+        """Define las opciones del comando."""
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo comprueba el índice; falla si está desfasado',
+        )
+
+    def handle(self, *args, **options):
+        """Ejecuta la comprobación y, si procede, la reconstrucción."""
+        if search.get_backend() is None:
+            raise CommandError('La búsqueda no está disponible con esta base de datos.')
+
+        stale, orphans = search.index_drift()
+        if stale:
+            self.stdout.write(f'Libros sin indexar o desfasados: {stale}')
+        if orphans:
+            self.stdout.write(f'Documentos de libros eliminados: {orphans}')
+
+        if options['check']:
+            if stale or orphans:
+                raise CommandError('El índice de búsqueda no está al día.')
+            self.stdout.write(self.style.SUCCESS('El índice de búsqueda está al día.'))
+            return
+
+        start = time.perf_counter()
+        count = search.rebuild_index()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice de búsqueda reconstruido: {count} libros en {elapsed:.2f} s'
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from viewset_books.models import LibraryStatistics
+from viewset_books import counters, statistics
+
+
+class Command(BaseCommand):
+    """Reconstruye la instantánea de estadísticas y los contadores de préstamos.
+
+    Compara la instantánea guardada y los contadores desnormalizados con los
+    valores calculados desde cero, informa de las diferencias y los
+    reconstruye. Con ``--check`` solo comprueba y termina con error si
+    encuentra desviaciones.
+    """
+    help = 'Reconstruye la instantánea de estadísticas y detecta desviaciones'
+
+    def add_arguments(self, parser):
+        """Define las opciones del comando."""
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo comprueba la instantánea; falla si está desviada',
+        )
+
+    def handle(self, *args, **options):
+        """Ejecuta la comprobación y, si procede, la reconstrucción."""
+        snapshot = LibraryStatistics.objects.filter(pk=statistics.SNAPSHOT_PK).first()
+        drift = statistics.snapshot_drift(snapshot) if snapshot is not None else {}
+        counter_drift = counters.counter_drift()
+
+        if snapshot is None:
+            self.stdout.write('No existe instantánea de estadísticas.')
+        for field, (stored, actual) in drift.items():
+            self.stdout.write(f'Desviación en {field}: guardado={stored!r} real={actual!r}')
+        for model_name, pk in counter_drift:
+            self.stdout.write(f'Contadores desviados en {model_name} id={pk}')
+
+        if options['check']:
+            if snapshot is None or drift or counter_drift:
+                raise CommandError('La instantánea de estadísticas no está al día.')
+            self.stdout.write(self.style.SUCCESS('La instantánea de estadísticas está al día.'))
+            return
+
+        counters.recount_loan_counters()
+        statistics.rebuild_snapshot()
+        self.stdout.write(self.style.SUCCESS('Instantánea de estadísticas reconstruida.'))
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_bibliotecary', '0001_initial'),
+        ('viewset_books', '0003_loan_bibliotecary'),
+        ('viewset_users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['-loan_date', '-id'], name='loan_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_books', '0004_loan_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibraryStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_writers', models.IntegerField(default=0)),
+                ('total_books', models.IntegerField(default=0)),
+                ('total_users', models.IntegerField(default=0)),
+                ('total_bibliotecaries', models.IntegerField(default=0)),
+                ('total_loans', models.IntegerField(default=0)),
+                ('active_loans', models.IntegerField(default=0)),
+                ('completed_loans', models.IntegerField(default=0)),
+                ('top_books', models.JSONField(default=list)),
+                ('top_users', models.JSONField(default=list)),
+                ('top_writers', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'library statistics',
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_loan_counters(apps, schema_editor):
+    """Inicializa los contadores de préstamos a partir de la tabla Loan."""
+    Loan = apps.get_model('viewset_books', 'Loan')
+    lookups = {
+        ('viewset_books', 'Book'): 'book',
+        ('viewset_books', 'Writer'): 'book__writer',
+        ('viewset_users', 'User'): 'user',
+        ('viewset_bibliotecary', 'Bibliotecary'): 'bibliotecary',
+    }
+
+    def count(lookup, **filters):
+        loans = Loan.objects.filter(**{lookup: OuterRef('pk')}, **filters).order_by()
+        return Coalesce(
+            Subquery(loans.values(lookup).annotate(count=Count('id')).values('count')),
+            0,
+        )
+
+    for (app_label, model_name), lookup in lookups.items():
+        apps.get_model(app_label, model_name).objects.update(
+            total_loans=count(lookup),
+            active_loans=count(lookup, is_active=True),
+            completed_loans=count(lookup, is_active=False),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_bibliotecary', '0002_loan_counters'),
+        ('viewset_books', '0005_librarystatistics'),
+        ('viewset_users', '0002_loan_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='active_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='completed_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='total_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='writer',
+            name='active_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='writer',
+            name='completed_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='writer',
+            name='total_loans',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_loan_counters, migrations.RunPython.noop),
+    ]
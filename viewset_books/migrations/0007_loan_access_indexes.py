@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_bibliotecary', '0002_loan_counters'),
+        ('viewset_books', '0006_loan_counters'),
+        ('viewset_users', '0002_loan_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['user', 'is_active', '-loan_date'], name='loan_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['book', 'is_active', '-loan_date'], name='loan_book_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['bibliotecary', 'is_active', '-loan_date'], name='loan_biblio_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['is_active', '-loan_date'], name='loan_active_date_idx'),
+        ),
+    ]
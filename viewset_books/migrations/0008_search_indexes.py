@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:34
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_bibliotecary', '0002_loan_counters'),
+        ('viewset_books', '0007_loan_access_indexes'),
+        ('viewset_users', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='book_title_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['user', '-loan_date'], name='loan_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['book', '-loan_date'], name='loan_book_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['bibliotecary', '-loan_date'], name='loan_biblio_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='writer',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='writer_name_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:05
+
+from django.db import migrations
+
+# Copia fija de la tabla y los lotes de viewset_books.search en esta
+# migración, para que los cambios posteriores de ese módulo no la alteren
+SEARCH_TABLE = 'viewset_books_booksearch'
+BATCH_SIZE = 500
+
+CREATE_TABLE = {
+    'sqlite': (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+        f"title, writer_name, tokenize = 'unicode61 remove_diacritics 2', "
+        f"prefix = '2 3')"
+    ),
+    'mysql': (
+        f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+        f'book_id INTEGER NOT NULL PRIMARY KEY, '
+        f'title VARCHAR(200) NOT NULL, '
+        f'writer_name VARCHAR(100) NOT NULL, '
+        f'FULLTEXT INDEX booksearch_text_idx (title, writer_name)'
+        f') ENGINE=InnoDB'
+    ),
+}
+
+INSERT_DOCUMENTS = {
+    'sqlite': f'INSERT INTO {SEARCH_TABLE} (rowid, title, writer_name) VALUES (%s, %s, %s)',
+    'mysql': f'INSERT INTO {SEARCH_TABLE} (book_id, title, writer_name) VALUES (%s, %s, %s)',
+}
+
+
+def create_search_index(apps, schema_editor):
+    """Crea la tabla de búsqueda del motor e indexa los libros existentes."""
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_TABLE:
+        return
+    Book = apps.get_model('viewset_books', 'Book')
+    books = Book.objects.using(schema_editor.connection.alias).order_by('id')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE[vendor])
+        last_id = 0
+        while True:
+            rows = list(books.filter(id__gt=last_id)
+                        .values_list('id', 'title', 'writer__name')[:BATCH_SIZE])
+            if not rows:
+                break
+            cursor.executemany(INSERT_DOCUMENTS[vendor], rows)
+            last_id = rows[-1][0]
+
+
+def drop_search_index(apps, schema_editor):
+    """Elimina la tabla de búsqueda."""
+    if schema_editor.connection.vendor in CREATE_TABLE:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_books', '0008_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
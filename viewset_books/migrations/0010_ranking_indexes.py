@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_books', '0009_book_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='librarystatistics',
+            name='rankings_built_version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='librarystatistics',
+            name='rankings_version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-total_loans', 'id'], name='book_ranking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='writer',
+            index=models.Index(fields=['-total_loans', 'id'], name='writer_ranking_idx'),
+        ),
+    ]
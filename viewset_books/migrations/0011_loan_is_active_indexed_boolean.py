@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:40
+
+import viewset_books.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_books', '0010_ranking_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loan',
+            name='is_active',
+            field=viewset_books.models.IndexedBooleanField(default=True),
+        ),
+    ]
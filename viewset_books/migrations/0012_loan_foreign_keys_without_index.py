@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_bibliotecary', '0002_loan_counters'),
+        ('viewset_books', '0011_loan_is_active_indexed_boolean'),
+        ('viewset_users', '0004_ranking_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loan',
+            name='bibliotecary',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='managed_loans', to='viewset_bibliotecary.bibliotecary'),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='book',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='viewset_books.book'),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='viewset_users.user'),
+        ),
+    ]
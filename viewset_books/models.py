@@ -1,24 +1,76 @@
 from django.db import models
+from django.db.models.functions import Lower
+from django.db.models.lookups import BuiltinLookup
 from viewset_users.models import User
 
+
+class IndexedBooleanField(models.BooleanField):
+    """``BooleanField`` cuyos filtros ``campo=True`` pueden usar índices.
+
+    Por defecto Django traduce ``campo=True`` a ``WHERE campo`` en SQLite,
+    una condición que no puede aprovechar un índice compuesto que incluya
+    la columna. Este campo registra :class:`IndexedBooleanExact`, que genera
+    ``WHERE campo = true`` en todos los motores, igual que ya ocurre en
+    MySQL.
+    """
+
+
+@IndexedBooleanField.register_lookup
+class IndexedBooleanExact(BuiltinLookup):
+    """Lookup ``exact`` que siempre compara la columna con el valor."""
+    lookup_name = 'exact'
+
+
 class Writer(models.Model):
-    """Modelo que representa a un escritor/autor de libros."""
+    """Modelo que representa a un escritor/autor de libros.
+
+    Los campos ``total_loans``, ``active_loans`` y ``completed_loans``
+    son contadores desnormalizados de los préstamos de sus libros,
+    mantenidos por :mod:`viewset_books.counters`.
+    """
     name = models.CharField(max_length=100, unique=True)
+    total_loans = models.IntegerField(default=0, editable=False)
+    active_loans = models.IntegerField(default=0, editable=False)
+    completed_loans = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Búsqueda por prefijo sin distinguir mayúsculas (?name__startswith=)
+            models.Index(Lower('name'), name='writer_name_lower_idx'),
+            # Ranking de escritores más prestados (ver viewset_books.statistics)
+            models.Index(fields=['-total_loans', 'id'], name='writer_ranking_idx'),
+        ]
 
     def __str__(self):
         """Retorna el nombre del escritor."""
         return self.name
 
+
 class Book(models.Model):
-    """Modelo que representa un libro con su título y escritor asociado."""
+    """Modelo que representa un libro con su título y escritor asociado.
+
+    Incluye contadores desnormalizados de sus préstamos (ver
+    :mod:`viewset_books.counters`).
+    """
     title = models.CharField(max_length=200, unique=True)
     writer = models.ForeignKey(Writer, on_delete=models.CASCADE, related_name='books')
-    
+    total_loans = models.IntegerField(default=0, editable=False)
+    active_loans = models.IntegerField(default=0, editable=False)
+    completed_loans = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Búsqueda por prefijo sin distinguir mayúsculas (?title__startswith=)
+            models.Index(Lower('title'), name='book_title_lower_idx'),
+            # Ranking de libros más prestados (ver viewset_books.statistics)
+            models.Index(fields=['-total_loans', 'id'], name='book_ranking_idx'),
+        ]
 
     def __str__(self):
         """Retorna el título del libro y su autor."""
         return f"{self.title} by {self.writer.name}"
 
+
 class Loan(models.Model):
     """Modelo que representa el préstamo de un libro a un usuario.
     
@@ -26,21 +78,91 @@ class Loan(models.Model):
     el usuario que lo solicitó, el bibliotecario que gestionó el préstamo,
     las fechas de préstamo y devolución, y el estado activo.
     """
-    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='loans')
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loans')
+    # Sin índice propio: los índices compuestos (relación, -loan_date) de
+    # Meta.indexes empiezan por la misma columna y resuelven los filtros,
+    # joins, borrados en cascada y SET_NULL sobre ella
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='loans', db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loans', db_index=False)
     bibliotecary = models.ForeignKey('viewset_bibliotecary.Bibliotecary', on_delete=models.SET_NULL, 
-    null=True, blank=True, related_name='managed_loans')
+    null=True, blank=True, related_name='managed_loans', db_index=False)
     loan_date = models.DateTimeField(auto_now_add=True)
     return_date = models.DateTimeField(null=True, blank=True)
-    is_active = models.BooleanField(default=True)
+    # Los filtros por is_active deben poder usar los índices compuestos
+    is_active = IndexedBooleanField(default=True)
 
     class Meta:
         ordering = ['-loan_date']
+        indexes = [
+            # Índice usado por la paginación por cursor (-loan_date, -id)
+            models.Index(fields=['-loan_date', '-id'], name='loan_date_id_idx'),
+            # Préstamos (activos) de un usuario, libro o bibliotecario por fecha
+            models.Index(fields=['user', 'is_active', '-loan_date'], name='loan_user_active_idx'),
+            models.Index(fields=['book', 'is_active', '-loan_date'], name='loan_book_active_idx'),
+            models.Index(
+                fields=['bibliotecary', 'is_active', '-loan_date'], name='loan_biblio_active_idx'
+            ),
+            # Listado global de préstamos activos por fecha
+            models.Index(fields=['is_active', '-loan_date'], name='loan_active_date_idx'),
+            # Filtros ?user=, ?book= y ?bibliotecary= de /loans/ sin ?status=,
+            # ordenados por fecha sin recorrer los préstamos de otros
+            models.Index(fields=['user', '-loan_date'], name='loan_user_date_idx'),
+            models.Index(fields=['book', '-loan_date'], name='loan_book_date_idx'),
+            models.Index(fields=['bibliotecary', '-loan_date'], name='loan_biblio_date_idx'),
+        ]
     
+    def delete(self, *args, **kwargs):
+        """Elimina el préstamo y lo descuenta de los contadores.
+
+        ``Loan`` no tiene receptores de ``pre_delete``/``post_delete`` para
+        que Django pueda borrar los préstamos en cascada con un único
+        ``DELETE`` (ver :func:`viewset_books.counters.loans_cascaded`). El
+        borrado de un préstamo suelto ajusta los contadores aquí;
+        ``QuerySet.delete()`` no lo hace y requiere ``rebuild_statistics``.
+        """
+        from viewset_books import counters
+        return counters.delete_loan(self, lambda: super(Loan, self).delete(*args, **kwargs))
+
     def __str__(self):
         """Retorna una representación del préstamo con libro, usuario y estado."""
         status = "Activo" if self.is_active else "Devuelto"
         return f"{self.book.title} - {self.user.username} ({status})"
 
 
+class LibraryStatistics(models.Model):
+    """Instantánea persistente de las estadísticas globales de la biblioteca.
+
+    Guarda los contadores del catálogo y de préstamos junto con los rankings
+    top-N, de modo que ``library_statistics`` se sirve leyendo una sola fila.
+    Existe como mucho una fila (``pk=1``) y se mantiene de forma incremental
+    mediante señales (ver :mod:`viewset_books.signals`); el comando
+    ``rebuild_statistics`` la recalcula desde cero y detecta desviaciones.
 
+    Los rankings no se recalculan al escribir: cada cambio que les afecta
+    incrementa ``rankings_version`` y la siguiente lectura los recalcula
+    si ``rankings_built_version`` se ha quedado atrás.
+    """
+    total_writers = models.IntegerField(default=0)
+    total_books = models.IntegerField(default=0)
+    total_users = models.IntegerField(default=0)
+    total_bibliotecaries = models.IntegerField(default=0)
+    total_loans = models.IntegerField(default=0)
+    active_loans = models.IntegerField(default=0)
+    completed_loans = models.IntegerField(default=0)
+    top_books = models.JSONField(default=list)
+    top_users = models.JSONField(default=list)
+    top_writers = models.JSONField(default=list)
+    rankings_version = models.IntegerField(default=0)
+    rankings_built_version = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'library statistics'
+
+    @property
+    def rankings_stale(self):
+        """Indica si los rankings guardados no reflejan los últimos cambios."""
+        return self.rankings_built_version != self.rankings_version
+
+    def __str__(self):
+        """Retorna una descripción de la instantánea y su fecha."""
+        return f"Estadísticas de la biblioteca ({self.updated_at})"
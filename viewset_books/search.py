@@ -0,0 +1,312 @@
+"""Índice de búsqueda de texto completo del catálogo.
+
+Cada libro tiene un documento en la tabla ``viewset_books_booksearch`` con
+su título y el nombre de su escritor, de modo que una búsqueda encuentra
+libros por palabras de cualquiera de los dos y ordena los resultados por
+relevancia. ``LIKE '%palabra%'`` no puede usar índices y recorre toda la
+tabla de libros; el índice invertido solo lee las entradas de las
+palabras buscadas.
+
+La tabla depende del motor:
+
+- SQLite: tabla virtual FTS5 (el ``rowid`` es el id del libro) con el
+  tokenizador ``unicode61`` sin diacríticos e índices de prefijos de 2 y 3
+  letras, ordenada con ``bm25()`` sobre todas las coincidencias (el título
+  pesa el doble que el escritor)
+- MySQL: tabla InnoDB con un índice ``FULLTEXT (title, writer_name)``,
+  consultada con ``MATCH ... AGAINST`` en modo booleano. Un único índice
+  sobre ambas columnas permite buscar en las dos a la vez; con índices
+  separados en ``Book.title`` y ``Writer.name`` la condición ``OR`` no
+  podría resolverse con ellos. Las palabras vacías de InnoDB y las más
+  cortas que ``innodb_ft_min_token_size`` no se indexan.
+
+Todas las palabras de la consulta son obligatorias y la última se busca
+como prefijo, para poder buscar mientras se escribe (``cien años sol``
+encuentra *Cien años de soledad*). Solo la última: expandir un prefijo
+recorre todas las palabras del índice que empiezan por él.
+
+Las señales de :mod:`viewset_books.signals` actualizan el índice al
+guardar o borrar libros y escritores, dentro de la misma transacción. Las
+operaciones que no emiten señales (``bulk_create``, ``QuerySet.update``,
+``loaddata``) deben llamar a :func:`index_books` o ejecutar
+``manage.py rebuild_search_index``.
+"""
+import re
+from django.db import connection, connections, transaction
+from rest_framework import serializers
+from rest_framework.exceptions import APIException
+from viewset_books.models import Book
+
+#: Tabla con un documento por libro
+SEARCH_TABLE = 'viewset_books_booksearch'
+
+#: Máximo de palabras de una consulta; el resto se ignora
+MAX_TERMS = 8
+
+#: Libros leídos y escritos en el índice por lote
+BATCH_SIZE = 500
+
+_WORD = re.compile(r'\w+')
+
+
+class SearchUnavailable(APIException):
+    """El motor de base de datos no tiene índice de búsqueda."""
+    status_code = 503
+    default_detail = 'La búsqueda no está disponible con esta base de datos.'
+    default_code = 'search_unavailable'
+
+
+def parse_query(text):
+    """Extrae las palabras de una consulta.
+
+    Args:
+        text: Texto recibido del usuario
+
+    Returns:
+        list: Hasta :data:`MAX_TERMS` palabras en minúsculas
+
+    Raises:
+        ValidationError: Si el texto no contiene ninguna palabra
+    """
+    terms = _WORD.findall((text or '').lower())[:MAX_TERMS]
+    if not terms:
+        raise serializers.ValidationError({'q': 'Indique al menos una palabra.'})
+    return terms
+
+
+class SQLiteSearchBackend:
+    """Documentos en una tabla virtual FTS5 de SQLite."""
+    key = 'rowid'
+
+    def create(self, cursor):
+        """Crea la tabla del índice."""
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            f"title, writer_name, tokenize = 'unicode61 remove_diacritics 2', "
+            f"prefix = '2 3')"
+        )
+
+    def drop(self, cursor):
+        """Elimina la tabla del índice."""
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def upsert(self, cursor, rows):
+        """Escribe los documentos ``(book_id, title, writer_name)``."""
+        self.delete(cursor, [row[0] for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, writer_name) VALUES (%s, %s, %s)',
+            rows,
+        )
+
+    def delete(self, cursor, book_ids):
+        """Elimina los documentos de los libros indicados."""
+        if book_ids:
+            placeholders = ', '.join(['%s'] * len(book_ids))
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', list(book_ids)
+            )
+
+    def clear(self, cursor):
+        """Vacía el índice."""
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def search(self, cursor, terms, limit, offset):
+        """Ids de los libros que contienen todas las palabras, por relevancia.
+
+        ``bm25()`` se calcula para cada coincidencia, de modo que una
+        palabra presente en buena parte del catálogo cuesta más que una
+        rara. El orden solo conserva las ``limit + offset`` mejores; la
+        vista limita el desplazamiento con
+        :data:`~viewset_books.views.SEARCH_MAX_OFFSET`.
+        """
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        cursor.execute(
+            f'SELECT rowid, -bm25({SEARCH_TABLE}, 2.0, 1.0) AS score FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY score DESC, rowid LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+class MySQLSearchBackend:
+    """Documentos en una tabla InnoDB con índice ``FULLTEXT``."""
+    key = 'book_id'
+
+    def create(self, cursor):
+        """Crea la tabla del índice."""
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            f'book_id INTEGER NOT NULL PRIMARY KEY, '
+            f'title VARCHAR(200) NOT NULL, '
+            f'writer_name VARCHAR(100) NOT NULL, '
+            f'FULLTEXT INDEX booksearch_text_idx (title, writer_name)'
+            f') ENGINE=InnoDB'
+        )
+
+    def drop(self, cursor):
+        """Elimina la tabla del índice."""
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def upsert(self, cursor, rows):
+        """Escribe los documentos ``(book_id, title, writer_name)``."""
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (book_id, title, writer_name) VALUES (%s, %s, %s) '
+            f'ON DUPLICATE KEY UPDATE title = VALUES(title), writer_name = VALUES(writer_name)',
+            rows,
+        )
+
+    def delete(self, cursor, book_ids):
+        """Elimina los documentos de los libros indicados."""
+        if book_ids:
+            placeholders = ', '.join(['%s'] * len(book_ids))
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE book_id IN ({placeholders})', list(book_ids)
+            )
+
+    def clear(self, cursor):
+        """Vacía el índice."""
+        cursor.execute(f'TRUNCATE TABLE {SEARCH_TABLE}')
+
+    def search(self, cursor, terms, limit, offset):
+        """Ids de los libros que contienen todas las palabras, por relevancia."""
+        against = ' '.join(f'+{term}' for term in terms) + '*'
+        cursor.execute(
+            f'SELECT book_id, MATCH (title, writer_name) AGAINST (%s IN BOOLEAN MODE) AS score '
+            f'FROM {SEARCH_TABLE} '
+            f'WHERE MATCH (title, writer_name) AGAINST (%s IN BOOLEAN MODE) '
+            f'ORDER BY score DESC, book_id LIMIT %s OFFSET %s',
+            [against, against, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'mysql': MySQLSearchBackend,
+}
+
+
+def get_backend(db_connection=None):
+    """Backend de búsqueda del motor de la conexión, o ``None`` si no hay."""
+    backend_class = BACKENDS.get((db_connection or connection).vendor)
+    return backend_class() if backend_class else None
+
+
+def _documents(books):
+    """Lotes de documentos ``(id, título, escritor)`` de un queryset de libros."""
+    last_id = 0
+    while True:
+        rows = list(
+            books.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'title', 'writer__name')[:BATCH_SIZE]
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def index_books(books):
+    """Añade o actualiza en el índice los documentos de unos libros.
+
+    Args:
+        books: QuerySet de :class:`~viewset_books.models.Book`
+
+    Returns:
+        int: Documentos escritos
+    """
+    db_connection = connections[books.db]
+    backend = get_backend(db_connection)
+    if backend is None:
+        return 0
+    count = 0
+    # En autocommit cada fila de executemany sería una transacción
+    with transaction.atomic(using=books.db, savepoint=False), db_connection.cursor() as cursor:
+        for rows in _documents(books):
+            backend.upsert(cursor, rows)
+            count += len(rows)
+    return count
+
+
+def remove_books(book_ids):
+    """Elimina del índice los documentos de unos libros.
+
+    Args:
+        book_ids: Ids de los libros eliminados
+    """
+    backend = get_backend()
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.delete(cursor, list(book_ids))
+
+
+def rebuild_index():
+    """Vacía el índice y lo vuelve a llenar con todos los libros.
+
+    Se ejecuta en una transacción: las búsquedas concurrentes ven el
+    índice anterior hasta que termina.
+
+    Returns:
+        int: Documentos indexados
+    """
+    backend = get_backend()
+    if backend is None:
+        raise SearchUnavailable()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            backend.clear(cursor)
+        return index_books(Book.objects.all())
+
+
+def index_drift():
+    """Compara el índice con las tablas de libros y escritores.
+
+    Returns:
+        tuple: ``(desfasados, sobrantes)``: libros sin documento o con
+        título o escritor distintos, y documentos de libros que ya no existen
+    """
+    backend = get_backend()
+    if backend is None:
+        raise SearchUnavailable()
+    book_table = Book._meta.db_table
+    writer_table = Book._meta.get_field('writer').related_model._meta.db_table
+    key = f's.{backend.key}'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {book_table} b '
+            f'JOIN {writer_table} w ON w.id = b.writer_id '
+            f'LEFT JOIN {SEARCH_TABLE} s ON {key} = b.id '
+            f'WHERE {key} IS NULL OR s.title <> b.title OR s.writer_name <> w.name'
+        )
+        stale = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {SEARCH_TABLE} s '
+            f'LEFT JOIN {book_table} b ON b.id = {key} WHERE b.id IS NULL'
+        )
+        orphans = cursor.fetchone()[0]
+    return stale, orphans
+
+
+def search_books(text, limit, offset=0):
+    """Busca libros por palabras de su título o del nombre de su escritor.
+
+    Args:
+        text: Consulta del usuario
+        limit: Máximo de resultados
+        offset: Resultados a saltar
+
+    Returns:
+        list: Pares ``(book_id, score)`` de mayor a menor relevancia
+
+    Raises:
+        ValidationError: Si la consulta no contiene palabras
+        SearchUnavailable: Si el motor no tiene índice de búsqueda
+    """
+    terms = parse_query(text)
+    backend = get_backend()
+    if backend is None:
+        raise SearchUnavailable()
+    with connection.cursor() as cursor:
+        return [(book_id, float(score))
+                for book_id, score in backend.search(cursor, terms, limit, offset)]
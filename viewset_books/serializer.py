@@ -1,14 +1,24 @@
 from rest_framework import serializers
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch
 from .models import Book, Writer, Loan
 from viewset_users.models import User
 from viewset_bibliotecary.models import Bibliotecary
 from django.utils import timezone
+from api_server.cache import invalidate
+from api_server.serializers import (
+    SparseFieldsMixin, BulkCreateListSerializer, comparison_key, duplicate_errors,
+    existing_values, in_chunks,
+)
+from viewset_books import counters, search, statistics
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para el modelo Book.
     
     Incluye el nombre del escritor como campo de solo lectura.
     """
+    select_related_fields = ('writer',)
+
     writer_name = serializers.CharField(source='writer.name', read_only=True)
 
     class Meta:
@@ -16,18 +26,103 @@ class BookSerializer(serializers.ModelSerializer):
         fields = 'id', 'title', 'writer_name'
         read_only_fields = 'id',
 
-class WriterSerializer(serializers.ModelSerializer):
+def parse_books_mode(request):
+    """Interpreta el parámetro ``?books=`` de los listados de escritores.
+
+    Valores admitidos:
+
+    - ``all`` (por defecto): todos los libros del escritor
+    - ``none``: no se incluyen libros
+    - ``count``: solo el número de libros (``books_count``)
+    - ``first:N``: los N primeros libros por id y ``books_count``
+
+    Args:
+        request: Petición HTTP actual o None
+
+    Returns:
+        tuple: ``(modo, límite)``, donde el límite solo aplica a ``first``
+
+    Raises:
+        ValidationError: Si el valor del parámetro no es válido
+    """
+    value = request.query_params.get('books', 'all') if request is not None else 'all'
+    if value in ('all', 'none', 'count'):
+        return value, None
+    mode, _, limit = value.partition(':')
+    if mode == 'first' and limit.isdigit() and int(limit) > 0:
+        return mode, int(limit)
+    raise serializers.ValidationError(
+        {'books': "Valor inválido. Use 'all', 'none', 'count' o 'first:N'."}
+    )
+
+
+class WriterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para el modelo Writer.
     
-    Incluye la lista de libros del escritor anidados.
+    Incluye la lista de libros del escritor anidados. Con el parámetro
+    ``?books=`` se puede omitir la lista, sustituirla por su tamaño o
+    limitarla a los primeros N libros (ver :func:`parse_books_mode`).
     """
     books = BookSerializer(many=True, read_only=True)
+    books_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Writer
-        fields = 'id', 'name', 'books'
+        fields = 'id', 'name', 'books', 'books_count'
+
+    def __init__(self, *args, **kwargs):
+        """Ajusta los campos de libros según el parámetro ``?books=``."""
+        super().__init__(*args, **kwargs)
+        mode, _ = parse_books_mode(self.context.get('request'))
+        if mode in ('none', 'count'):
+            self.fields.pop('books', None)
+        if mode in ('all', 'none'):
+            self.fields.pop('books_count', None)
+        if mode == 'first' and 'books' in self.fields:
+            self.fields['books'] = BookSerializer(
+                many=True, read_only=True, source='first_books'
+            )
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        """Precarga los libros de todos los escritores en una sola consulta.
 
-class BookCreateSerializer(serializers.ModelSerializer):
+        Los libros precargados conservan la referencia al escritor padre,
+        por lo que ``writer_name`` no vuelve a consultar la base de datos.
+
+        Los libros y su número no se cargan si ``?fields=``/``?exclude=``
+        los dejan fuera. ``name`` solo se difiere si tampoco se muestran
+        los libros, que lo leen para su ``writer_name``.
+
+        Args:
+            queryset: QuerySet de escritores
+            request: Petición HTTP con los parámetros ``?books=``,
+                ``?fields=`` y ``?exclude=``
+
+        Returns:
+            QuerySet: El queryset con los libros precargados o contados
+        """
+        mode, limit = parse_books_mode(request)
+        selected = cls.selected_fields(request)
+        wanted = ('books', 'books_count') if selected is None else selected
+        if selected is not None:
+            shows_books = mode in ('all', 'first') and 'books' in selected
+            queryset = queryset.only('id', *(['name'] if shows_books or 'name' in selected else []))
+        if mode == 'none':
+            return queryset
+        if mode in ('count', 'first') and 'books_count' in wanted:
+            queryset = queryset.annotate(books_count=Count('books'))
+        if mode == 'count' or 'books' not in wanted:
+            return queryset
+        books = Book.objects.order_by('id')
+        if mode == 'first':
+            # Un queryset recortado solo puede precargarse en un atributo aparte
+            return queryset.prefetch_related(
+                Prefetch('books', queryset=books[:limit], to_attr='first_books')
+            )
+        return queryset.prefetch_related(Prefetch('books', queryset=books))
+
+class BookCreateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer especializado para la creación de libros.
     
     Permite crear libros usando el nombre del escritor en lugar del ID.
@@ -54,12 +149,114 @@ class BookCreateSerializer(serializers.ModelSerializer):
         book = Book.objects.create(writer=writer, **validated_data)
         return book
 
-class LoanSerializer(serializers.ModelSerializer):
+class BookBulkListSerializer(BulkCreateListSerializer):
+    """Alta masiva de libros indicando el nombre de su escritor.
+
+    Resuelve todos los escritores con una consulta, crea los que faltan en
+    un único lote e inserta los libros con ``bulk_create``.
+    """
+
+    def validate_items(self, items):
+        """Comprueba que los títulos no se repitan ni existan ya."""
+        existing = existing_values(Book, 'title', (item['title'] for item in items))
+        return duplicate_errors(
+            items, 'title', existing, 'Ya existe un libro con este título.'
+        )
+
+    def resolve_writers(self, names):
+        """Ids de los escritores por nombre, creando los que no existen.
+
+        Los nombres se comparan como en la base de datos (ver
+        :func:`~api_server.serializers.comparison_key`). Los que faltan se
+        insertan en un punto de guardado; si otra importación crea alguno a
+        la vez, se reintenta con el resto, de modo que ``created_writers``
+        cuenta solo las filas insertadas aquí.
+
+        Args:
+            names: Nombres de escritores
+
+        Returns:
+            dict: ``{clave del nombre: id}`` de todos los nombres indicados
+        """
+        names = {comparison_key(name): name for name in names}
+        writers = self._writer_ids(names.values())
+        missing = names.keys() - writers.keys()
+        self.created_writers = 0
+        while missing:
+            try:
+                with transaction.atomic():
+                    Writer.objects.bulk_create(
+                        [Writer(name=names[key]) for key in sorted(missing)],
+                        batch_size=self.get_batch_size(),
+                    )
+            except IntegrityError:
+                # Otra importación ha creado alguno a la vez: se buscan de
+                # nuevo y se insertan solo los restantes
+                found = self._writer_ids(names[key] for key in missing)
+                if not found:
+                    raise
+                writers.update(found)
+                missing -= found.keys()
+                continue
+            self.created_writers += len(missing)
+            writers.update(self._writer_ids(names[key] for key in missing))
+            break
+        return writers
+
+    def _writer_ids(self, names):
+        """``{clave del nombre: id}`` de los escritores existentes con esos nombres."""
+        writers = {}
+        for chunk in in_chunks(names):
+            writers.update(
+                (comparison_key(name), pk)
+                for name, pk in Writer.objects.filter(name__in=chunk).values_list('name', 'id')
+            )
+        return writers
+
+    def build_instances(self, items):
+        """Construye los libros con el id de su escritor ya resuelto."""
+        writers = self.resolve_writers(item['writer_name'] for item in items)
+        return [
+            Book(title=item['title'], writer_id=writers[comparison_key(item['writer_name'])])
+            for item in items
+        ]
+
+    def after_create(self, instances):
+        """Cuenta los libros y escritores nuevos y los añade al índice de búsqueda.
+
+        Los libros se buscan por título porque ``bulk_create`` no devuelve
+        sus ids en todos los motores.
+        """
+        statistics.adjust_counters(
+            total_books=len(instances), total_writers=self.created_writers,
+            rankings_changed=True,
+        )
+        for titles in in_chunks([book.title for book in instances]):
+            search.index_books(Book.objects.filter(title__in=titles))
+        invalidate(Book, Writer)
+
+
+class BookBulkSerializer(BookCreateSerializer):
+    """Elemento de un alta masiva de libros (ver :class:`BookBulkListSerializer`).
+
+    La unicidad del título se comprueba para todo el lote en lugar de con
+    una consulta por libro.
+    """
+
+    class Meta(BookCreateSerializer.Meta):
+        list_serializer_class = BookBulkListSerializer
+        extra_kwargs = {'title': {'validators': []}}
+
+
+class LoanSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para el modelo Loan.
     
     Proporciona campos para escribir IDs y campos de solo lectura
-    para mostrar nombres y títulos relacionados.
+    para mostrar nombres y títulos relacionados. Las relaciones que
+    lee se cargan con ``select_related`` mediante ``setup_eager_loading``.
     """
+    select_related_fields = ('book', 'user', 'bibliotecary')
+
     book_title = serializers.CharField(source='book.title', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
     bibliotecary_name = serializers.CharField(source='bibliotecary.username', read_only=True)
@@ -93,7 +290,7 @@ class LoanSerializer(serializers.ModelSerializer):
         validated_data['return_date'] = None
         return super().create(validated_data)
 
-class LoanReturnSerializer(serializers.ModelSerializer):
+class LoanReturnSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para gestionar la devolución de préstamos.
     
     Solo expone campos de solo lectura para mostrar el estado
@@ -102,4 +299,78 @@ class LoanReturnSerializer(serializers.ModelSerializer):
     class Meta:
         model = Loan
         fields = ['id', 'return_date', 'is_active']
-        read_only_fields = ['id', 'return_date', 'is_active']
\ No newline at end of file
+        read_only_fields = ['id', 'return_date', 'is_active']
+
+
+class LoanBulkListSerializer(BulkCreateListSerializer):
+    """Alta masiva de préstamos activos.
+
+    Comprueba la existencia de libros, usuarios y bibliotecarios con una
+    consulta por tabla y ajusta los contadores de todo el lote de una vez.
+    """
+
+    def validate_items(self, items):
+        """Comprueba que existan los libros, usuarios y bibliotecarios."""
+        self.book_writers = {}
+        for chunk in in_chunks({item['book_id'] for item in items}):
+            self.book_writers.update(
+                Book.objects.filter(id__in=chunk).values_list('id', 'writer_id')
+            )
+        users = existing_values(User, 'id', (item['user_id'] for item in items))
+        bibliotecaries = existing_values(
+            Bibliotecary, 'id',
+            (item['bibliotecary_id'] for item in items if item.get('bibliotecary_id')),
+        )
+        errors = {}
+        for index, item in enumerate(items):
+            if item['book_id'] not in self.book_writers:
+                errors.setdefault(index, {})['book_id'] = ['El libro no existe.']
+            if item['user_id'] not in users:
+                errors.setdefault(index, {})['user_id'] = ['El usuario no existe.']
+            bibliotecary_id = item.get('bibliotecary_id')
+            if bibliotecary_id and bibliotecary_id not in bibliotecaries:
+                errors.setdefault(index, {})['bibliotecary_id'] = ['El bibliotecario no existe.']
+        return errors
+
+    def build_instances(self, items):
+        """Construye los préstamos como activos y sin fecha de devolución."""
+        return [
+            Loan(
+                book_id=item['book_id'],
+                user_id=item['user_id'],
+                bibliotecary_id=item.get('bibliotecary_id'),
+                is_active=True,
+                return_date=None,
+            )
+            for item in items
+        ]
+
+    def after_create(self, instances):
+        """Suma los préstamos nuevos a los contadores y a la instantánea."""
+        counters.loans_changed([
+            (None, {
+                'book_id': loan.book_id,
+                'user_id': loan.user_id,
+                'bibliotecary_id': loan.bibliotecary_id,
+                'book__writer_id': self.book_writers[loan.book_id],
+                'is_active': True,
+            })
+            for loan in instances
+        ])
+        invalidate(Loan)
+
+
+class LoanBulkSerializer(serializers.Serializer):
+    """Elemento de un alta masiva de préstamos (ver :class:`LoanBulkListSerializer`).
+
+    Usa ids enteros en lugar de ``PrimaryKeyRelatedField`` para no hacer
+    una consulta por préstamo y relación.
+    """
+    book_id = serializers.IntegerField()
+    user_id = serializers.IntegerField()
+    bibliotecary_id = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Loan
+        list_serializer_class = LoanBulkListSerializer
+
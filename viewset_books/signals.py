@@ -0,0 +1,190 @@
+"""Mantenimiento incremental de contadores y estadísticas.
+
+Cada alta, modificación o baja de préstamos, libros, escritores, usuarios
+y bibliotecarios ajusta los contadores de :class:`LibraryStatistics` con
+``F()`` y marca los rankings como desfasados cuando les afectan (se
+recalculan al leer la instantánea, ver :func:`statistics.get_snapshot`). Los
+cambios de préstamos actualizan además los contadores desnormalizados de
+cada entidad (ver :mod:`viewset_books.counters`). Las operaciones que no
+emiten señales (``QuerySet.update``, ``bulk_create``) deben ajustarlos por
+su cuenta o ejecutar ``manage.py rebuild_statistics``.
+
+``Loan`` no tiene receptores de borrado, para que sus cascadas sean un
+único ``DELETE``: el borrado de un préstamo suelto se descuenta en
+:meth:`Loan.delete` y los de un libro o usuario en su ``pre_delete`` (ver
+:func:`counters.loans_cascaded`). Al borrar un bibliotecario sus préstamos
+se conservan con ``bibliotecary=NULL`` y no cambia ningún otro contador.
+
+Los cambios de libros y escritores actualizan también el índice de
+búsqueda (ver :mod:`viewset_books.search`).
+"""
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from api_server.cache import track_versions
+from viewset_books.models import Book, Writer, Loan, LibraryStatistics
+from viewset_books import counters, search, statistics
+from viewset_users.models import User
+from viewset_bibliotecary.models import Bibliotecary
+
+
+def _store_previous_values(instance, *fields):
+    """Guarda en la instancia los valores de la fila antes de modificarla."""
+    instance._previous_values = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._previous_values = type(instance).objects.filter(
+            pk=instance.pk
+        ).values(*fields).first()
+
+
+def _invalidate_snapshot():
+    """Descarta la instantánea para que se reconstruya en la próxima lectura."""
+    LibraryStatistics.objects.filter(pk=statistics.SNAPSHOT_PK).delete()
+
+
+@receiver(pre_save, sender=Loan)
+def loan_pre_save(sender, instance, raw=False, **kwargs):
+    """Recuerda el estado previo de un préstamo que se va a modificar."""
+    instance._previous_state = None
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._previous_state = counters.stored_loan_state(instance.pk)
+
+
+@receiver(post_save, sender=Loan)
+def loan_post_save(sender, instance, created, raw=False, **kwargs):
+    """Ajusta contadores e instantánea tras crear o editar un préstamo."""
+    if raw:
+        _invalidate_snapshot()
+        return
+    before = None if created else getattr(instance, '_previous_state', None)
+    if created or before is not None:
+        counters.loan_changed(before, counters.loan_state(instance))
+
+
+@receiver(pre_save, sender=Book)
+def book_pre_save(sender, instance, raw=False, **kwargs):
+    """Recuerda el título y el escritor previos de un libro que se va a modificar."""
+    if not raw:
+        _store_previous_values(instance, 'title', 'writer_id')
+
+
+@receiver(post_save, sender=Book)
+def book_post_save(sender, instance, created, raw=False, **kwargs):
+    """Cuenta los libros nuevos y actualiza los rankings y el índice de búsqueda.
+
+    Solo se reindexan los libros nuevos o con otro título o escritor. Si
+    el libro cambia de escritor, sus préstamos pasan a contar para el
+    nuevo (ver :func:`counters.book_reassigned`).
+    """
+    if raw:
+        _invalidate_snapshot()
+        return
+    previous = getattr(instance, '_previous_values', None)
+    if created:
+        statistics.adjust_counters(total_books=1, rankings_changed=True)
+    elif previous == {'title': instance.title, 'writer_id': instance.writer_id}:
+        # Ni los rankings ni el documento de búsqueda cambian
+        return
+    else:
+        if previous is not None and previous['writer_id'] != instance.writer_id:
+            counters.book_reassigned(instance.pk, previous['writer_id'], instance.writer_id)
+        statistics.invalidate_rankings()
+    search.index_books(Book.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_delete, sender=Book)
+def book_pre_delete(sender, instance, **kwargs):
+    """Descuenta los préstamos del libro, que se borran en cascada sin señales."""
+    counters.loans_cascaded(Book, instance.pk)
+
+
+@receiver(post_delete, sender=Book)
+def book_post_delete(sender, instance, **kwargs):
+    """Descuenta un libro eliminado de la instantánea y del índice de búsqueda."""
+    statistics.adjust_counters(total_books=-1, rankings_changed=True)
+    search.remove_books([instance.pk])
+
+
+@receiver(pre_save, sender=Writer)
+def writer_pre_save(sender, instance, raw=False, **kwargs):
+    """Recuerda el nombre previo de un escritor que se va a modificar."""
+    if not raw:
+        _store_previous_values(instance, 'name')
+
+
+@receiver(post_save, sender=Writer)
+def writer_post_save(sender, instance, created, raw=False, **kwargs):
+    """Cuenta los escritores nuevos y propaga los cambios de nombre.
+
+    El nombre aparece en los rankings y en los documentos de búsqueda de
+    sus libros, que solo se reescriben si ha cambiado.
+    """
+    if raw:
+        _invalidate_snapshot()
+        return
+    if created:
+        statistics.adjust_counters(total_writers=1, rankings_changed=True)
+        return
+    previous = getattr(instance, '_previous_values', None)
+    if previous is not None and previous['name'] != instance.name:
+        statistics.invalidate_rankings()
+        search.index_books(Book.objects.filter(writer_id=instance.pk))
+
+
+@receiver(post_delete, sender=Writer)
+def writer_post_delete(sender, instance, **kwargs):
+    """Descuenta un escritor eliminado de la instantánea."""
+    statistics.adjust_counters(total_writers=-1, rankings_changed=True)
+
+
+@receiver(pre_save, sender=User)
+def user_pre_save(sender, instance, raw=False, **kwargs):
+    """Recuerda el nombre de usuario previo de un usuario que se va a modificar."""
+    if not raw:
+        _store_previous_values(instance, 'username')
+
+
+@receiver(post_save, sender=User)
+def user_post_save(sender, instance, created, raw=False, **kwargs):
+    """Cuenta los usuarios nuevos y propaga los cambios de nombre al ranking."""
+    if raw:
+        _invalidate_snapshot()
+        return
+    if created:
+        statistics.adjust_counters(total_users=1, rankings_changed=True)
+        return
+    previous = getattr(instance, '_previous_values', None)
+    if previous is not None and previous['username'] != instance.username:
+        statistics.invalidate_rankings()
+
+
+@receiver(pre_delete, sender=User)
+def user_pre_delete(sender, instance, **kwargs):
+    """Descuenta los préstamos del usuario, que se borran en cascada sin señales."""
+    counters.loans_cascaded(User, instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_post_delete(sender, instance, **kwargs):
+    """Descuenta un usuario eliminado de la instantánea."""
+    statistics.adjust_counters(total_users=-1, rankings_changed=True)
+
+
+@receiver(post_save, sender=Bibliotecary)
+def bibliotecary_post_save(sender, instance, created, raw=False, **kwargs):
+    """Cuenta los bibliotecarios nuevos."""
+    if raw:
+        _invalidate_snapshot()
+    elif created:
+        statistics.adjust_counters(total_bibliotecaries=1)
+
+
+@receiver(post_delete, sender=Bibliotecary)
+def bibliotecary_post_delete(sender, instance, **kwargs):
+    """Descuenta un bibliotecario eliminado."""
+    statistics.adjust_counters(total_bibliotecaries=-1)
+
+
+# Las escrituras invalidan las respuestas cacheadas que leen estas tablas.
+# Los borrados de préstamos invalidan por su cuenta (ver Loan.delete)
+track_versions(Book, Writer, LibraryStatistics)
+track_versions(Loan, deletes=False)
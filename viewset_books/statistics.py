@@ -0,0 +1,318 @@
+from functools import partial
+from django.db import transaction
+from django.db.models import Count, DateField, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+from viewset_books.models import Book, Writer, Loan, LibraryStatistics
+from viewset_users.models import User
+from viewset_bibliotecary.models import Bibliotecary
+from api_server.concurrency import gather_queries
+
+#: Número de elementos de cada ranking de la biblioteca
+TOP_N = 5
+
+#: Clave primaria de la única fila de :class:`LibraryStatistics`
+SNAPSHOT_PK = 1
+
+CATALOG_FIELDS = ('total_writers', 'total_books', 'total_users', 'total_bibliotecaries')
+LOAN_FIELDS = ('total_loans', 'active_loans', 'completed_loans')
+RANKING_FIELDS = ('top_books', 'top_users', 'top_writers')
+
+
+#: Periodos de agrupación de :func:`loan_buckets` y su unidad en ``Trunc``
+BUCKET_KINDS = {'daily': 'day', 'weekly': 'week', 'monthly': 'month'}
+
+
+def loan_totals(queryset, unique_users=False):
+    """Cuenta préstamos totales, activos y completados en una sola consulta.
+
+    Args:
+        queryset: QuerySet de préstamos sobre el que contar
+        unique_users: Si es True cuenta también los usuarios distintos
+
+    Returns:
+        dict: ``total_loans``, ``active_loans`` y ``completed_loans`` (y
+        ``unique_users`` si se pide)
+    """
+    counts = {
+        'total_loans': Count('id'),
+        'active_loans': Count('id', filter=Q(is_active=True)),
+        'completed_loans': Count('id', filter=Q(is_active=False)),
+    }
+    if unique_users:
+        counts['unique_users'] = Count('user', distinct=True)
+    return queryset.aggregate(**counts)
+
+
+def loan_buckets(queryset, period):
+    """Cuenta préstamos por día, semana o mes agrupando en la base de datos.
+
+    La fecha se trunca con ``Trunc`` en la propia consulta (``GROUP BY``),
+    de modo que solo se leen tantas filas como periodos con préstamos. Las
+    semanas empiezan en lunes. Los periodos sin préstamos no aparecen.
+
+    Args:
+        queryset: QuerySet de préstamos sobre el que contar
+        period: Clave de :data:`BUCKET_KINDS` (``daily``, ``weekly``, ``monthly``)
+
+    Returns:
+        list: Diccionarios con ``period`` (fecha de inicio), ``total_loans``
+        y ``active_loans``, en orden cronológico
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(period=Trunc('loan_date', BUCKET_KINDS[period], output_field=DateField()))
+        .values('period')
+        .annotate(total_loans=Count('id'), active_loans=Count('id', filter=Q(is_active=True)))
+        .order_by('period')
+    )
+    return list(rows)
+
+
+def _ranking(queryset, limit):
+    """Ordena por el contador ``total_loans`` y aplica el límite.
+
+    El orden coincide con los índices ``*_ranking_idx``, así que la
+    consulta lee solo las primeras ``limit`` filas del índice.
+    """
+    queryset = queryset.order_by('-total_loans', 'id')
+    if limit is not None:
+        queryset = queryset[:limit]
+    return queryset
+
+
+def top_books(limit=TOP_N):
+    """Libros más prestados con su escritor y número de préstamos.
+
+    Se ordenan por el contador desnormalizado ``Book.total_loans``, sin
+    agrupar préstamos.
+
+    Args:
+        limit: Número máximo de libros, o None para no limitar
+
+    Returns:
+        list: Diccionarios con ``id``, ``title``, ``writer`` y ``total_loans``
+    """
+    rows = _ranking(Book.objects.all(), limit).values_list(
+        'id', 'title', 'writer__name', 'total_loans'
+    )
+    return [
+        {'id': pk, 'title': title, 'writer': writer, 'total_loans': total_loans}
+        for pk, title, writer, total_loans in rows
+    ]
+
+
+def top_users(limit=TOP_N):
+    """Usuarios con más préstamos (mismos argumentos que :func:`top_books`)."""
+    rows = _ranking(User.objects.all(), limit).values_list('id', 'username', 'total_loans')
+    return [
+        {'id': pk, 'username': username, 'total_loans': total_loans}
+        for pk, username, total_loans in rows
+    ]
+
+
+def _book_count():
+    """Subconsulta que cuenta los libros del escritor de la fila exterior."""
+    books = Book.objects.filter(writer=OuterRef('pk')).order_by()
+    return Coalesce(
+        Subquery(books.values('writer').annotate(count=Count('id')).values('count')), 0
+    )
+
+
+def top_writers(limit=TOP_N):
+    """Escritores con más préstamos, incluyendo su número de libros."""
+    rows = _ranking(Writer.objects.annotate(book_count=_book_count()), limit).values_list(
+        'id', 'name', 'book_count', 'total_loans'
+    )
+    return [
+        {'id': pk, 'name': name, 'total_books': book_count, 'total_loans': total_loans}
+        for pk, name, book_count, total_loans in rows
+    ]
+
+
+RANKINGS = {
+    'top_books': top_books,
+    'top_users': top_users,
+    'top_writers': top_writers,
+}
+
+
+def _library_queries():
+    """Consultas independientes de las estadísticas globales, en orden."""
+    return [
+        Writer.objects.count,
+        Book.objects.count,
+        User.objects.count,
+        Bibliotecary.objects.count,
+        partial(loan_totals, Loan.objects.all()),
+        *RANKINGS.values(),
+    ]
+
+
+def _library_statistics(results):
+    """Agrupa los resultados de :func:`_library_queries` en secciones."""
+    catalog = results[:len(CATALOG_FIELDS)]
+    loans = results[len(CATALOG_FIELDS)]
+    rankings = results[len(CATALOG_FIELDS) + 1:]
+    return {
+        'catalog': dict(zip(CATALOG_FIELDS, catalog)),
+        'loans': loans,
+        'rankings': dict(zip(RANKINGS, rankings)),
+    }
+
+
+def compute_library_statistics():
+    """Calcula las estadísticas globales de la biblioteca desde cero.
+
+    Ejecuta un número fijo de consultas: un ``COUNT`` por tabla del
+    catálogo, un agregado condicional sobre ``Loan`` y una consulta por
+    ranking sobre los contadores desnormalizados (8 en total).
+
+    Returns:
+        dict: Secciones ``catalog``, ``loans`` y ``rankings``
+    """
+    return _library_statistics([query() for query in _library_queries()])
+
+
+async def acompute_library_statistics():
+    """Variante asíncrona de :func:`compute_library_statistics`.
+
+    Las ocho consultas son independientes y se lanzan a la vez con
+    :func:`~api_server.concurrency.gather_queries`.
+
+    Returns:
+        dict: Secciones ``catalog``, ``loans`` y ``rankings``
+    """
+    return _library_statistics(await gather_queries(*_library_queries()))
+
+
+def snapshot_as_dict(snapshot):
+    """Convierte la instantánea al formato de :func:`compute_library_statistics`."""
+    return {
+        'catalog': {field: getattr(snapshot, field) for field in CATALOG_FIELDS},
+        'loans': {field: getattr(snapshot, field) for field in LOAN_FIELDS},
+        'rankings': {field: getattr(snapshot, field) for field in RANKING_FIELDS},
+    }
+
+
+def _flatten(data):
+    """Aplana las secciones de las estadísticas en campos del modelo."""
+    return {**data['catalog'], **data['loans'], **data['rankings']}
+
+
+def _rankings_version():
+    """Versión actual de los rankings de la instantánea (0 si no existe)."""
+    return LibraryStatistics.objects.filter(pk=SNAPSHOT_PK).values_list(
+        'rankings_version', flat=True
+    ).first() or 0
+
+
+def rebuild_snapshot():
+    """Recalcula la instantánea desde cero y la guarda.
+
+    Returns:
+        LibraryStatistics: La instantánea actualizada
+    """
+    with transaction.atomic():
+        # Se lee antes de calcular: un cambio concurrente deja los rankings
+        # marcados como desfasados en lugar de perderse
+        version = _rankings_version()
+        snapshot, _ = LibraryStatistics.objects.update_or_create(
+            pk=SNAPSHOT_PK, defaults={
+                **_flatten(compute_library_statistics()),
+                'rankings_built_version': version,
+            }
+        )
+    return snapshot
+
+
+def refresh_rankings(snapshot):
+    """Recalcula los rankings desfasados de una instantánea ya leída.
+
+    Se llama al leer la instantánea, no al escribir: las escrituras solo
+    incrementan ``rankings_version`` (ver :func:`adjust_counters`). Los
+    rankings se leen de los contadores desnormalizados con tres consultas
+    sobre índices y se guardan con un ``UPDATE`` condicionado a no
+    sobrescribir unos más recientes, sin bloquear la fila.
+
+    Args:
+        snapshot: Instancia de :class:`LibraryStatistics`; se actualiza en
+            memoria
+    """
+    version = snapshot.rankings_version
+    rankings = {name: compute() for name, compute in RANKINGS.items()}
+    LibraryStatistics.objects.filter(
+        pk=SNAPSHOT_PK, rankings_built_version__lt=version
+    ).update(rankings_built_version=version, **rankings)
+    for name, ranking in rankings.items():
+        setattr(snapshot, name, ranking)
+    snapshot.rankings_built_version = version
+
+
+def get_snapshot():
+    """Retorna la instantánea con los rankings al día.
+
+    La construye si todavía no existe y recalcula los rankings si algún
+    cambio los ha dejado desfasados.
+    """
+    snapshot = LibraryStatistics.objects.filter(pk=SNAPSHOT_PK).first()
+    if snapshot is None:
+        return rebuild_snapshot()
+    if snapshot.rankings_stale:
+        refresh_rankings(snapshot)
+    return snapshot
+
+
+def snapshot_drift(snapshot):
+    """Compara la instantánea con las estadísticas calculadas desde cero.
+
+    Los rankings marcados como desfasados no cuentan como desviación: se
+    recalculan en la siguiente lectura.
+
+    Args:
+        snapshot: Instancia de :class:`LibraryStatistics`
+
+    Returns:
+        dict: ``{campo: (valor_guardado, valor_real)}`` de los campos que
+        no coinciden; vacío si la instantánea es correcta
+    """
+    stored = _flatten(snapshot_as_dict(snapshot))
+    actual = _flatten(compute_library_statistics())
+    skipped = RANKING_FIELDS if snapshot.rankings_stale else ()
+    return {
+        field: (stored[field], actual[field])
+        for field in actual
+        if field not in skipped and stored[field] != actual[field]
+    }
+
+
+def adjust_counters(rankings_changed=False, **deltas):
+    """Suma los incrementos indicados a los contadores de la instantánea.
+
+    La actualización se hace con expresiones ``F()`` en un único
+    ``UPDATE``, por lo que es segura frente a escrituras concurrentes.
+    Si la instantánea no existe no hace nada: se construirá completa
+    en la siguiente lectura.
+
+    Args:
+        rankings_changed: Si es True incrementa también ``rankings_version``
+            para que la siguiente lectura recalcule los rankings
+        **deltas: Incremento por campo, por ejemplo ``total_loans=1``
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if rankings_changed:
+        updates['rankings_version'] = F('rankings_version') + 1
+    if not updates:
+        return
+    LibraryStatistics.objects.filter(pk=SNAPSHOT_PK).update(
+        updated_at=timezone.now(), **updates
+    )
+
+
+def invalidate_rankings():
+    """Marca los rankings como desfasados sin tocar los contadores.
+
+    Se usa cuando cambia un dato que aparece en los rankings (un título,
+    un nombre) o un alta masiva puede completar un ranking corto.
+    """
+    adjust_counters(rankings_changed=True)
@@ -1,8 +1,33 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from .models import Writer, Book, Loan
+from django.db.models import Count
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+from .models import Writer, Book, Loan, LibraryStatistics
+from .statistics import compute_library_statistics, rebuild_snapshot, get_snapshot, snapshot_as_dict, snapshot_drift
+from .counters import return_loan, counter_drift
+from . import search
+from api_server.explain import ExplainTestMixin, used_indexes
+from api_server.pagination import KeysetCursorPagination
+from unittest.mock import patch
+from api_server.filters import PrefixFilter
+from api_server.cache import get_cache, cache_statistics
+from django.utils.http import http_date
+from django.test.utils import CaptureQueriesContext
+from .serializer import BookBulkListSerializer, BookBulkSerializer, BookSerializer, LoanSerializer
+from .management.commands.fastload import iter_json_array, dependency_order
+from django.conf import settings
 from viewset_users.models import User
 from viewset_bibliotecary.models import Bibliotecary
 
@@ -141,6 +166,14 @@ class LoanModelTest(TestCase):
         self.bibliotecary.delete()
         loan.refresh_from_db()
         self.assertIsNone(loan.bibliotecary)
+    
+    def test_filtro_is_active_compara_la_columna(self):
+        """Test: is_active=True/False genera una comparación que puede usar índices"""
+        Loan.objects.create(book=self.book, user=self.user)
+        for valor in (True, False):
+            queryset = Loan.objects.filter(is_active=valor)
+            self.assertRegex(str(queryset.query), r'"is_active" = (True|False|1|0)\b')
+            self.assertEqual(queryset.count(), int(valor))
 
 
 class WriterAPITest(APITestCase):
@@ -155,7 +188,7 @@ class WriterAPITest(APITestCase):
         """Test: GET /writers/ - Listar escritores"""
         response = self.client.get('/writers/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
     
     def test_crear_escritor(self):
         """Test: POST /writers/ - Crear escritor"""
@@ -178,8 +211,8 @@ class BookAPITest(APITestCase):
         """Test: GET /books/ - Listar libros"""
         response = self.client.get('/books/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Rayuela')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Rayuela')
     
     def test_crear_libro_con_writer_name(self):
         """Test: POST /books/ - Crear libro con writer_name"""
@@ -271,8 +304,8 @@ class LoanAPITest(APITestCase):
         
         response = self.client.get('/loans/active/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertTrue(response.data[0]['is_active'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertTrue(response.data['results'][0]['is_active'])
 
 
 class CustomAPIViewsTest(APITestCase):
@@ -315,3 +348,1808 @@ class CustomAPIViewsTest(APITestCase):
         self.assertIn('loans', response.data)
         self.assertIn('rankings', response.data)
 
+
+
+class UserLoanHistoryTest(APITestCase):
+    """Tests para los filtros, la paginación y el streaming del historial"""
+    
+    def setUp(self):
+        """Configuración inicial: 5 préstamos en días distintos, 2 devueltos"""
+        get_cache().clear()
+        self.writer = Writer.objects.create(name='History W')
+        self.user = User.objects.create(username='history', email='history@example.com', full_name='History')
+        self.loans = []
+        for i in range(5):
+            book = Book.objects.create(title=f'History {i}', writer=self.writer)
+            loan = Loan.objects.create(book=book, user=self.user)
+            Loan.objects.filter(pk=loan.pk).update(
+                loan_date=timezone.make_aware(timezone.datetime(2024, 1, i + 1, 12))
+            )
+            self.loans.append(loan)
+        for loan in self.loans[:2]:
+            return_loan(loan)
+        self.url = f'/api/users/{self.user.id}/loan-history/'
+    
+    def test_paginacion_por_cursor(self):
+        """Test: El historial se pagina por fecha descendente con next/previous"""
+        response = self.client.get(self.url, {'page_size': 2})
+        ids = [entry['loan_id'] for entry in response.data['loan_history']]
+        self.assertEqual(ids, [self.loans[4].id, self.loans[3].id])
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(response.data['statistics']['total_loans'], 5)
+        
+        response = self.client.get(response.data['next'])
+        ids = [entry['loan_id'] for entry in response.data['loan_history']]
+        self.assertEqual(ids, [self.loans[2].id, self.loans[1].id])
+        self.assertIsNotNone(response.data['previous'])
+    
+    def test_filtros(self):
+        """Test: status y rango de fechas filtran historial y estadísticas"""
+        response = self.client.get(self.url, {'status': 'returned'})
+        ids = {entry['loan_id'] for entry in response.data['loan_history']}
+        self.assertEqual(ids, {self.loans[0].id, self.loans[1].id})
+        self.assertEqual(response.data['statistics'], {
+            'total_loans': 2, 'active_loans': 0, 'completed_loans': 2
+        })
+        
+        response = self.client.get(self.url, {'from': '2024-01-02', 'to': '2024-01-04'})
+        ids = [entry['loan_id'] for entry in response.data['loan_history']]
+        self.assertEqual(ids, [self.loans[3].id, self.loans[2].id, self.loans[1].id])
+        self.assertEqual(response.data['statistics'], {
+            'total_loans': 3, 'active_loans': 2, 'completed_loans': 1
+        })
+    
+    def test_filtros_invalidos(self):
+        """Test: Filtros no válidos devuelven 400"""
+        for params in ({'status': 'lost'}, {'from': '2024-13-01'},
+                       {'from': '2024-02-01', 'to': '2024-01-01'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+    
+    def test_consultas_constantes(self):
+        """Test: Página con filtros en un número fijo de consultas"""
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {'status': 'active'})
+    
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_streaming(self):
+        """Test: ?stream=1 envía el historial completo como JSON por lotes"""
+        response = self.client.get(self.url, {'stream': '1', 'status': 'active'})
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(2):
+            data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['user']['username'], 'history')
+        self.assertEqual(data['statistics']['total_loans'], 3)
+        self.assertEqual(
+            [entry['loan_id'] for entry in data['loan_history']],
+            [self.loans[4].id, self.loans[3].id, self.loans[2].id]
+        )
+        self.assertEqual(data['loan_history'][0]['book']['writer'], 'History W')
+    
+    def test_streaming_sin_prestamos(self):
+        """Test: El streaming produce JSON válido con el historial vacío"""
+        response = self.client.get(self.url, {'stream': '1', 'from': '2030-01-01'})
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['loan_history'], [])
+
+
+class BookLoanStatisticsTest(APITestCase):
+    """Tests para las estadísticas, el historial y la agrupación por periodo de un libro"""
+    
+    def setUp(self):
+        """Configuración inicial: 4 préstamos de 3 usuarios en enero y febrero"""
+        get_cache().clear()
+        writer = Writer.objects.create(name='Stats W')
+        self.book = Book.objects.create(title='Stats', writer=writer)
+        users = [
+            User.objects.create(username=f'stats{i}', email=f'stats{i}@example.com', full_name=f'S {i}')
+            for i in range(3)
+        ]
+        dates = [(1, 1), (1, 2), (1, 20), (2, 3)]
+        self.loans = []
+        for i, (month, day) in enumerate(dates):
+            loan = Loan.objects.create(book=self.book, user=users[min(i, 2)])
+            Loan.objects.filter(pk=loan.pk).update(
+                loan_date=timezone.make_aware(timezone.datetime(2024, month, day, 12))
+            )
+            self.loans.append(loan)
+        return_loan(self.loans[0])
+        self.url = f'/api/books/{self.book.id}/loan-statistics/'
+    
+    def test_estadisticas_en_una_consulta(self):
+        """Test: Libro, agregado e historial en tres consultas"""
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['statistics'], {
+            'total_loans': 4, 'active_loans': 3, 'completed_loans': 1, 'unique_users': 3
+        })
+        self.assertNotIn('loans_by_period', response.data)
+    
+    def test_historial_paginado(self):
+        """Test: El historial se pagina por cursor en orden de fecha descendente"""
+        response = self.client.get(self.url, {'page_size': 3})
+        ids = [entry['loan_id'] for entry in response.data['loan_history']]
+        self.assertEqual(ids, [loan.id for loan in reversed(self.loans[1:])])
+        self.assertEqual(response.data['loan_history'][0]['user']['username'], 'stats2')
+        response = self.client.get(response.data['next'])
+        self.assertEqual([entry['loan_id'] for entry in response.data['loan_history']], [self.loans[0].id])
+    
+    def test_filtros(self):
+        """Test: Los filtros se aplican también a las estadísticas"""
+        response = self.client.get(self.url, {'from': '2024-01-02', 'status': 'active'})
+        self.assertEqual(response.data['statistics'], {
+            'total_loans': 3, 'active_loans': 3, 'completed_loans': 0, 'unique_users': 2
+        })
+    
+    def test_agrupacion_por_periodo(self):
+        """Test: ?buckets= agrupa los préstamos por mes y por semana"""
+        response = self.client.get(self.url, {'buckets': 'monthly'})
+        self.assertEqual(
+            [(str(row['period']), row['total_loans'], row['active_loans'])
+             for row in response.data['loans_by_period']],
+            [('2024-01-01', 3, 2), ('2024-02-01', 1, 1)]
+        )
+        response = self.client.get(self.url, {'buckets': 'weekly'})
+        self.assertEqual(
+            [(str(row['period']), row['total_loans']) for row in response.data['loans_by_period']],
+            [('2024-01-01', 2), ('2024-01-15', 1), ('2024-01-29', 1)]
+        )
+        response = self.client.get(self.url, {'buckets': 'daily', 'to': '2024-01-01'})
+        self.assertEqual(len(response.data['loans_by_period']), 1)
+    
+    def test_periodo_invalido(self):
+        """Test: Un periodo desconocido devuelve 400"""
+        response = self.client.get(self.url, {'buckets': 'yearly'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncStatisticsViewsTest(TestCase):
+    """Tests para las variantes asíncronas de las vistas de estadísticas"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        get_cache().clear()
+        writer = Writer.objects.create(name='Async W')
+        self.book = Book.objects.create(title='Async', writer=writer)
+        self.user = User.objects.create(username='async', email='async@example.com', full_name='Async')
+        self.loans = [Loan.objects.create(book=self.book, user=self.user) for _ in range(3)]
+        return_loan(self.loans[0])
+        rebuild_snapshot()
+    
+    def _sincrona(self, url, **params):
+        """JSON de la vista síncrona equivalente"""
+        return json.loads(self.client.get(url, params).content)
+    
+    async def test_historial_de_usuario(self):
+        """Test: Mismo historial y estadísticas que la vista síncrona"""
+        response = await self.async_client.get(
+            f'/api/async/users/{self.user.id}/loan-history/', {'status': 'active', 'page_size': 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['statistics'], {'total_loans': 2, 'active_loans': 2, 'completed_loans': 0})
+        self.assertEqual([entry['loan_id'] for entry in data['loan_history']], [self.loans[2].id])
+        self.assertIn('/api/async/users/', data['next'])
+    
+    async def test_estadisticas_de_libro(self):
+        """Test: Estadísticas, historial y periodos de un libro"""
+        response = await self.async_client.get(
+            f'/api/async/books/{self.book.id}/loan-statistics/', {'buckets': 'monthly'}
+        )
+        data = response.json()
+        self.assertEqual(data['statistics'], {
+            'total_loans': 3, 'active_loans': 2, 'completed_loans': 1, 'unique_users': 1
+        })
+        self.assertEqual(len(data['loan_history']), 3)
+        self.assertEqual(data['loans_by_period'][0]['total_loans'], 3)
+    
+    async def test_errores(self):
+        """Test: 404 para ids inexistentes y 400 para filtros inválidos"""
+        response = await self.async_client.get('/api/async/users/9999/loan-history/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await self.async_client.get(
+            f'/api/async/books/{self.book.id}/loan-statistics/', {'buckets': 'yearly'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('buckets', response.json())
+    
+    async def test_estadisticas_globales(self):
+        """Test: La instantánea y el cálculo en vivo coinciden"""
+        snapshot = (await self.async_client.get('/api/async/library/statistics/')).json()
+        live = (await self.async_client.get('/api/async/library/statistics/', {'live': '1'})).json()
+        self.assertEqual(snapshot, live)
+        self.assertEqual(live['loans']['active_loans'], 2)
+        self.assertEqual(live['rankings']['top_users'][0]['username'], 'async')
+    
+    def test_misma_respuesta_que_la_version_sincrona(self):
+        """Test: Las estadísticas globales coinciden con la vista síncrona"""
+        asincrona = json.loads(self.client.get('/api/async/library/statistics/').content)
+        self.assertEqual(asincrona, self._sincrona('/api/library/statistics/'))
+    
+    def test_mismo_contenido_que_la_version_sincrona(self):
+        """Test: Historial y estadísticas se renderizan igual que en la vista síncrona"""
+        urls = [
+            (f'/api/users/{self.user.id}/loan-history/', {'page_size': 2}),
+            (f'/api/users/{self.user.id}/loan-history/', {'status': 'active'}),
+            (f'/api/books/{self.book.id}/loan-statistics/', {'buckets': 'monthly', 'page_size': 2}),
+            ('/api/users/9999/loan-history/', {}),
+            (f'/api/books/{self.book.id}/loan-statistics/', {'buckets': 'yearly'}),
+        ]
+        for url, params in urls:
+            with self.subTest(url=url, params=params):
+                sincrona = self.client.get(url, params)
+                asincrona = self.client.get(url.replace('/api/', '/api/async/'), params)
+                self.assertEqual(asincrona.status_code, sincrona.status_code)
+                self.assertEqual(asincrona['Content-Type'], sincrona['Content-Type'])
+                # Solo cambian las rutas de los enlaces de paginación
+                self.assertEqual(
+                    asincrona.content.replace(b'/api/async/', b'/api/'), sincrona.content
+                )
+    
+    def test_cache_de_respuestas(self):
+        """Test: La segunda petición se sirve de la caché hasta que hay una escritura"""
+        url = f'/api/async/users/{self.user.id}/loan-history/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        Loan.objects.create(book=self.book, user=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['statistics']['total_loans'], 4)
+    
+    def test_permisos_de_la_api(self):
+        """Test: Las vistas asíncronas aplican los permisos por defecto de DRF"""
+        with patch('rest_framework.views.APIView.permission_classes', [IsAuthenticated]):
+            response = self.client.get(f'/api/async/users/{self.user.id}/loan-history/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_metodo_no_permitido(self):
+        """Test: Solo se admiten peticiones de lectura"""
+        response = self.client.post(f'/api/async/users/{self.user.id}/loan-history/')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class LoanPaginationTest(APITestCase):
+    """Tests para la paginación por cursor de los listados de préstamos"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = APIClient()
+        self.writer = Writer.objects.create(name='Juan Rulfo')
+        self.book = Book.objects.create(title='Pedro Páramo', writer=self.writer)
+        self.user = User.objects.create(
+            username='paginated_reader',
+            email='paginated@example.com',
+            full_name='Paginated Reader'
+        )
+        self.loans = [
+            Loan.objects.create(book=self.book, user=self.user)
+            for _ in range(5)
+        ]
+    
+    def _recorrer_paginas(self, url):
+        """Sigue los cursores ``next`` y devuelve los ids en orden"""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids.extend(loan['id'] for loan in response.data['results'])
+            url = response.data['next']
+        return ids
+    
+    def test_listado_paginado_por_cursor(self):
+        """Test: GET /loans/ devuelve results, next y previous"""
+        response = self.client.get('/loans/?page_size=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+    
+    def test_cursores_recorren_todos_los_prestamos(self):
+        """Test: Los cursores recorren todo sin duplicados, por -loan_date"""
+        ids = self._recorrer_paginas('/loans/?page_size=2')
+        esperados = list(
+            Loan.objects.order_by('-loan_date', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperados)
+    
+    def test_cursores_estables_con_fechas_repetidas(self):
+        """Test: Préstamos con la misma loan_date no se repiten ni se pierden"""
+        Loan.objects.update(loan_date=timezone.now())
+        ids = self._recorrer_paginas('/generic/loans/?page_size=2')
+        self.assertEqual(sorted(ids), sorted(loan.id for loan in self.loans))
+        self.assertEqual(len(ids), len(set(ids)))
+    
+    def test_page_size_limitado(self):
+        """Test: page_size no puede superar el máximo del paginador"""
+        with patch.object(KeysetCursorPagination, 'max_page_size', 3):
+            response = self.client.get('/loans/?page_size=100000')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_fechas_repetidas_sin_desplazamiento(self):
+        """Test: Con loan_date repetida el cursor compara (loan_date, id), sin OFFSET"""
+        Loan.objects.update(loan_date=timezone.now())
+        response = self.client.get('/loans/?page_size=2')
+        response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('OFFSET', sql.upper())
+        self.assertIn('"id" <', sql)
+        previous = self.client.get(response.data['previous'])
+        esperados = list(Loan.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual([loan['id'] for loan in previous.data['results']], esperados[2:4])
+
+    def test_cursor_invalido(self):
+        """Test: Un cursor manipulado responde 404"""
+        response = self.client.get('/loans/?cursor=cD1ub2pzb24%3D')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class LoanQueryCountTest(APITestCase):
+    """Tests: listar N préstamos ejecuta un número constante de consultas"""
+    
+    def setUp(self):
+        """Crea préstamos con libros, usuarios y bibliotecarios distintos"""
+        self.client = APIClient()
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='query_librarian',
+            email='query_librarian@example.com',
+            full_name='Query Librarian'
+        )
+        for i in range(5):
+            writer = Writer.objects.create(name=f'Escritor {i}')
+            book = Book.objects.create(title=f'Libro {i}', writer=writer)
+            user = User.objects.create(
+                username=f'lector{i}',
+                email=f'lector{i}@example.com',
+                full_name=f'Lector {i}'
+            )
+            Loan.objects.create(book=book, user=user, bibliotecary=self.bibliotecary)
+    
+    def test_listar_prestamos(self):
+        """Test: GET /loans/ usa una sola consulta"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/loans/')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['bibliotecary_name'], 'query_librarian')
+    
+    def test_listar_prestamos_activos(self):
+        """Test: GET /loans/active/ usa una sola consulta"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/loans/active/')
+        self.assertEqual(len(response.data['results']), 5)
+    
+    def test_listar_prestamos_vista_generica(self):
+        """Test: GET /generic/loans/ usa una sola consulta"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/generic/loans/')
+        self.assertEqual(len(response.data['results']), 5)
+    
+    def test_detalle_prestamo(self):
+        """Test: GET /loans/{id}/ usa una sola consulta"""
+        loan = Loan.objects.first()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/loans/{loan.id}/')
+        self.assertEqual(response.data['book_title'], loan.book.title)
+    
+    def test_prestamos_gestionados_por_bibliotecario(self):
+        """Test: managed_loans y active_loans usan dos consultas"""
+        for accion in ('managed_loans', 'active_loans'):
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    f'/bibliotecaries/{self.bibliotecary.id}/{accion}/'
+                )
+            self.assertEqual(len(response.data['results']), 5)
+
+
+class ValuesListTest(APITestCase):
+    """Tests: los listados construidos desde values() igualan al serializer"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        get_cache().clear()
+        self.client = APIClient()
+        writer = Writer.objects.create(name='Listado W')
+        user = User.objects.create(
+            username='values_reader', email='values_reader@example.com', full_name='Values Reader'
+        )
+        for i in range(3):
+            book = Book.objects.create(title=f'Listado {i}', writer=writer)
+            Loan.objects.create(book=book, user=user)
+
+    def test_listado_de_prestamos(self):
+        """Test: GET /loans/ devuelve lo mismo que LoanSerializer"""
+        response = self.client.get('/loans/')
+        loans = Loan.objects.order_by('-loan_date', '-id')
+        self.assertEqual(response.data['results'], LoanSerializer(loans, many=True).data)
+
+    def test_listado_de_libros(self):
+        """Test: GET /books/ y /generic/books/ devuelven lo mismo que BookSerializer"""
+        expected = BookSerializer(Book.objects.order_by('id'), many=True).data
+        for url in ('/books/', '/generic/books/'):
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.data['results'], expected)
+
+    def test_paginacion_por_cursor(self):
+        """Test: Los cursores funcionan sobre filas de values()"""
+        first = self.client.get('/loans/?page_size=2')
+        second = self.client.get(first.data['next'])
+        ids = [loan['id'] for loan in first.data['results'] + second.data['results']]
+        self.assertEqual(
+            ids, list(Loan.objects.order_by('-loan_date', '-id').values_list('id', flat=True))
+        )
+
+
+class SparseFieldsTest(APITestCase):
+    """Tests para ?fields= y ?exclude= y su efecto en las consultas"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        get_cache().clear()
+        self.client = APIClient()
+        writer = Writer.objects.create(name='Sparse W')
+        self.book = Book.objects.create(title='Sparse', writer=writer)
+        user = User.objects.create(
+            username='sparse_reader', email='sparse@example.com', full_name='Sparse Reader'
+        )
+        self.loan = Loan.objects.create(book=self.book, user=user)
+
+    def _get(self, url):
+        """GET que devuelve la respuesta y el SQL ejecutado"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_fields_en_listado(self):
+        """Test: /books/?fields=id,title no consulta la tabla de escritores"""
+        response, sql = self._get('/books/?fields=id,title')
+        self.assertEqual(response.data['results'], [{'id': self.book.id, 'title': 'Sparse'}])
+        self.assertNotIn('viewset_books_writer', sql)
+
+    def test_exclude_quita_joins(self):
+        """Test: Excluir los nombres relacionados evita sus JOIN en /loans/"""
+        response, sql = self._get(
+            '/loans/?exclude=book_title,user_username,bibliotecary_name'
+        )
+        self.assertEqual(
+            list(response.data['results'][0]),
+            ['id', 'loan_date', 'return_date', 'is_active'],
+        )
+        self.assertNotIn('JOIN', sql)
+
+    def test_detalle_con_only(self):
+        """Test: El detalle carga solo las columnas y relaciones pedidas"""
+        response, sql = self._get(f'/loans/{self.loan.id}/?fields=id,book_title')
+        self.assertEqual(response.data, {'id': self.loan.id, 'book_title': 'Sparse'})
+        self.assertIn('viewset_books_book', sql)
+        self.assertNotIn('viewset_users_user', sql)
+        self.assertNotIn('return_date', sql)
+
+    def test_paginacion_con_fields(self):
+        """Test: Los cursores siguen funcionando sin pedir loan_date"""
+        Loan.objects.create(book=self.book, user=self.loan.user)
+        first = self.client.get('/loans/?fields=id&page_size=1')
+        second = self.client.get(first.data['next'])
+        self.assertEqual(
+            [first.data['results'][0]['id'], second.data['results'][0]['id']],
+            list(Loan.objects.order_by('-loan_date', '-id').values_list('id', flat=True)),
+        )
+
+    def test_escritores_sin_libros(self):
+        """Test: /writers/?fields=id,name no precarga los libros"""
+        response, sql = self._get('/writers/?fields=id,name')
+        self.assertEqual(response.data['results'][0], {'id': self.book.writer_id, 'name': 'Sparse W'})
+        self.assertNotIn('viewset_books_book', sql)
+
+    def test_campos_desconocidos(self):
+        """Test: Pedir un campo inexistente responde 400"""
+        for url in ('/books/?fields=id,isbn', '/loans/?exclude=nope'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_escrituras_ignoran_fields(self):
+        """Test: POST valida y devuelve el serializer completo"""
+        response = self.client.post(
+            '/loans/?fields=id',
+            {'book_id': self.book.id, 'user_id': self.loan.user_id}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('book_title', response.data)
+
+
+class WriterBooksEmbeddingTest(APITestCase):
+    """Tests para la carga y el parámetro ?books= del listado de escritores"""
+    
+    def setUp(self):
+        """Crea tres escritores con tres libros cada uno"""
+        self.client = APIClient()
+        for i in range(3):
+            writer = Writer.objects.create(name=f'Autor {i}')
+            for j in range(3):
+                Book.objects.create(title=f'Obra {i}-{j}', writer=writer)
+    
+    def test_listar_escritores_precarga_libros(self):
+        """Test: GET /writers/ usa dos consultas sin importar el número de libros"""
+        with self.assertNumQueries(2):
+            response = self.client.get('/writers/')
+        writer = response.data['results'][0]
+        self.assertEqual(len(writer['books']), 3)
+        self.assertEqual(writer['books'][0]['writer_name'], writer['name'])
+        self.assertNotIn('books_count', writer)
+    
+    def test_listar_libros_una_consulta(self):
+        """Test: GET /books/ carga el escritor con JOIN"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/books/')
+        self.assertEqual(len(response.data['results']), 9)
+    
+    def test_books_none(self):
+        """Test: ?books=none omite los libros y no los consulta"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/writers/?books=none')
+        self.assertNotIn('books', response.data['results'][0])
+        self.assertNotIn('books_count', response.data['results'][0])
+    
+    def test_books_count(self):
+        """Test: ?books=count devuelve solo el número de libros"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/writers/?books=count')
+        writer = response.data['results'][0]
+        self.assertNotIn('books', writer)
+        self.assertEqual(writer['books_count'], 3)
+    
+    def test_books_first_n(self):
+        """Test: ?books=first:2 limita los libros embebidos"""
+        with self.assertNumQueries(2):
+            response = self.client.get('/writers/?books=first:2')
+        for writer in response.data['results']:
+            self.assertEqual(len(writer['books']), 2)
+            self.assertEqual(writer['books_count'], 3)
+    
+    def test_fields_con_libros_sin_nombre(self):
+        """Test: ?fields= sin name no añade una consulta por escritor para writer_name"""
+        for url, consultas in (
+            ('/writers/?fields=id,books', 2),
+            ('/writers/?fields=books&books=first:2', 2),
+            ('/writers/?fields=books,books_count&books=first:2', 2),
+        ):
+            with self.subTest(url=url):
+                with self.assertNumQueries(consultas):
+                    response = self.client.get(url)
+                writer = response.data['results'][0]
+                self.assertNotIn('name', writer)
+                self.assertEqual(writer['books'][0]['writer_name'], 'Autor 0')
+    
+    def test_books_detalle(self):
+        """Test: El parámetro también aplica al detalle del escritor"""
+        writer = Writer.objects.first()
+        response = self.client.get(f'/writers/{writer.id}/?books=first:1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['books']), 1)
+    
+    def test_books_invalido(self):
+        """Test: Un valor inválido de ?books= devuelve 400"""
+        response = self.client.get('/writers/?books=first:abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LibraryStatisticsTest(APITestCase):
+    """Tests para las estadísticas globales de la biblioteca"""
+    
+    def setUp(self):
+        """Crea dos escritores, tres libros, dos usuarios y varios préstamos"""
+        self.client = APIClient()
+        self.writer_a = Writer.objects.create(name='Escritor A')
+        self.writer_b = Writer.objects.create(name='Escritor B')
+        self.book_a1 = Book.objects.create(title='A1', writer=self.writer_a)
+        self.book_a2 = Book.objects.create(title='A2', writer=self.writer_a)
+        self.book_b1 = Book.objects.create(title='B1', writer=self.writer_b)
+        self.user_1 = User.objects.create(username='u1', email='u1@example.com', full_name='U1')
+        self.user_2 = User.objects.create(username='u2', email='u2@example.com', full_name='U2')
+        Bibliotecary.objects.create(username='b1', email='b1@example.com', full_name='B1')
+        Loan.objects.create(book=self.book_a1, user=self.user_1)
+        Loan.objects.create(book=self.book_a1, user=self.user_2)
+        Loan.objects.create(book=self.book_a2, user=self.user_1, is_active=False,
+                            return_date=timezone.now())
+        Loan.objects.create(book=self.book_b1, user=self.user_1)
+    
+    def test_numero_fijo_de_consultas(self):
+        """Test: El cálculo desde cero ejecuta 8 consultas"""
+        with self.assertNumQueries(8):
+            compute_library_statistics()
+    
+    def test_endpoint_lee_la_instantanea(self):
+        """Test: GET /api/library/statistics/ lee la instantánea con una consulta"""
+        rebuild_snapshot()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/library/statistics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, compute_library_statistics())
+    
+    def test_totales(self):
+        """Test: Totales del catálogo y de préstamos"""
+        response = self.client.get('/api/library/statistics/')
+        self.assertEqual(response.data['catalog'], {
+            'total_writers': 2,
+            'total_books': 3,
+            'total_users': 2,
+            'total_bibliotecaries': 1,
+        })
+        self.assertEqual(response.data['loans'], {
+            'total_loans': 4,
+            'active_loans': 3,
+            'completed_loans': 1,
+        })
+    
+    def test_rankings(self):
+        """Test: Los rankings incluyen todos sus campos calculados"""
+        rankings = self.client.get('/api/library/statistics/').data['rankings']
+        self.assertEqual(rankings['top_books'][0], {
+            'id': self.book_a1.id,
+            'title': 'A1',
+            'writer': 'Escritor A',
+            'total_loans': 2,
+        })
+        self.assertEqual(rankings['top_users'][0]['username'], 'u1')
+        self.assertEqual(rankings['top_users'][0]['total_loans'], 3)
+        self.assertEqual(rankings['top_writers'][0], {
+            'id': self.writer_a.id,
+            'name': 'Escritor A',
+            'total_books': 2,
+            'total_loans': 3,
+        })
+
+
+
+class LibraryStatisticsSnapshotTest(APITestCase):
+    """Tests para el mantenimiento incremental de la instantánea"""
+    
+    def setUp(self):
+        """Crea datos de partida y la instantánea inicial"""
+        self.client = APIClient()
+        self.writers = [Writer.objects.create(name=f'Snapshot W{i}') for i in range(3)]
+        self.books = [
+            Book.objects.create(title=f'Snapshot B{i}', writer=self.writers[i % 3])
+            for i in range(7)
+        ]
+        self.users = [
+            User.objects.create(username=f'snap{i}', email=f'snap{i}@example.com', full_name=f'Snap {i}')
+            for i in range(7)
+        ]
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='snap_librarian', email='snap_librarian@example.com', full_name='Snap Librarian'
+        )
+        for i in range(6):
+            Loan.objects.create(book=self.books[i], user=self.users[i])
+        rebuild_snapshot()
+    
+    def assertSnapshotAlDia(self):
+        """Comprueba que la instantánea coincide con el cálculo desde cero"""
+        self.assertEqual(snapshot_as_dict(get_snapshot()), compute_library_statistics())
+    
+    def test_crear_prestamo_via_api(self):
+        """Test: LoanSerializer.create actualiza contadores y rankings"""
+        for _ in range(3):
+            response = self.client.post('/loans/', {
+                'book_id': self.books[6].id,
+                'user_id': self.users[6].id,
+                'bibliotecary_id': self.bibliotecary.id,
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertSnapshotAlDia()
+        snapshot = get_snapshot()
+        self.assertEqual(snapshot.top_books[0]['id'], self.books[6].id)
+        self.assertEqual(snapshot.top_users[0]['total_loans'], 3)
+    
+    def test_devolver_prestamo(self):
+        """Test: return_book mueve el préstamo de activos a completados"""
+        loan = Loan.objects.filter(is_active=True).first()
+        response = self.client.post(f'/loans/{loan.id}/return_book/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertSnapshotAlDia()
+        self.assertEqual(get_snapshot().completed_loans, 1)
+    
+    def test_eliminar_prestamos_y_entidades(self):
+        """Test: Las bajas en cascada mantienen la instantánea al día"""
+        Loan.objects.create(book=self.books[0], user=self.users[0])
+        Loan.objects.first().delete()
+        self.writers[0].delete()
+        self.users[1].delete()
+        self.bibliotecary.delete()
+        self.assertSnapshotAlDia()
+    
+    def test_renombrar_entidades(self):
+        """Test: Los cambios de nombre se reflejan en los rankings"""
+        self.writers[0].name = 'Renombrado'
+        self.writers[0].save()
+        self.users[0].username = 'renombrado'
+        self.users[0].save()
+        self.books[1].writer = self.writers[2]
+        self.books[1].save()
+        self.assertSnapshotAlDia()
+    
+    def test_alta_de_catalogo(self):
+        """Test: Altas de escritores, libros, usuarios y bibliotecarios"""
+        writer = Writer.objects.create(name='Nuevo escritor')
+        Book.objects.create(title='Nuevo libro', writer=writer)
+        User.objects.create(username='nuevo', email='nuevo@example.com', full_name='Nuevo')
+        Bibliotecary.objects.create(username='nuevo_b', email='nuevo_b@example.com', full_name='Nuevo B')
+        self.assertSnapshotAlDia()
+    
+    def test_prestamo_no_recalcula_rankings(self):
+        """Test: Un préstamo solo ajusta la instantánea con un UPDATE; los rankings se recalculan al leer"""
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(2):
+                Loan.objects.create(book=self.books[6], user=self.users[6])
+        sql = [query['sql'] for query in queries.captured_queries]
+        snapshot_sql = [query for query in sql if 'viewset_books_librarystatistics' in query]
+        self.assertEqual(len(snapshot_sql), 2)
+        self.assertTrue(all(query.startswith('UPDATE') for query in snapshot_sql))
+        self.assertFalse(any('FOR UPDATE' in query for query in sql))
+        self.assertTrue(LibraryStatistics.objects.get().rankings_stale)
+
+        self.assertEqual(get_snapshot().top_books[0]['id'], self.books[6].id)
+        self.assertFalse(LibraryStatistics.objects.get().rankings_stale)
+        self.assertSnapshotAlDia()
+    
+    def test_rankings_desde_contadores(self):
+        """Test: Los rankings se leen de los contadores sin consultar los préstamos"""
+        Loan.objects.create(book=self.books[6], user=self.users[6])
+        with CaptureQueriesContext(connection) as queries:
+            get_snapshot()
+        self.assertFalse(any(
+            'viewset_books_loan' in query['sql'] for query in queries.captured_queries
+        ))
+    
+    def test_comando_detecta_desviacion(self):
+        """Test: rebuild_statistics --check falla si la instantánea está desviada"""
+        call_command('rebuild_statistics', '--check', stdout=StringIO())
+        # QuerySet.update no emite señales: la instantánea queda desviada
+        Loan.objects.update(is_active=False)
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_statistics', '--check', stdout=out)
+        self.assertIn('active_loans', out.getvalue())
+        call_command('rebuild_statistics', stdout=StringIO())
+        self.assertSnapshotAlDia()
+    
+    def test_instantanea_inexistente_se_reconstruye(self):
+        """Test: Sin instantánea, la primera lectura la construye"""
+        LibraryStatistics.objects.all().delete()
+        response = self.client.get('/api/library/statistics/')
+        self.assertEqual(response.data, compute_library_statistics())
+
+
+class LoanCountersTest(APITestCase):
+    """Tests para los contadores desnormalizados de préstamos"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = APIClient()
+        self.writer = Writer.objects.create(name='Contador W')
+        self.book = Book.objects.create(title='Contador B', writer=self.writer)
+        self.other_book = Book.objects.create(title='Contador B2', writer=self.writer)
+        self.user = User.objects.create(username='contador', email='contador@example.com', full_name='Contador')
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='contador_b', email='contador_b@example.com', full_name='Contador B'
+        )
+    
+    def assertContadores(self, obj, total, active, completed):
+        """Comprueba los tres contadores de una fila"""
+        obj.refresh_from_db()
+        self.assertEqual(
+            (obj.total_loans, obj.active_loans, obj.completed_loans),
+            (total, active, completed)
+        )
+    
+    def assertTodosLosContadores(self, total, active, completed):
+        """Comprueba los contadores de libro, escritor, usuario y bibliotecario"""
+        for obj in (self.book, self.writer, self.user, self.bibliotecary):
+            self.assertContadores(obj, total, active, completed)
+    
+    def _crear_prestamo(self):
+        """Crea un préstamo a través de la API"""
+        response = self.client.post('/loans/', {
+            'book_id': self.book.id,
+            'user_id': self.user.id,
+            'bibliotecary_id': self.bibliotecary.id,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Loan.objects.get(id=response.data['id'])
+    
+    def test_crear_devolver_y_eliminar(self):
+        """Test: Los contadores siguen el ciclo de vida del préstamo"""
+        loan = self._crear_prestamo()
+        self._crear_prestamo()
+        self.assertTodosLosContadores(2, 2, 0)
+        
+        self.client.post(f'/loans/{loan.id}/return_book/')
+        self.assertTodosLosContadores(2, 1, 1)
+        
+        self.client.delete(f'/loans/{loan.id}/')
+        self.assertTodosLosContadores(1, 1, 0)
+    
+    def test_devoluciones_concurrentes(self):
+        """Test: Dos devoluciones del mismo préstamo solo cuentan una vez"""
+        loan = self._crear_prestamo()
+        copia_a = Loan.objects.get(id=loan.id)
+        copia_b = Loan.objects.get(id=loan.id)
+        
+        self.assertTrue(return_loan(copia_a))
+        self.assertFalse(return_loan(copia_b))
+        self.assertTodosLosContadores(1, 0, 1)
+        response = self.client.post(f'/loans/{loan.id}/return_book/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTodosLosContadores(1, 0, 1)
+    
+    def test_borrados_concurrentes(self):
+        """Test: Borrar dos veces el mismo préstamo solo descuenta una vez"""
+        self._crear_prestamo()
+        loan = self._crear_prestamo()
+        copia_a = Loan.objects.get(id=loan.id)
+        copia_b = Loan.objects.get(id=loan.id)
+        
+        copia_a.delete()
+        copia_b.delete()
+        self.assertTodosLosContadores(1, 1, 0)
+    
+    def test_borrado_con_instancia_desactualizada(self):
+        """Test: El borrado usa el estado guardado, no el de la instancia"""
+        loan = self._crear_prestamo()
+        desactualizada = Loan.objects.get(id=loan.id)
+        return_loan(loan)
+        
+        desactualizada.delete()
+        self.assertTodosLosContadores(0, 0, 0)
+    
+    def test_reasignar_libro(self):
+        """Test: Cambiar el libro de un préstamo mueve sus contadores"""
+        loan = self._crear_prestamo()
+        loan.book = self.other_book
+        loan.save()
+        self.assertContadores(self.book, 0, 0, 0)
+        self.assertContadores(self.other_book, 1, 1, 0)
+        self.assertContadores(self.writer, 1, 1, 0)
+    
+    def test_cambiar_escritor_de_libro(self):
+        """Test: Cambiar el escritor de un libro le traslada sus préstamos"""
+        otro = Writer.objects.create(name='Contador W2')
+        self._prestamos(self.book, [self.user], 5)
+        self._prestamos(self.other_book, [self.user], 1)
+        rebuild_snapshot()
+        book = Book.objects.get(pk=self.book.pk)
+        book.writer = otro
+        book.save()
+        self.assertContadores(self.writer, 1, 1, 0)
+        self.assertContadores(otro, 5, 3, 2)
+        self.assertContadores(self.book, 5, 3, 2)
+        self.assertEqual(counter_drift(), [])
+        call_command('rebuild_statistics', check=True, stdout=StringIO())
+        self.assertEqual(get_snapshot().top_writers[0]['name'], 'Contador W2')
+    
+    def _prestamos(self, book, usuarios, por_usuario):
+        """Crea préstamos de un libro repartidos entre varios usuarios"""
+        for user in usuarios:
+            for i in range(por_usuario):
+                Loan.objects.create(
+                    book=book, user=user, bibliotecary=self.bibliotecary, is_active=i % 2 == 0
+                )
+
+    def test_borrar_libro_en_cascada(self):
+        """Test: Borrar un libro cuesta las mismas consultas con 2 o 100 préstamos"""
+        usuarios = [self.user] + [
+            User.objects.create(username=f'cascada{i}', email=f'cascada{i}@example.com',
+                                full_name='Cascada')
+            for i in range(4)
+        ]
+        self._prestamos(self.other_book, usuarios, 20)
+        self._prestamos(self.book, usuarios[:2], 1)
+        rebuild_snapshot()
+        with self.assertNumQueries(10):
+            self.book.delete()
+        with self.assertNumQueries(10):
+            self.other_book.delete()
+        self.assertEqual(Loan.objects.count(), 0)
+        self.assertEqual(counter_drift(), [])
+        self.assertEqual(snapshot_drift(get_snapshot()), {})
+
+    def test_borrar_usuario_en_cascada(self):
+        """Test: Borrar un usuario descuenta sus préstamos de libros y escritores"""
+        otro = User.objects.create(username='otro', email='otro@example.com', full_name='Otro')
+        self._prestamos(self.book, [self.user, otro], 3)
+        self._prestamos(self.other_book, [self.user], 2)
+        rebuild_snapshot()
+        self.user.delete()
+        self.assertContadores(self.book, 3, 2, 1)
+        self.assertContadores(self.other_book, 0, 0, 0)
+        self.assertContadores(self.writer, 3, 2, 1)
+        self.assertContadores(self.bibliotecary, 3, 2, 1)
+        self.assertEqual(counter_drift(), [])
+        self.assertEqual(snapshot_drift(get_snapshot()), {})
+
+    def test_estadisticas_sin_recorrer_prestamos(self):
+        """Test: Las estadísticas del bibliotecario leen sus contadores"""
+        self._crear_prestamo()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/bibliotecaries/{self.bibliotecary.id}/statistics/')
+        self.assertEqual(response.data['total_loans'], 1)
+        self.assertEqual(response.data['active_loans'], 1)
+    
+    def test_recuento_corrige_desviaciones(self):
+        """Test: rebuild_statistics recalcula contadores desviados"""
+        self._crear_prestamo()
+        Book.objects.update(total_loans=99)
+        self.assertIn(('Book', self.book.id), counter_drift())
+        with self.assertRaises(CommandError):
+            call_command('rebuild_statistics', '--check', stdout=StringIO())
+        call_command('rebuild_statistics', stdout=StringIO())
+        self.assertEqual(counter_drift(), [])
+        self.assertContadores(self.book, 1, 1, 0)
+
+
+class LoanCountersConcurrencyTest(TransactionTestCase):
+    """Tests con hilos reales para devoluciones y borrados simultáneos"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        writer = Writer.objects.create(name='Concurrente W')
+        self.book = Book.objects.create(title='Concurrente B', writer=writer)
+        self.user = User.objects.create(username='concurrente', email='concurrente@example.com', full_name='C')
+        self.loan = Loan.objects.create(book=self.book, user=self.user)
+    
+    def _en_paralelo(self, funcion, hilos=4):
+        """Ejecuta ``funcion`` a la vez en varios hilos con su propia conexión
+
+        SQLite no espera a los bloqueos de otra conexión en memoria
+        compartida y falla con ``OperationalError``; esos intentos se
+        repiten, como haría un cliente.
+
+        Returns:
+            list: Resultado de ``funcion`` en cada hilo
+        """
+        barrera = threading.Barrier(hilos)
+        resultados = []
+        
+        def tarea():
+            try:
+                loan = Loan.objects.get(id=self.loan.id)
+                barrera.wait()
+                for _ in range(50):
+                    try:
+                        resultados.append(funcion(loan))
+                        return
+                    except OperationalError:
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=tarea) for _ in range(hilos)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(resultados), hilos)
+        return resultados
+    
+    def test_devoluciones_simultaneas(self):
+        """Test: Varias devoluciones simultáneas ajustan una sola vez"""
+        resultados = self._en_paralelo(return_loan)
+        self.assertEqual(resultados.count(True), 1)
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.active_loans, self.book.completed_loans), (0, 1))
+    
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_borrados_simultaneos(self):
+        """Test: Varios borrados simultáneos descuentan una sola vez"""
+        self._en_paralelo(lambda loan: loan.delete())
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_loans, self.user.active_loans), (0, 0))
+
+
+class LoanIndexUsageTest(ExplainTestMixin, TestCase):
+    """Tests: las consultas de préstamos de cada endpoint usan sus índices"""
+    
+    def setUp(self):
+        """Crea préstamos activos y devueltos para que el plan sea realista"""
+        writer = Writer.objects.create(name='Indice W')
+        self.book = Book.objects.create(title='Indice B', writer=writer)
+        self.user = User.objects.create(username='indice', email='indice@example.com', full_name='I')
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='indice_b', email='indice_b@example.com', full_name='IB'
+        )
+        for is_active in (True, False) * 10:
+            Loan.objects.create(
+                book=self.book, user=self.user,
+                bibliotecary=self.bibliotecary, is_active=is_active
+            )
+    
+    def _pagina(self, queryset):
+        """Reproduce el orden y el límite de la paginación por cursor"""
+        return queryset.order_by('-loan_date', '-id')[:51]
+    
+    def test_listado_de_prestamos(self):
+        """Test: GET /loans/ recorre el índice de fecha"""
+        self.assertUsesIndex(self._pagina(Loan.objects.all()), 'loan_date_id_idx')
+    
+    def test_prestamos_activos(self):
+        """Test: GET /loans/active/ usa el índice (is_active, loan_date)"""
+        self.assertUsesIndex(
+            self._pagina(Loan.objects.filter(is_active=True)), 'loan_active_date_idx'
+        )
+    
+    def test_prestamos_activos_de_usuario(self):
+        """Test: Préstamos activos de un usuario"""
+        self.assertUsesIndex(
+            self._pagina(Loan.objects.filter(user=self.user, is_active=True)),
+            'loan_user_active_idx'
+        )
+    
+    def test_prestamos_activos_de_libro(self):
+        """Test: Préstamos activos de un libro"""
+        self.assertUsesIndex(
+            self._pagina(Loan.objects.filter(book=self.book, is_active=True)),
+            'loan_book_active_idx'
+        )
+    
+    def test_prestamos_activos_de_bibliotecario(self):
+        """Test: GET /bibliotecaries/{id}/active_loans/"""
+        self.assertUsesIndex(
+            self._pagina(Loan.objects.filter(bibliotecary=self.bibliotecary, is_active=True)),
+            'loan_biblio_active_idx'
+        )
+
+    def test_filtros_por_relacion(self):
+        """Test: /loans/?user=, ?book= y ?bibliotecary= (con rango de fechas)"""
+        desde = timezone.now() - timezone.timedelta(days=30)
+        for campo, valor, indice in (
+            ('user', self.user, 'loan_user_date_idx'),
+            ('book', self.book, 'loan_book_date_idx'),
+            ('bibliotecary', self.bibliotecary, 'loan_biblio_date_idx'),
+        ):
+            with self.subTest(campo=campo):
+                self.assertUsesIndex(
+                    self._pagina(Loan.objects.filter(**{campo: valor, 'loan_date__gte': desde})),
+                    indice
+                )
+
+    def test_relaciones_sin_indice_propio(self):
+        """Test: Los borrados en cascada y SET_NULL usan los índices compuestos
+
+        Las claves ajenas de Loan no tienen índice de una columna
+        (``db_index=False``); las búsquedas por relación sin orden, como
+        las del colector de borrados y el recuento de los contadores,
+        usan el índice (relación, -loan_date) que empieza por ella.
+        """
+        for campo, valor, indices in (
+            ('user', self.user, ('loan_user_date_idx', 'loan_user_active_idx')),
+            ('book', self.book, ('loan_book_date_idx', 'loan_book_active_idx')),
+            ('bibliotecary', self.bibliotecary,
+             ('loan_biblio_date_idx', 'loan_biblio_active_idx')),
+        ):
+            with self.subTest(campo=campo):
+                self.assertFalse(Loan._meta.get_field(campo).db_index)
+                usados = used_indexes(Loan.objects.filter(**{campo: valor}).order_by())
+                self.assertTrue(set(indices) & usados, f'{campo}: usa {sorted(usados)}')
+                usados = used_indexes(
+                    Loan.objects.filter(**{campo: valor}).order_by()
+                    .values('is_active').annotate(total=Count('id'))
+                )
+                self.assertTrue(set(indices) & usados, f'{campo}: usa {sorted(usados)}')
+
+    def test_rankings(self):
+        """Test: Los rankings recorren los índices sobre total_loans"""
+        for model, indice in (
+            (Book, 'book_ranking_idx'),
+            (User, 'user_ranking_idx'),
+            (Writer, 'writer_ranking_idx'),
+        ):
+            with self.subTest(indice=indice):
+                self.assertUsesIndex(model.objects.order_by('-total_loans', 'id')[:5], indice)
+
+    def test_prefijo_de_titulo(self):
+        """Test: ?title__startswith= usa el índice sobre LOWER(title)"""
+        Book.objects.bulk_create(
+            [Book(title=f'Extra {i}', writer=self.book.writer) for i in range(20)]
+        )
+        books = PrefixFilter('title__startswith', 'title').apply(Book.objects.all(), 'ind')
+        self.assertUsesIndex(books.order_by('id')[:51], 'book_title_lower_idx')
+
+
+class ListFilterTest(APITestCase):
+    """Tests para los filtros y búsquedas de /loans/, /books/ y /writers/"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        get_cache().clear()
+        self.client = APIClient()
+        self.writer = Writer.objects.create(name='García Márquez')
+        other = Writer.objects.create(name='Borges')
+        self.book = Book.objects.create(title='Cien años de soledad', writer=self.writer)
+        self.other_book = Book.objects.create(title='Ficciones', writer=other)
+        self.cronica = Book.objects.create(
+            title='Crónica de una muerte anunciada', writer=self.writer
+        )
+        self.user = User.objects.create(username='filtro', email='filtro@example.com', full_name='F')
+        other_user = User.objects.create(username='otro', email='otro@example.com', full_name='O')
+        self.loan = Loan.objects.create(book=self.book, user=self.user)
+        Loan.objects.create(book=self.other_book, user=other_user, is_active=False)
+
+    def _ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [item['id'] for item in response.data['results']]
+
+    def test_filtros_de_prestamos(self):
+        """Test: ?user=, ?book= y ?status= filtran /loans/"""
+        self.assertEqual(self._ids(f'/loans/?user={self.user.id}'), [self.loan.id])
+        self.assertEqual(self._ids(f'/loans/?book={self.book.id}&status=active'), [self.loan.id])
+        self.assertEqual(self._ids(f'/generic/loans/?book={self.book.id}&status=returned'), [])
+        hoy = timezone.localdate().isoformat()
+        self.assertEqual(len(self._ids(f'/loans/?from={hoy}&to={hoy}')), 2)
+
+    def test_valores_invalidos(self):
+        """Test: Un id o una fecha inválidos responden 400"""
+        for url in ('/loans/?user=abc', '/loans/?from=ayer'):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prefijo_sin_mayusculas(self):
+        """Test: ?title__startswith= no distingue mayúsculas"""
+        ids = self._ids('/books/?title__startswith=c')
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(self._ids('/writers/?name__startswith=BOR'), [self.other_book.writer_id])
+
+    def test_contains_con_filtro_indexado(self):
+        """Test: ?title__contains= junto a ?writer= o a un prefijo"""
+        self.assertEqual(
+            self._ids(f'/books/?writer={self.writer.id}&title__contains=SOLEDAD'), [self.book.id]
+        )
+        self.assertEqual(
+            self._ids('/books/?title__startswith=c&title__contains=muerte'), [self.cronica.id]
+        )
+
+    def test_contains_sin_indice_rechazado(self):
+        """Test: Un contains solo recorrería la tabla entera y responde 400"""
+        response = self.client.get('/books/?title__contains=soledad')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title__contains', response.data)
+        with override_settings(FILTER_ALLOW_FULL_SCAN=True):
+            self.assertEqual(self._ids('/books/?title__contains=soledad'), [self.book.id])
+
+
+class BookSearchTest(APITestCase):
+    """Tests para el índice de búsqueda y /books/search/"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        get_cache().clear()
+        self.client = APIClient()
+        self.writer = Writer.objects.create(name='García Márquez')
+        self.borges = Writer.objects.create(name='Borges')
+        self.cien = Book.objects.create(title='Cien años de soledad', writer=self.writer)
+        self.ficciones = Book.objects.create(title='Ficciones', writer=self.borges)
+        self.aleph = Book.objects.create(title='El Aleph de García', writer=self.borges)
+
+    def _ids(self, q, **params):
+        response = self.client.get('/books/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [item['id'] for item in response.data['results']]
+
+    def test_busca_en_titulo_y_escritor(self):
+        """Test: Encuentra palabras del título o del escritor, sin tildes y la última por prefijo"""
+        self.assertEqual(self._ids('soledad'), [self.cien.id])
+        self.assertEqual(self._ids('borges'), [self.ficciones.id, self.aleph.id])
+        self.assertEqual(self._ids('CIEN anos sol'), [self.cien.id])
+        self.assertEqual(self._ids('ficciones borges'), [self.ficciones.id])
+        self.assertEqual(self._ids('ficciones cortázar'), [])
+        self.assertEqual(self._ids('cie soledad'), [])
+
+    def test_orden_por_relevancia(self):
+        """Test: Una coincidencia en el título pesa más que en el escritor"""
+        # bm25 necesita que la palabra sea poco frecuente en el catálogo
+        Book.objects.bulk_create([Book(title=f'Relleno {i}', writer=self.borges) for i in range(5)])
+        search.index_books(Book.objects.filter(title__startswith='Relleno'))
+        response = self.client.get('/books/search/?q=garcia')
+        results = response.data['results']
+        self.assertEqual([item['id'] for item in results], [self.aleph.id, self.cien.id])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual(
+            set(results[0]), {'id', 'title', 'writer_name', 'score'}
+        )
+
+    def test_consulta_obligatoria(self):
+        """Test: Sin palabras en ?q= responde 400"""
+        for url in ('/books/search/', '/books/search/?q=', '/books/search/?q=%22*%29'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('q', response.data)
+
+    def test_paginacion_y_campos(self):
+        """Test: ?page_size=, ?offset= y ?fields= en los resultados"""
+        response = self.client.get('/books/search/?q=borges&page_size=1&fields=title')
+        self.assertEqual([set(item) for item in response.data['results']], [{'title', 'score'}])
+        self.assertEqual(response.data['results'][0]['title'], 'Ficciones')
+        self.assertIsNone(response.data['previous'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'][0]['title'], 'El Aleph de García')
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+        response = self.client.get('/books/search/?q=borges&offset=-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_relevancia_sobre_todas_las_coincidencias(self):
+        """Test: Un libro antiguo muy relevante precede a miles de coincidencias más recientes"""
+        # Más documentos posteriores que las 10.000 coincidencias que se
+        # ordenaban antes, todos con la palabra solo en el escritor
+        ultimo = Book.objects.order_by('-id').values_list('id', flat=True).first()
+        with connection.cursor() as cursor:
+            search.get_backend().upsert(cursor, [
+                (ultimo + i, f'Relleno {i}', 'Cien Autores') for i in range(1, 10_002)
+            ])
+        hits = search.search_books('cien', 2)
+        self.assertEqual(hits[0][0], self.cien.id)
+        self.assertGreater(hits[0][1], hits[1][1])
+
+    def test_desplazamiento_limitado(self):
+        """Test: ?offset= no puede superar SEARCH_MAX_OFFSET y su última página no tiene next"""
+        Book.objects.create(title='El hacedor', writer=self.borges)
+        with patch('viewset_books.views.SEARCH_MAX_OFFSET', 1):
+            response = self.client.get('/books/search/?q=borges&page_size=1')
+            self.assertIsNotNone(response.data['next'])
+            response = self.client.get(response.data['next'])
+            self.assertEqual(len(response.data['results']), 1)
+            # Quedan resultados, pero la página siguiente supera el límite
+            self.assertIsNone(response.data['next'])
+            response = self.client.get('/books/search/?q=borges&offset=2')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('offset', response.data)
+
+    def test_actualizacion_incremental(self):
+        """Test: Altas, cambios y bajas de libros y escritores actualizan el índice"""
+        self.cien.title = 'Memoria de mis putas tristes'
+        self.cien.save()
+        self.assertEqual(self._ids('soledad'), [])
+        self.assertEqual(self._ids('memoria'), [self.cien.id])
+        self.borges.name = 'Jorge Luis Borges'
+        self.borges.save()
+        self.assertEqual(self._ids('jorge'), [self.ficciones.id, self.aleph.id])
+        self.ficciones.delete()
+        self.assertEqual(self._ids('jorge'), [self.aleph.id])
+        self.borges.delete()
+        self.assertEqual(self._ids('aleph'), [])
+        response = self.client.post('/books/', {
+            'title': 'El amor en los tiempos del cólera', 'writer_name': 'García Márquez',
+        }, format='json')
+        self.assertEqual(self._ids('colera'), [response.data['id']])
+
+    def test_guardar_sin_cambios_no_reindexa(self):
+        """Test: Guardar un libro sin cambiar título ni escritor no toca el índice"""
+        with CaptureQueriesContext(connection) as queries:
+            Book.objects.get(pk=self.cien.pk).save()
+        self.assertFalse([q for q in queries if search.SEARCH_TABLE in q['sql']])
+        self.cien.title = 'Cien años de soledad (edición)'
+        with CaptureQueriesContext(connection) as queries:
+            self.cien.save()
+        self.assertTrue([q for q in queries if search.SEARCH_TABLE in q['sql']])
+        self.assertEqual(self._ids('edicion'), [self.cien.id])
+
+    def test_alta_masiva_indexada(self):
+        """Test: Los libros creados con /books/bulk/ se pueden buscar"""
+        response = self.client.post('/books/bulk/', [
+            {'title': 'Rayuela', 'writer_name': 'Cortázar'},
+            {'title': 'Bestiario', 'writer_name': 'Cortázar'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(len(self._ids('cortazar')), 2)
+
+    def test_comando_rebuild_search_index(self):
+        """Test: --check detecta un índice desfasado y el comando lo reconstruye"""
+        call_command('rebuild_search_index', check=True, stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.SEARCH_TABLE}')
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_search_index', check=True, stdout=out)
+        self.assertIn('desfasados: 3', out.getvalue())
+        call_command('rebuild_search_index', stdout=StringIO())
+        call_command('rebuild_search_index', check=True, stdout=StringIO())
+        self.assertEqual(self._ids('ficciones'), [self.ficciones.id])
+
+
+class ResponseCacheTest(APITestCase):
+    """Tests para la caché de respuestas invalidada por señales"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        get_cache().clear()
+        self.client = APIClient()
+        self.writer = Writer.objects.create(name='Cache W')
+        self.book = Book.objects.create(title='Cache B', writer=self.writer)
+        self.user = User.objects.create(username='cache', email='cache@example.com', full_name='Cache')
+    
+    def test_segunda_lectura_sin_consultas(self):
+        """Test: La segunda petición se sirve desde la caché sin tocar la BD"""
+        first = self.client.get('/books/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/books/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+    
+    def test_query_string_forma_parte_de_la_clave(self):
+        """Test: Distintos parámetros generan entradas distintas"""
+        self.client.get('/writers/')
+        response = self.client.get('/writers/?books=count')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['books_count'], 1)
+    
+    @override_settings(ALLOWED_HOSTS=['api.example.com', 'interno'])
+    def test_host_forma_parte_de_la_clave(self):
+        """Test: Cada host recibe sus propios enlaces de paginación"""
+        Book.objects.create(title='Cache B2', writer=self.writer)
+        publica = self.client.get('/books/?page_size=1', HTTP_HOST='api.example.com', secure=True)
+        self.assertTrue(publica.data['next'].startswith('https://api.example.com/'))
+        interna = self.client.get('/books/?page_size=1', HTTP_HOST='interno')
+        self.assertEqual(interna['X-Cache'], 'MISS')
+        self.assertTrue(interna.data['next'].startswith('http://interno/'))
+        repetida = self.client.get('/books/?page_size=1', HTTP_HOST='api.example.com', secure=True)
+        self.assertEqual(repetida['X-Cache'], 'HIT')
+    
+    def test_escritura_invalida_respuestas_dependientes(self):
+        """Test: Crear un libro invalida /books/ y /writers/"""
+        self.client.get('/books/')
+        self.client.get('/writers/')
+        Book.objects.create(title='Cache B2', writer=self.writer)
+        response = self.client.get('/books/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(self.client.get('/writers/')['X-Cache'], 'MISS')
+    
+    def test_escritura_no_invalida_otras_tablas(self):
+        """Test: Un préstamo no invalida /users/ pero sí las estadísticas"""
+        self.client.get('/users/')
+        self.client.get('/api/library/statistics/')
+        Loan.objects.create(book=self.book, user=self.user)
+        self.assertEqual(self.client.get('/users/')['X-Cache'], 'HIT')
+        response = self.client.get('/api/library/statistics/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['loans']['total_loans'], 1)
+    
+    def test_devolucion_invalida_estadisticas_del_libro(self):
+        """Test: La devolución (UPDATE sin señales) invalida la caché"""
+        loan = Loan.objects.create(book=self.book, user=self.user)
+        url = f'/api/books/{self.book.id}/loan-statistics/'
+        self.client.get(url)
+        self.client.post(f'/loans/{loan.id}/return_book/')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['statistics']['active_loans'], 0)
+    
+    def test_errores_no_se_cachean(self):
+        """Test: Las respuestas 404 no se guardan"""
+        self.client.get('/api/users/99999/loan-history/')
+        response = self.client.get('/api/users/99999/loan-history/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response['X-Cache'], 'MISS')
+    
+    def test_contadores_de_aciertos_y_fallos(self):
+        """Test: El endpoint expone aciertos, fallos y tasa de aciertos"""
+        self.client.get('/users/')
+        self.client.get('/users/')
+        self.client.get('/users/')
+        response = self.client.get('/api/cache/statistics/')
+        self.assertEqual(response.data, {'hits': 2, 'misses': 1, 'hit_ratio': 0.6667})
+        self.assertEqual(cache_statistics()['hits'], 2)
+
+
+class ConditionalGetTest(APITestCase):
+    """Tests para ETag y Last-Modified basados en versiones de tabla"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        get_cache().clear()
+        self.client = APIClient()
+        self.writer = Writer.objects.create(name='Etag W')
+        self.book = Book.objects.create(title='Etag B', writer=self.writer)
+        self.user = User.objects.create(username='etag', email='etag@example.com', full_name='Etag')
+        self.loan = Loan.objects.create(book=self.book, user=self.user)
+        rebuild_snapshot()
+    
+    def test_cabeceras_de_validacion(self):
+        """Test: Las respuestas incluyen ETag y Last-Modified"""
+        for url in ('/loans/active/', '/api/library/statistics/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.has_header('ETag'), url)
+            self.assertTrue(response.has_header('Last-Modified'), url)
+    
+    def test_if_none_match_sin_consultas(self):
+        """Test: Un ETag vigente devuelve 304 sin tocar la base de datos"""
+        for url in ('/loans/active/', '/api/library/statistics/'):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+    
+    def test_escritura_cambia_el_etag(self):
+        """Test: Devolver un préstamo invalida el ETag de ambos endpoints"""
+        etags = {url: self.client.get(url)['ETag'] for url in ('/loans/active/', '/api/library/statistics/')}
+        self.client.post(f'/loans/{self.loan.id}/return_book/')
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get('/loans/active/').data['results'], [])
+    
+    def test_etag_por_pagina(self):
+        """Test: Cada página del cursor tiene su propio ETag"""
+        Loan.objects.create(book=self.book, user=self.user)
+        first = self.client.get('/loans/active/?page_size=1')
+        second = self.client.get(first.data['next'])
+        self.assertNotEqual(first['ETag'], second['ETag'])
+    
+    def test_if_modified_since(self):
+        """Test: If-Modified-Since posterior a la última escritura devuelve 304"""
+        response = self.client.get('/loans/active/')
+        since = response['Last-Modified']
+        self.assertEqual(
+            self.client.get('/loans/active/', HTTP_IF_MODIFIED_SINCE=since).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+        past = http_date(timezone.now().timestamp() - 3600)
+        self.assertEqual(
+            self.client.get('/loans/active/', HTTP_IF_MODIFIED_SINCE=past).status_code,
+            status.HTTP_200_OK
+        )
+
+
+class BulkCreateTest(APITestCase):
+    """Tests para las altas masivas de libros y préstamos"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = APIClient()
+        self.writer = Writer.objects.create(name='Bulk W')
+        self.user = User.objects.create(username='bulk', email='bulk@example.com', full_name='Bulk')
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='bulk_b', email='bulk_b@example.com', full_name='Bulk B'
+        )
+        rebuild_snapshot()
+    
+    def _libros(self, n, prefix='Libro'):
+        """Genera n libros repartidos entre un escritor existente y nuevos"""
+        return [
+            {'title': f'{prefix} {i}', 'writer_name': 'Bulk W' if i % 2 else f'Nuevo {i % 4}'}
+            for i in range(n)
+        ]
+    
+    def test_crear_libros_y_escritores(self):
+        """Test: Crea los libros y solo los escritores que faltan"""
+        response = self.client.post('/books/bulk/', self._libros(10), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'created': 10})
+        self.assertEqual(Book.objects.count(), 10)
+        self.assertEqual(Writer.objects.count(), 3)
+        self.assertEqual(self.writer.books.count(), 5)
+        self.assertEqual(snapshot_drift(get_snapshot()), {})
+    
+    def test_escritores_creados_a_la_vez(self):
+        """Test: Solo se cuentan los escritores que inserta el alta masiva"""
+        resolver = BookBulkListSerializer._writer_ids
+
+        def otra_importacion(serializer, names):
+            # Otra importación crea 'Nuevo 0' tras la primera búsqueda
+            writers = resolver(serializer, names)
+            if not Writer.objects.filter(name='Nuevo 0').exists():
+                Writer.objects.create(name='Nuevo 0')
+            return writers
+
+        with patch.object(BookBulkListSerializer, '_writer_ids', otra_importacion):
+            response = self.client.post('/books/bulk/', self._libros(4), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Writer.objects.count(), 3)
+        self.assertEqual(snapshot_drift(get_snapshot()), {})
+    
+    def test_consultas_independientes_del_tamano(self):
+        """Test: El número de consultas no crece con el número de libros"""
+        with CaptureQueriesContext(connection) as small:
+            self.client.post('/books/bulk/', self._libros(4, 'A'), format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post('/books/bulk/', self._libros(200, 'B'), format='json')
+        self.assertLessEqual(len(large), len(small))
+    
+    def test_tamano_de_lote(self):
+        """Test: Los libros se insertan en lotes del tamaño configurado"""
+        serializer = BookBulkSerializer(
+            data=self._libros(10), many=True, context={'batch_size': 3}
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "viewset_books_book"')]
+        self.assertEqual(len(inserts), 4)
+    
+    @override_settings(BULK_CREATE_BATCH_SIZE=4)
+    def test_tamano_de_lote_de_la_configuracion(self):
+        """Test: BULK_CREATE_BATCH_SIZE se lee en cada alta, no al importar"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/books/bulk/', self._libros(10), format='json')
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "viewset_books_book"')]
+        self.assertEqual(len(inserts), 3)
+    
+    def test_errores_por_elemento(self):
+        """Test: Los errores se devuelven alineados y no se crea nada"""
+        Book.objects.create(title='Existente', writer=self.writer)
+        data = [
+            {'title': 'Nuevo', 'writer_name': 'Bulk W'},
+            {'title': 'Existente', 'writer_name': 'Bulk W'},
+            {'title': 'Nuevo', 'writer_name': 'Bulk W'},
+            {'writer_name': 'Bulk W'},
+        ]
+        response = self.client.post('/books/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[3].keys(), {'title'})
+        self.assertEqual(Book.objects.count(), 1)
+        
+        response = self.client.post('/books/bulk/', data[:3], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('title', response.data[1])
+        self.assertIn('title', response.data[2])
+        self.assertEqual(Book.objects.count(), 1)
+    
+    def test_crear_prestamos(self):
+        """Test: Los préstamos masivos ajustan contadores e instantánea"""
+        books = [Book.objects.create(title=f'Prestable {i}', writer=self.writer) for i in range(3)]
+        data = [
+            {'book_id': books[i % 3].id, 'user_id': self.user.id, 'bibliotecary_id': self.bibliotecary.id}
+            for i in range(7)
+        ]
+        response = self.client.post('/loans/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Loan.objects.filter(is_active=True).count(), 7)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_loans, self.user.active_loans), (7, 7))
+        books[0].refresh_from_db()
+        self.assertEqual(books[0].total_loans, 3)
+        self.assertEqual(counter_drift(), [])
+        self.assertEqual(snapshot_drift(get_snapshot()), {})
+    
+    def test_prestamos_con_referencias_inexistentes(self):
+        """Test: Libros o usuarios inexistentes se reportan por elemento"""
+        book = Book.objects.create(title='Prestable', writer=self.writer)
+        data = [
+            {'book_id': book.id, 'user_id': self.user.id},
+            {'book_id': 99999, 'user_id': self.user.id},
+            {'book_id': book.id, 'user_id': 99999, 'bibliotecary_id': 99999},
+        ]
+        response = self.client.post('/loans/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1].keys(), {'book_id'})
+        self.assertEqual(response.data[2].keys(), {'user_id', 'bibliotecary_id'})
+        self.assertEqual(Loan.objects.count(), 0)
+
+
+class ExportTest(TestCase):
+    """Tests para las exportaciones en streaming"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.writer = Writer.objects.create(name='Export W')
+        self.user = User.objects.create(username='export', email='export@example.com', full_name='Export')
+        self.bibliotecary = Bibliotecary.objects.create(
+            username='export_b', email='export_b@example.com', full_name='Export B'
+        )
+        self.books = [Book.objects.create(title=f'Export {i}', writer=self.writer) for i in range(5)]
+        for i, book in enumerate(self.books):
+            Loan.objects.create(
+                book=book, user=self.user,
+                bibliotecary=self.bibliotecary if i % 2 else None
+            )
+    
+    def _contenido(self, response):
+        """Texto completo de una respuesta en streaming"""
+        return b''.join(response.streaming_content).decode()
+    
+    def test_ndjson(self):
+        """Test: Un objeto JSON por préstamo, en orden de id"""
+        response = self.client.get('/api/export/loans.ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._contenido(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], sorted(Loan.objects.values_list('id', flat=True)))
+        self.assertEqual(rows[0]['book_title'], 'Export 0')
+        self.assertIsNone(rows[0]['bibliotecary_name'])
+        self.assertEqual(rows[1]['bibliotecary_name'], 'export_b')
+        self.assertTrue(rows[0]['is_active'])
+    
+    def test_csv(self):
+        """Test: CSV con cabecera y una fila por libro"""
+        response = self.client.get('/api/export/books.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('books.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(self._contenido(response).splitlines()))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['writer_name'], 'Export W')
+        self.assertEqual(rows[0]['total_loans'], '1')
+    
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_lectura_por_lotes(self):
+        """Test: Se hace una consulta por lote de filas"""
+        response = self.client.get('/api/export/loans.ndjson')
+        with self.assertNumQueries(3):
+            content = self._contenido(response)
+        self.assertEqual(len(content.splitlines()), 5)
+    
+    def test_formato_no_soportado(self):
+        """Test: Un formato desconocido devuelve 404"""
+        response = self.client.get('/api/export/loans.xml')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FixEncodingCommandTest(TestCase):
+    """Tests para el comando fix_encoding"""
+    
+    def setUp(self):
+        """Crea un directorio temporal con un volcado de prueba"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'datadump.json')
+        self.data = [
+            {'model': 'viewset_books.writer', 'pk': i, 'fields': {'name': f'García Márquez ñ {i}'}}
+            for i in range(50)
+        ]
+    
+    def tearDown(self):
+        """Elimina el directorio temporal"""
+        self.tmp.cleanup()
+    
+    def _escribir(self, encoding):
+        """Guarda el volcado con la codificación indicada"""
+        with open(self.path, 'w', encoding=encoding) as f:
+            json.dump(self.data, f, ensure_ascii=False)
+    
+    def _leer(self):
+        """Carga el volcado como UTF-8"""
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def test_convierte_utf16_por_bloques(self):
+        """Test: Convierte UTF-16 con bloques que parten caracteres"""
+        self._escribir('utf-16')
+        call_command('fix_encoding', self.path, chunk_size=7, stdout=StringIO())
+        self.assertEqual(self._leer(), self.data)
+        self.assertEqual(os.listdir(self.tmp.name), ['datadump.json'])
+    
+    def test_lectura_con_mmap(self):
+        """Test: La lectura mapeada en memoria produce el mismo resultado"""
+        self._escribir('utf-8-sig')
+        call_command('fix_encoding', self.path, chunk_size=5, mmap=True, stdout=StringIO())
+        self.assertEqual(self._leer(), self.data)
+        with open(self.path, 'rb') as f:
+            self.assertNotEqual(f.read(3), b'\xef\xbb\xbf')
+    
+    def test_codificacion_indicada_y_salida_aparte(self):
+        """Test: --encoding y --output convierten sin tocar la entrada"""
+        self._escribir('cp1252')
+        output = os.path.join(self.tmp.name, 'utf8.json')
+        call_command('fix_encoding', self.path, encoding='cp1252', output=output, stdout=StringIO())
+        with open(output, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), self.data)
+        with open(self.path, encoding='cp1252') as f:
+            self.assertEqual(json.load(f), self.data)
+    
+    def test_utf8_no_se_reescribe(self):
+        """Test: Un fichero que ya es UTF-8 se deja como está"""
+        self._escribir('utf-8')
+        out = StringIO()
+        call_command('fix_encoding', self.path, stdout=out)
+        self.assertIn('ya está en UTF-8', out.getvalue())
+        self.assertEqual(self._leer(), self.data)
+    
+    def test_error_deja_el_original_intacto(self):
+        """Test: Si la conversión falla no se modifica el fichero"""
+        self._escribir('cp1252')
+        with open(self.path, 'rb') as f:
+            original = f.read()
+        with self.assertRaises(CommandError):
+            call_command('fix_encoding', self.path, encoding='ascii', stdout=StringIO())
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+        self.assertEqual(os.listdir(self.tmp.name), ['datadump.json'])
+
+
+class FastloadCommandTest(TestCase):
+    """Tests para el comando fastload"""
+    
+    def setUp(self):
+        """Directorio temporal para volcados de prueba"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dump = os.path.join(settings.BASE_DIR, 'datadump.json')
+    
+    def tearDown(self):
+        """Elimina el directorio temporal"""
+        self.tmp.cleanup()
+    
+    def _volcado(self, records):
+        """Guarda una lista de registros y retorna su ruta"""
+        path = os.path.join(self.tmp.name, 'dump.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2)
+        return path
+    
+    def test_lectura_incremental(self):
+        """Test: El análisis por bloques produce los mismos registros"""
+        with open(self.dump, encoding='utf-8') as f:
+            expected = json.load(f)
+        with open(self.dump, encoding='utf-8') as f:
+            self.assertEqual(list(iter_json_array(f, read_size=7)), expected)
+    
+    def test_orden_de_dependencias(self):
+        """Test: Cada modelo se inserta después de los que referencia"""
+        order = dependency_order([Loan, Book, Bibliotecary, User, Writer])
+        self.assertLess(order.index(Writer), order.index(Book))
+        self.assertLess(order.index(Book), order.index(Loan))
+        self.assertLess(order.index(User), order.index(Loan))
+        self.assertLess(order.index(Bibliotecary), order.index(Loan))
+    
+    def test_cargar_datadump(self):
+        """Test: Carga el volcado del proyecto y recalcula contadores"""
+        out = StringIO()
+        call_command('fastload', self.dump, batch_size=3, stdout=out)
+        self.assertEqual(Loan.objects.count(), 8)
+        self.assertEqual(Book.objects.count(), 6)
+        self.assertIn('filas/s', out.getvalue())
+        call_command('rebuild_search_index', check=True, stdout=StringIO())
+        self.assertEqual(counter_drift(), [])
+        self.assertEqual(snapshot_drift(get_snapshot()), {})
+    
+    def test_registros_desordenados(self):
+        """Test: Un préstamo antes que su libro y su escritor se carga igual"""
+        path = self._volcado([
+            {'model': 'viewset_books.loan', 'pk': 10, 'fields': {
+                'book': 5, 'user': 7, 'bibliotecary': None, 'loan_date': '2024-01-01T00:00:00Z',
+                'return_date': None, 'is_active': True}},
+            {'model': 'viewset_books.book', 'pk': 5, 'fields': {'title': 'Orden', 'writer': 3}},
+            {'model': 'viewset_users.user', 'pk': 7, 'fields': {
+                'username': 'orden', 'email': 'orden@example.com', 'full_name': 'Orden'}},
+            {'model': 'viewset_books.writer', 'pk': 3, 'fields': {'name': 'Orden W'}},
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            call_command('fastload', path, batch_size=1, stdout=StringIO())
+        inserts = [
+            query['sql'].split('"')[1] for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "')
+        ]
+        self.assertLess(inserts.index('viewset_books_writer'), inserts.index('viewset_books_book'))
+        self.assertLess(inserts.index('viewset_books_book'), inserts.index('viewset_books_loan'))
+        self.assertLess(inserts.index('viewset_users_user'), inserts.index('viewset_books_loan'))
+        loan = Loan.objects.select_related('book__writer').get(pk=10)
+        self.assertEqual(loan.book.writer.name, 'Orden W')
+        self.assertEqual(loan.loan_date.isoformat(), '2024-01-01T00:00:00+00:00')
+        self.assertEqual(Book.objects.get(pk=5).active_loans, 1)
+    
+    def test_clave_ajena_invalida(self):
+        """Test: Una clave ajena inexistente aborta la carga completa"""
+        path = self._volcado([
+            {'model': 'viewset_books.writer', 'pk': 3, 'fields': {'name': 'Huérfano W'}},
+            {'model': 'viewset_books.book', 'pk': 5, 'fields': {'title': 'Huérfano', 'writer': 99}},
+        ])
+        with self.assertRaises(CommandError):
+            call_command('fastload', path, stdout=StringIO())
+        self.assertFalse(Writer.objects.exists())
+    
+    def test_modelo_desconocido(self):
+        """Test: Un registro de un modelo que no existe aborta la carga"""
+        path = self._volcado([
+            {'model': 'viewset_books.writer', 'pk': 3, 'fields': {'name': 'Desconocido W'}},
+            {'model': 'viewset_books.revista', 'pk': 1, 'fields': {}},
+        ])
+        with self.assertRaises(CommandError):
+            call_command('fastload', path, stdout=StringIO())
+        self.assertFalse(Writer.objects.exists())
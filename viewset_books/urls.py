@@ -5,7 +5,9 @@ from .views import (
     WriterListView, WriterCreateView, WriterDetailView, WriterUpdateView,
     BookListView, BookCreateView, BookDetailView, BookUpdateView,
     LoanListView, LoanCreateView, LoanDetailView, LoanUpdateView,
-    user_loan_history, book_loan_statistics, library_statistics
+    user_loan_history, book_loan_statistics, library_statistics,
+    user_loan_history_async, book_loan_statistics_async, library_statistics_async,
+    export_loans, export_books
 )
 #ViewSets
 router = DefaultRouter()
@@ -36,4 +38,16 @@ urlpatterns = [
     path('api/users/<int:user_id>/loan-history/', user_loan_history, name='user-loan-history'),
     path('api/books/<int:book_id>/loan-statistics/', book_loan_statistics, name='book-loan-statistics'),
     path('api/library/statistics/', library_statistics, name='library-statistics'),
+    
+    # Variantes asíncronas (consultas concurrentes bajo ASGI)
+    path('api/async/users/<int:user_id>/loan-history/', user_loan_history_async,
+         name='user-loan-history-async'),
+    path('api/async/books/<int:book_id>/loan-statistics/', book_loan_statistics_async,
+         name='book-loan-statistics-async'),
+    path('api/async/library/statistics/', library_statistics_async,
+         name='library-statistics-async'),
+    
+    # Exportaciones en streaming: .ndjson o .csv
+    path('api/export/loans.<str:fmt>', export_loans, name='export-loans'),
+    path('api/export/books.<str:fmt>', export_books, name='export-books'),
 ] + router.urls
\ No newline at end of file
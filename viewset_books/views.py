@@ -3,30 +3,131 @@ from rest_framework.response import Response
 from rest_framework.decorators import action, api_view
 from rest_framework import viewsets, generics
 from rest_framework import status
-from viewset_books.models import Book, Writer, Loan
+from viewset_books.models import Book, Writer, Loan, LibraryStatistics
 from viewset_books.serializer import (
     BookSerializer, WriterSerializer, BookCreateSerializer, 
-    LoanSerializer, LoanReturnSerializer
+    LoanSerializer, LoanReturnSerializer, BookBulkSerializer, LoanBulkSerializer
 )
 from viewset_users.models import User
-from django.utils import timezone
-from django.db.models import Count, Q
+from viewset_bibliotecary.models import Bibliotecary
+from api_server.mixins import EagerLoadingViewMixin, BulkCreateViewMixin, ValuesListViewMixin
+from api_server.cache import CachedResponseMixin, cache_response, cached_response
+from api_server.conditional import conditional_on
+from django.utils.decorators import method_decorator
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.http import Http404, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from api_server.export import CONTENT_TYPES, export_response, iter_rows, json_document_lines
+from api_server.pagination import KeysetCursorPagination
+from viewset_books.filters import (
+    parse_loan_filters, parse_buckets, BOOK_FILTERS, LOAN_FILTERS, WRITER_FILTERS,
+)
+from viewset_books.statistics import (
+    SNAPSHOT_PK, get_snapshot, snapshot_as_dict, loan_totals, loan_buckets,
+    acompute_library_statistics,
+)
+from api_server.concurrency import gather_queries
+from api_server.async_views import async_api_view
+from rest_framework.exceptions import ValidationError
+from viewset_books.counters import return_loan
+from viewset_books.search import search_books
+from api_server.serializers import values_representation
+from rest_framework.utils.urls import replace_query_param
+
+#: Resultados por página de ``/books/search/`` y máximo con ``?page_size=``
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+#: Mayor ``?offset=`` de ``/books/search/``: cada página ordena todas las
+#: coincidencias, y las más profundas no aportan resultados relevantes
+SEARCH_MAX_OFFSET = 1_000
+
+
+def _int_param(request, name, default, minimum, maximum=None):
+    """Lee un entero de la query string.
 
-class WriterViewSet(viewsets.ModelViewSet):
+    Args:
+        request: Petición HTTP actual
+        name: Nombre del parámetro
+        default: Valor si no se recibe
+        minimum: Menor valor admitido
+        maximum: Mayor valor; los superiores se recortan
+
+    Returns:
+        int: El valor del parámetro
+
+    Raises:
+        ValidationError: Si no es un entero o es menor que ``minimum``
+    """
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Valor inválido.'})
+    if value < minimum:
+        raise ValidationError({name: f'Debe ser mayor o igual que {minimum}.'})
+    return min(value, maximum) if maximum is not None else value
+
+
+def search_results(request, hits):
+    """Libros de una búsqueda en el orden de relevancia, con su ``score``.
+
+    Los libros se leen con una consulta y se representan como en el listado
+    (incluido ``?fields=``/``?exclude=``).
+
+    Args:
+        request: Petición HTTP actual
+        hits: Pares ``(book_id, score)`` de :func:`~viewset_books.search.search_books`
+
+    Returns:
+        list: Representación de cada libro con su ``score``
+    """
+    books = Book.objects.filter(id__in=[book_id for book_id, _ in hits])
+    representation = values_representation(BookSerializer, BookSerializer.selected_fields(request))
+    if representation:
+        lookups = dict.fromkeys(('id',) + representation.lookups)
+        by_id = {row['id']: representation(row) for row in books.values(*lookups)}
+    else:
+        books = BookSerializer.setup_eager_loading(books, request)
+        by_id = {book.id: BookSerializer(book, context={'request': request}).data
+                 for book in books}
+    return [
+        {**by_id[book_id], 'score': score}
+        for book_id, score in hits if book_id in by_id
+    ]
+
+class WriterViewSet(CachedResponseMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar escritores.
     
     Proporciona operaciones CRUD completas para el modelo Writer.
+    Los listados y detalles se sirven desde la caché de respuestas.
+    El listado admite ``?name__startswith=`` y ``?name__contains=``.
     """
+    cache_dependencies = (Writer, Book)
+    query_filters = WRITER_FILTERS
     queryset = Writer.objects.all()
     serializer_class = WriterSerializer
     lookup_field = 'id'
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(CachedResponseMixin, BulkCreateViewMixin, ValuesListViewMixin,
+                  EagerLoadingViewMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar libros.
     
     Proporciona operaciones CRUD completas para el modelo Book.
     Usa diferentes serializers para creación y otras operaciones.
+    Los listados y detalles se sirven desde la caché de respuestas y los
+    listados se construyen desde ``values()``.
+    ``POST /books/bulk/`` crea una lista de libros de una vez y
+    ``GET /books/search/?q=`` busca por palabras del título o del escritor.
+    El listado admite ``?writer=``, ``?title__startswith=`` y
+    ``?title__contains=`` (ver :data:`~viewset_books.filters.BOOK_FILTERS`).
     """
+    cache_dependencies = (Book, Writer)
+    query_filters = BOOK_FILTERS
+    bulk_serializer_class = BookBulkSerializer
     queryset = Book.objects.all()
     lookup_field = 'id'
     
@@ -40,12 +141,57 @@ class BookViewSet(viewsets.ModelViewSet):
             return BookCreateSerializer
         return BookSerializer
 
-class LoanViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Busca libros por palabras del título o del nombre del escritor.
+
+        Usa el índice de texto completo (ver :mod:`viewset_books.search`):
+        ``?q=`` es obligatorio, todas sus palabras deben aparecer (la
+        última como prefijo) y los resultados se ordenan por relevancia con
+        su ``score``. Se paginan con ``?page_size=`` (por defecto
+        :data:`SEARCH_PAGE_SIZE`) y ``?offset=`` (hasta
+        :data:`SEARCH_MAX_OFFSET`; más allá no hay página siguiente), y
+        admiten ``?fields=``/``?exclude=``. Las respuestas se cachean como
+        el listado.
+
+        Args:
+            request: Objeto de petición HTTP
+
+        Returns:
+            Response con ``next``, ``previous`` y ``results``
+        """
+        def build():
+            limit = _int_param(request, 'page_size', SEARCH_PAGE_SIZE, 1, SEARCH_MAX_PAGE_SIZE)
+            offset = _int_param(request, 'offset', 0, 0)
+            if offset > SEARCH_MAX_OFFSET:
+                raise ValidationError(
+                    {'offset': f'Debe ser menor o igual que {SEARCH_MAX_OFFSET}.'}
+                )
+            # Un resultado de más indica si hay página siguiente
+            hits = search_books(request.query_params.get('q'), limit + 1, offset)
+            url = request.build_absolute_uri()
+            has_next = len(hits) > limit and offset + limit <= SEARCH_MAX_OFFSET
+            return Response({
+                'next': (replace_query_param(url, 'offset', offset + limit)
+                         if has_next else None),
+                'previous': (replace_query_param(url, 'offset', max(offset - limit, 0))
+                             if offset else None),
+                'results': search_results(request, hits[:limit]),
+            })
+        return cached_response(request, self.cache_dependencies, build)
+
+class LoanViewSet(BulkCreateViewMixin, ValuesListViewMixin, EagerLoadingViewMixin,
+                  viewsets.ModelViewSet):
     """ViewSet para gestionar préstamos de libros.
     
     Proporciona operaciones CRUD completas y acciones personalizadas
-    para devolver libros y listar préstamos activos.
+    para devolver libros, listar préstamos activos y crear préstamos
+    en bloque (``POST /loans/bulk/``). Los listados admiten ``?user=``,
+    ``?book=``, ``?bibliotecary=``, ``?status=``, ``?from=`` y ``?to=``
+    (ver :data:`~viewset_books.filters.LOAN_FILTERS`).
     """
+    query_filters = LOAN_FILTERS
+    bulk_serializer_class = LoanBulkSerializer
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
     lookup_field = 'id'
@@ -62,37 +208,37 @@ class LoanViewSet(viewsets.ModelViewSet):
             Response con los datos actualizados del préstamo o error
         """
         loan = self.get_object()
-        if not loan.is_active:
+        if not return_loan(loan):
             return Response(
                 {'error': 'Este préstamo ya fue devuelto'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        loan.return_date = timezone.now()
-        loan.is_active = False
-        loan.save()
-        
         serializer = self.get_serializer(loan)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional_on(Loan, Book, User, Bibliotecary))
     def active(self, request):
         """Lista todos los préstamos activos.
         
+        Admite GET condicional: responde ``304`` sin consultar la base de
+        datos si ningún préstamo ha cambiado desde el ``ETag`` recibido.
+        
         Args:
             request: Objeto de petición HTTP
             
         Returns:
-            Response con la lista de préstamos activos
+            Response con la página de préstamos activos
         """
-        active_loans = Loan.objects.filter(is_active=True)
-        serializer = self.get_serializer(active_loans, many=True)
-        return Response(serializer.data) 
+        loans = self.filter_queryset(self.get_queryset())
+        return self.list_response(loans.filter(is_active=True))
 
 
 # Vistas genéricas para Writer
-class WriterListView(generics.ListAPIView):
+class WriterListView(EagerLoadingViewMixin, generics.ListAPIView):
     """Vista genérica para listar todos los escritores"""
+    query_filters = WRITER_FILTERS
     queryset = Writer.objects.all()
     serializer_class = WriterSerializer
 
@@ -103,14 +249,14 @@ class WriterCreateView(generics.CreateAPIView):
     serializer_class = WriterSerializer
 
 
-class WriterDetailView(generics.RetrieveAPIView):
+class WriterDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """Vista genérica para obtener detalles de un escritor"""
     queryset = Writer.objects.all()
     serializer_class = WriterSerializer
     lookup_field = 'pk'
 
 
-class WriterUpdateView(generics.UpdateAPIView):
+class WriterUpdateView(EagerLoadingViewMixin, generics.UpdateAPIView):
     """Vista genérica para actualizar un escritor"""
     queryset = Writer.objects.all()
     serializer_class = WriterSerializer
@@ -118,8 +264,9 @@ class WriterUpdateView(generics.UpdateAPIView):
 
 
 # Vistas genéricas para Book
-class BookListView(generics.ListAPIView):
+class BookListView(ValuesListViewMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """Vista genérica para listar todos los libros"""
+    query_filters = BOOK_FILTERS
     queryset = Book.objects.all()
     serializer_class = BookSerializer
 
@@ -130,14 +277,14 @@ class BookCreateView(generics.CreateAPIView):
     serializer_class = BookCreateSerializer
 
 
-class BookDetailView(generics.RetrieveAPIView):
+class BookDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """Vista genérica para obtener detalles de un libro"""
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     lookup_field = 'pk'
 
 
-class BookUpdateView(generics.UpdateAPIView):
+class BookUpdateView(EagerLoadingViewMixin, generics.UpdateAPIView):
     """Vista genérica para actualizar un libro"""
     queryset = Book.objects.all()
     serializer_class = BookSerializer
@@ -145,26 +292,27 @@ class BookUpdateView(generics.UpdateAPIView):
 
 
 # Vistas genéricas para Loan
-class LoanListView(generics.ListAPIView):
+class LoanListView(ValuesListViewMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """Vista genérica para listar todos los préstamos"""
+    query_filters = LOAN_FILTERS
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
 
 
-class LoanCreateView(generics.CreateAPIView):
+class LoanCreateView(EagerLoadingViewMixin, generics.CreateAPIView):
     """Vista genérica para crear un préstamo"""
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
 
 
-class LoanDetailView(generics.RetrieveAPIView):
+class LoanDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """Vista genérica para obtener detalles de un préstamo"""
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
     lookup_field = 'pk'
 
 
-class LoanUpdateView(generics.UpdateAPIView):
+class LoanUpdateView(EagerLoadingViewMixin, generics.UpdateAPIView):
     """Vista genérica para actualizar un préstamo"""
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
@@ -172,13 +320,90 @@ class LoanUpdateView(generics.UpdateAPIView):
 
 
 # API Views personalizadas que enlazan modelos
+#: Valores de ``?stream=`` que activan el modo streaming
+STREAM_VALUES = ('1', 'true')
+
+#: Campos de cada préstamo del historial de un usuario
+LOAN_HISTORY_FIELDS = (
+    'id', 'book_id', 'book__title', 'book__writer__name',
+    'bibliotecary__username', 'loan_date', 'return_date', 'is_active',
+)
+
+
+def history_entry(row):
+    """Da forma a una fila de :data:`LOAN_HISTORY_FIELDS` para el historial."""
+    return {
+        'loan_id': row['id'],
+        'book': {
+            'id': row['book_id'],
+            'title': row['book__title'],
+            'writer': row['book__writer__name']
+        },
+        'bibliotecary': row['bibliotecary__username'],
+        'loan_date': row['loan_date'],
+        'return_date': row['return_date'],
+        'is_active': row['is_active']
+    }
+
+
+def history_page(loans, fields, entry, request):
+    """Página del historial de préstamos paginada por cursor.
+
+    Args:
+        loans: QuerySet de préstamos (ya filtrado)
+        fields: Campos que se leen de cada préstamo
+        entry: Función que da forma a cada fila
+        request: Petición de DRF con los parámetros de paginación
+
+    Returns:
+        dict: ``loan_history``, ``next`` y ``previous``
+    """
+    paginator = KeysetCursorPagination()
+    page = paginator.paginate_queryset(loans.values(*fields), request)
+    return {
+        'loan_history': [entry(row) for row in page],
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+    }
+
+
+def user_summary(user):
+    """Datos básicos de un usuario para sus vistas de préstamos."""
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'full_name': user.full_name
+    }
+
+
+def counter_statistics(instance):
+    """Estadísticas de préstamos leídas de los contadores desnormalizados."""
+    return {
+        'total_loans': instance.total_loans,
+        'active_loans': instance.active_loans,
+        'completed_loans': instance.completed_loans
+    }
+
+
 @api_view(['GET'])
+@cache_response(User, Loan, Book, Writer, Bibliotecary)
 def user_loan_history(request, user_id):
     """Vista personalizada que enlaza User con Loan y Book.
     
-    Proporciona un historial completo de préstamos de un usuario específico,
+    Proporciona el historial de préstamos de un usuario específico,
     incluyendo información de los libros prestados y estadísticas.
     
+    El historial se pagina por cursor (``next``/``previous``, ``?page_size=``)
+    en orden de fecha de préstamo descendente y admite los filtros de
+    :mod:`viewset_books.filters` (``?status=``, ``?from=``, ``?to=``). Sin
+    filtros las estadísticas vienen de los contadores del usuario; con
+    filtros se calculan en un único agregado condicional.
+    
+    Con ``?stream=1`` el historial completo se envía en streaming, leído
+    por lotes de la base de datos en orden de alta descendente, sin
+    paginar ni cargarlo en memoria.
+    
     Args:
         request: Objeto de petición HTTP
         user_id: ID del usuario
@@ -188,58 +413,82 @@ def user_loan_history(request, user_id):
     """
     try:
         user = User.objects.get(id=user_id)
-        loans = Loan.objects.filter(user=user).select_related('book', 'book__writer', 'bibliotecary')
-        
-        # Estadísticas
-        total_loans = loans.count()
-        active_loans = loans.filter(is_active=True).count()
-        completed_loans = loans.filter(is_active=False).count()
-        
-        # Detalle de préstamos
-        loan_list = []
-        for loan in loans:
-            loan_list.append({
-                'loan_id': loan.id,
-                'book': {
-                    'id': loan.book.id,
-                    'title': loan.book.title,
-                    'writer': loan.book.writer.name
-                },
-                'bibliotecary': loan.bibliotecary.username if loan.bibliotecary else None,
-                'loan_date': loan.loan_date,
-                'return_date': loan.return_date,
-                'is_active': loan.is_active
-            })
-        
-        data = {
-            'user': {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'full_name': user.full_name
-            },
-            'statistics': {
-                'total_loans': total_loans,
-                'active_loans': active_loans,
-                'completed_loans': completed_loans
-            },
-            'loan_history': loan_list
-        }
-        return Response(data)
     except User.DoesNotExist:
         return Response(
             {'error': 'Usuario no encontrado'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    filters = parse_loan_filters(request)
+    loans = Loan.objects.filter(user=user, **filters)
+    
+    data = {
+        'user': user_summary(user),
+        'statistics': loan_totals(loans) if filters else counter_statistics(user),
+    }
+    
+    if request.query_params.get('stream') in STREAM_VALUES:
+        batches = (
+            [history_entry(dict(zip(LOAN_HISTORY_FIELDS, row))) for row in rows]
+            for rows in iter_rows(loans, LOAN_HISTORY_FIELDS, descending=True)
+        )
+        return StreamingHttpResponse(
+            json_document_lines(data, 'loan_history', batches),
+            content_type='application/json'
+        )
+    
+    data.update(history_page(loans, LOAN_HISTORY_FIELDS, history_entry, request))
+    return Response(data)
+
+
+#: Campos de cada préstamo del historial de un libro
+BOOK_HISTORY_FIELDS = (
+    'id', 'user_id', 'user__username', 'user__email',
+    'loan_date', 'return_date', 'is_active', 'bibliotecary__username',
+)
+
+
+def book_history_entry(row):
+    """Da forma a una fila de :data:`BOOK_HISTORY_FIELDS` para el historial."""
+    return {
+        'loan_id': row['id'],
+        'user': {
+            'id': row['user_id'],
+            'username': row['user__username'],
+            'email': row['user__email']
+        },
+        'loan_date': row['loan_date'],
+        'return_date': row['return_date'],
+        'is_active': row['is_active'],
+        'bibliotecary': row['bibliotecary__username']
+    }
+
+
+def book_summary(book):
+    """Datos básicos de un libro y su escritor (``select_related('writer')``)."""
+    return {
+        'id': book.id,
+        'title': book.title,
+        'writer': {
+            'id': book.writer.id,
+            'name': book.writer.name
+        }
+    }
 
 
 @api_view(['GET'])
+@cache_response(Book, Writer, Loan, User, Bibliotecary)
 def book_loan_statistics(request, book_id):
     """Vista personalizada que enlaza Book con Loan y User.
     
-    Proporciona estadísticas completas de préstamos de un libro específico,
+    Proporciona estadísticas de préstamos de un libro específico,
     incluyendo información de los usuarios que lo han solicitado.
     
+    Las estadísticas (incluidos los usuarios distintos) se calculan en un
+    único agregado condicional y el historial se pagina por cursor
+    (``next``/``previous``, ``?page_size=``). Admite los filtros de
+    :mod:`viewset_books.filters` y, con ``?buckets=daily|weekly|monthly``,
+    añade los préstamos agrupados por periodo en ``loans_by_period``.
+    
     Args:
         request: Objeto de petición HTTP
         book_id: ID del libro
@@ -249,61 +498,41 @@ def book_loan_statistics(request, book_id):
     """
     try:
         book = Book.objects.select_related('writer').get(id=book_id)
-        loans = Loan.objects.filter(book=book).select_related('user', 'bibliotecary')
-        
-        # Estadísticas
-        total_loans = loans.count()
-        active_loans = loans.filter(is_active=True).count()
-        completed_loans = loans.filter(is_active=False).count()
-        unique_users = loans.values('user').distinct().count()
-        
-        # Usuarios que han solicitado el libro
-        users_list = []
-        for loan in loans:
-            users_list.append({
-                'loan_id': loan.id,
-                'user': {
-                    'id': loan.user.id,
-                    'username': loan.user.username,
-                    'email': loan.user.email
-                },
-                'loan_date': loan.loan_date,
-                'return_date': loan.return_date,
-                'is_active': loan.is_active,
-                'bibliotecary': loan.bibliotecary.username if loan.bibliotecary else None
-            })
-        
-        data = {
-            'book': {
-                'id': book.id,
-                'title': book.title,
-                'writer': {
-                    'id': book.writer.id,
-                    'name': book.writer.name
-                }
-            },
-            'statistics': {
-                'total_loans': total_loans,
-                'active_loans': active_loans,
-                'completed_loans': completed_loans,
-                'unique_users': unique_users
-            },
-            'loan_history': users_list
-        }
-        return Response(data)
     except Book.DoesNotExist:
         return Response(
             {'error': 'Libro no encontrado'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    filters = parse_loan_filters(request)
+    period = parse_buckets(request)
+    loans = Loan.objects.filter(book=book, **filters)
+    
+    data = {
+        'book': book_summary(book),
+        'statistics': loan_totals(loans, unique_users=True),
+        **history_page(loans, BOOK_HISTORY_FIELDS, book_history_entry, request),
+    }
+    if period:
+        data['loans_by_period'] = loan_buckets(loans, period)
+    return Response(data)
+
+
+# Tablas de las que dependen las estadísticas globales
+LIBRARY_TABLES = (Writer, Book, User, Loan, Bibliotecary, LibraryStatistics)
 
 
 @api_view(['GET'])
+@conditional_on(*LIBRARY_TABLES)
+@cache_response(*LIBRARY_TABLES)
 def library_statistics(request):
     """Vista personalizada que enlaza todos los modelos principales.
     
     Proporciona estadísticas globales de la biblioteca, enlazando
-    Writer, Book, User, Loan y Bibliotecary.
+    Writer, Book, User, Loan y Bibliotecary. Se sirven desde la
+    instantánea :class:`~viewset_books.models.LibraryStatistics`, que se
+    mantiene al día de forma incremental, con una sola consulta. Admite
+    GET condicional con ``ETag``/``Last-Modified`` (ver
+    :mod:`api_server.conditional`).
     
     Args:
         request: Objeto de petición HTTP
@@ -311,77 +540,168 @@ def library_statistics(request):
     Returns:
         Response con estadísticas completas de la biblioteca
     """
-    from viewset_bibliotecary.models import Bibliotecary
-    
-    # Estadísticas generales
-    total_writers = Writer.objects.count()
-    total_books = Book.objects.count()
-    total_users = User.objects.count()
-    total_bibliotecaries = Bibliotecary.objects.count()
-    
-    # Estadísticas de préstamos
-    total_loans = Loan.objects.count()
-    active_loans = Loan.objects.filter(is_active=True).count()
-    completed_loans = Loan.objects.filter(is_active=False).count()
-    
-    # Top 5 libros más prestados
-    most_loaned_books = Book.objects.annotate(
-        loan_count=Count('loans')
-    ).order_by('-loan_count')[:5]
-    
-    top_books = []
-    for book in most_loaned_books:
-        top_books.append({
-            'id': book.id,
-            'title': book.title,
-            'writer': book.writer.name,
-            'total_loans': book.loan_count
-        })
-    
-    # Top 5 usuarios más activos
-    most_active_users = User.objects.annotate(
-        loan_count=Count('loans')
-    ).order_by('-loan_count')[:5]
-    
-    top_users = []
-    for user in most_active_users:
-        top_users.append({
-            'id': user.id,
-            'username': user.username,
-            'total_loans': user.loan_count
-        })
-    
-    # Escritores con más libros prestados
-    most_popular_writers = Writer.objects.annotate(
-        loan_count=Count('books__loans')
-    ).order_by('-loan_count')[:5]
-    
-    top_writers = []
-    for writer in most_popular_writers:
-        top_writers.append({
-            'id': writer.id,
-            'name': writer.name,
-            'total_books': writer.books.count(),
-            'total_loans': writer.loan_count
-        })
-    
-    data = {
-        'catalog': {
-            'total_writers': total_writers,
-            'total_books': total_books,
-            'total_users': total_users,
-            'total_bibliotecaries': total_bibliotecaries
-        },
-        'loans': {
-            'total_loans': total_loans,
-            'active_loans': active_loans,
-            'completed_loans': completed_loans
-        },
-        'rankings': {
-            'top_books': top_books,
-            'top_users': top_users,
-            'top_writers': top_writers
-        }
-    }
-    return Response(data) 
-    
\ No newline at end of file
+    return Response(snapshot_as_dict(get_snapshot()))
+
+
+# Variantes asíncronas de las vistas de estadísticas. Servidas con ASGI,
+# lanzan a la vez las consultas independientes con gather_queries. Usan la
+# misma autenticación, permisos, renderer y caché de respuestas que las
+# versiones síncronas (ver api_server.async_views), y sus respuestas son
+# idénticas.
+
+@async_api_view
+@cache_response(User, Loan, Book, Writer, Bibliotecary)
+async def user_loan_history_async(request, user_id):
+    """Variante asíncrona de :func:`user_loan_history`, sin modo streaming.
+
+    Con filtros, el agregado de estadísticas y la página del historial se
+    consultan a la vez.
+
+    Args:
+        request: Objeto de petición HTTP
+        user_id: ID del usuario
+
+    Returns:
+        Response con el historial de préstamos y estadísticas del usuario
+    """
+    try:
+        user = await User.objects.aget(id=user_id)
+    except User.DoesNotExist:
+        return Response(
+            {'error': 'Usuario no encontrado'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    filters = parse_loan_filters(request)
+    loans = Loan.objects.filter(user=user, **filters)
+
+    page = partial(history_page, loans, LOAN_HISTORY_FIELDS, history_entry, request)
+    if filters:
+        statistics, page = await gather_queries(partial(loan_totals, loans), page)
+    else:
+        statistics = counter_statistics(user)
+        page, = await gather_queries(page)
+    return Response({'user': user_summary(user), 'statistics': statistics, **page})
+
+
+@async_api_view
+@cache_response(Book, Writer, Loan, User, Bibliotecary)
+async def book_loan_statistics_async(request, book_id):
+    """Variante asíncrona de :func:`book_loan_statistics`.
+
+    El agregado de estadísticas, la página del historial y, si se piden,
+    los préstamos por periodo se consultan a la vez.
+
+    Args:
+        request: Objeto de petición HTTP
+        book_id: ID del libro
+
+    Returns:
+        Response con estadísticas de préstamos del libro
+    """
+    try:
+        book = await Book.objects.select_related('writer').aget(id=book_id)
+    except Book.DoesNotExist:
+        return Response(
+            {'error': 'Libro no encontrado'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    filters = parse_loan_filters(request)
+    period = parse_buckets(request)
+    loans = Loan.objects.filter(book=book, **filters)
+
+    queries = [
+        partial(loan_totals, loans, unique_users=True),
+        partial(history_page, loans, BOOK_HISTORY_FIELDS, book_history_entry, request),
+    ]
+    if period:
+        queries.append(partial(loan_buckets, loans, period))
+    statistics, page, *buckets = await gather_queries(*queries)
+    data = {'book': book_summary(book), 'statistics': statistics, **page}
+    if buckets:
+        data['loans_by_period'] = buckets[0]
+    return Response(data)
+
+
+@async_api_view
+@conditional_on(*LIBRARY_TABLES)
+@cache_response(*LIBRARY_TABLES)
+async def library_statistics_async(request):
+    """Variante asíncrona de :func:`library_statistics`.
+
+    Lee la instantánea con el ORM asíncrono. Con ``?live=1`` recalcula las
+    estadísticas desde cero lanzando a la vez sus ocho consultas, sin
+    guardarlas (ver :func:`~viewset_books.statistics.acompute_library_statistics`).
+
+    Args:
+        request: Objeto de petición HTTP
+
+    Returns:
+        Response con estadísticas completas de la biblioteca
+    """
+    if request.query_params.get('live') in STREAM_VALUES:
+        return Response(await acompute_library_statistics())
+    snapshot = await LibraryStatistics.objects.filter(pk=SNAPSHOT_PK).afirst()
+    if snapshot is None or snapshot.rankings_stale:
+        snapshot = await sync_to_async(get_snapshot)()
+    return Response(snapshot_as_dict(snapshot))
+
+
+# Exportaciones en streaming (NDJSON o CSV)
+LOAN_EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('book_id', 'book_id'),
+    ('book_title', 'book__title'),
+    ('user_id', 'user_id'),
+    ('user_username', 'user__username'),
+    ('bibliotecary_id', 'bibliotecary_id'),
+    ('bibliotecary_name', 'bibliotecary__username'),
+    ('loan_date', 'loan_date'),
+    ('return_date', 'return_date'),
+    ('is_active', 'is_active'),
+)
+
+BOOK_EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('title', 'title'),
+    ('writer_id', 'writer_id'),
+    ('writer_name', 'writer__name'),
+    ('total_loans', 'total_loans'),
+    ('active_loans', 'active_loans'),
+    ('completed_loans', 'completed_loans'),
+)
+
+
+@require_GET
+def export_loans(request, fmt):
+    """Exporta todos los préstamos en streaming.
+
+    No usa DRF: las filas se leen con ``values_list()`` por lotes y se
+    escriben directamente (ver :mod:`api_server.export`).
+
+    Args:
+        request: Objeto de petición HTTP
+        fmt: ``ndjson`` o ``csv``
+
+    Returns:
+        StreamingHttpResponse con un préstamo por línea
+    """
+    if fmt not in CONTENT_TYPES:
+        raise Http404('Formato no soportado')
+    return export_response(Loan.objects.all(), LOAN_EXPORT_FIELDS, fmt, 'loans')
+
+
+@require_GET
+def export_books(request, fmt):
+    """Exporta todos los libros, con su escritor y contadores, en streaming.
+
+    Args:
+        request: Objeto de petición HTTP
+        fmt: ``ndjson`` o ``csv``
+
+    Returns:
+        StreamingHttpResponse con un libro por línea
+    """
+    if fmt not in CONTENT_TYPES:
+        raise Http404('Formato no soportado')
+    return export_response(Book.objects.all(), BOOK_EXPORT_FIELDS, fmt, 'books')
+
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ViewsetUsersConfig(AppConfig):
     name = 'viewset_users'
+
+    def ready(self):
+        """Registra las señales que invalidan la caché de respuestas."""
+        from viewset_users import signals  # noqa: F401
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewset_users', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-total_loans', 'id'], name='user_ranking_idx'),
+        ),
+    ]
@@ -1,12 +1,27 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 # Create your models here.
 class User(models.Model):
     """Modelo que representa a un usuario del sistema.
+
+    Incluye contadores desnormalizados de sus préstamos, mantenidos por
+    :mod:`viewset_books.counters`.
     """
     username = models.CharField(max_length=150, unique=True)
     email = models.EmailField(unique=True)
     full_name = models.CharField(max_length=150)
+    total_loans = models.IntegerField(default=0, editable=False)
+    active_loans = models.IntegerField(default=0, editable=False)
+    completed_loans = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Búsqueda por prefijo sin distinguir mayúsculas (?username__startswith=)
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            # Ranking de usuarios con más préstamos (ver viewset_books.statistics)
+            models.Index(fields=['-total_loans', 'id'], name='user_ranking_idx'),
+        ]
 
     def __str__(self):
         """Retorna el nombre de usuario."""
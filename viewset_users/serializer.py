@@ -1,7 +1,12 @@
 from rest_framework import serializers
 from .models import User
+from api_server.cache import invalidate
+from api_server.serializers import (
+    BulkCreateListSerializer, SparseFieldsMixin, duplicate_errors, existing_values
+)
+from viewset_books import statistics
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para el modelo User.
     
     Incluye validación personalizada del campo email.
@@ -25,4 +30,42 @@ class UserSerializer(serializers.ModelSerializer):
         """
         if "@" not in value:
             raise serializers.ValidationError("Email debe contener el símbolo '@'.")
-        return value
\ No newline at end of file
+        return value
+
+
+class UserBulkListSerializer(BulkCreateListSerializer):
+    """Alta masiva de usuarios con ``bulk_create``.
+
+    La unicidad de ``username`` y ``email`` se comprueba con una consulta
+    por campo para todo el lote.
+    """
+
+    def validate_items(self, items):
+        """Comprueba que nombres de usuario y emails no se repitan ni existan."""
+        errors = {}
+        for field, message in (
+            ('username', 'Ya existe un usuario con este nombre de usuario.'),
+            ('email', 'Ya existe un usuario con este email.'),
+        ):
+            existing = existing_values(User, field, (item[field] for item in items))
+            for index, error in duplicate_errors(items, field, existing, message).items():
+                errors.setdefault(index, {}).update(error)
+        return errors
+
+    def build_instances(self, items):
+        """Construye los usuarios a partir de los datos validados."""
+        return [User(**item) for item in items]
+
+    def after_create(self, instances):
+        """Cuenta los usuarios nuevos en la instantánea de estadísticas."""
+        statistics.adjust_counters(total_users=len(instances), rankings_changed=True)
+        invalidate(User)
+
+
+class UserBulkSerializer(UserSerializer):
+    """Elemento de un alta masiva de usuarios (ver :class:`UserBulkListSerializer`)."""
+
+    class Meta(UserSerializer.Meta):
+        list_serializer_class = UserBulkListSerializer
+        extra_kwargs = {'username': {'validators': []}, 'email': {'validators': []}}
+
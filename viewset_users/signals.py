@@ -0,0 +1,8 @@
+"""Invalidación de las respuestas cacheadas que leen la tabla de usuarios.
+
+Ver :mod:`api_server.cache`.
+"""
+from api_server.cache import track_versions
+from viewset_users.models import User
+
+track_versions(User)
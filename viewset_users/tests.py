@@ -1,3 +1,4 @@
+import json
 from django.test import TestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
@@ -69,8 +70,8 @@ class UserAPITest(APITestCase):
         """Test: GET /users/ - Listar todos los usuarios"""
         response = self.client.get('/users/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['username'], 'apiuser')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['username'], 'apiuser')
     
     def test_obtener_usuario_detalle(self):
         """Test: GET /users/{id}/ - Obtener detalles de un usuario"""
@@ -127,3 +128,106 @@ class UserAPITest(APITestCase):
         response = self.client.post('/users/', incomplete_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+class UserSparseFieldsTest(APITestCase):
+    """Tests para ?fields= y ?exclude= en la API de usuarios"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = APIClient()
+        self.user = User.objects.create(
+            username='sparse_user', email='sparse_user@example.com', full_name='Sparse User'
+        )
+
+    def test_listado_y_detalle(self):
+        """Test: Solo se devuelven los campos pedidos"""
+        response = self.client.get('/users/?fields=id,username')
+        self.assertEqual(response.data['results'], [{'id': self.user.id, 'username': 'sparse_user'}])
+        response = self.client.get(f'/users/{self.user.id}/?exclude=email,full_name')
+        self.assertEqual(response.data, {'id': self.user.id, 'username': 'sparse_user'})
+
+    def test_campo_desconocido(self):
+        """Test: Un campo inexistente responde 400"""
+        response = self.client.get('/users/?fields=password')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserSearchTest(APITestCase):
+    """Tests para la búsqueda de usuarios por nombre de usuario"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = APIClient()
+        self.ana = User.objects.create(username='AnaLectora', email='ana@example.com', full_name='Ana')
+        User.objects.create(username='beatriz', email='bea@example.com', full_name='Bea')
+
+    def test_prefijo(self):
+        """Test: ?username__startswith= no distingue mayúsculas"""
+        response = self.client.get('/users/?username__startswith=ana')
+        self.assertEqual([u['id'] for u in response.data['results']], [self.ana.id])
+
+    def test_contains_requiere_prefijo(self):
+        """Test: ?username__contains= solo se admite junto al prefijo"""
+        response = self.client.get('/users/?username__contains=lector')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/users/?username__startswith=a&username__contains=lector')
+        self.assertEqual([u['id'] for u in response.data['results']], [self.ana.id])
+
+
+class UserBulkCreateTest(APITestCase):
+    """Tests para el alta masiva de usuarios"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        self.client = APIClient()
+        User.objects.create(username='existente', email='existente@example.com', full_name='Existente')
+    
+    def test_crear_usuarios(self):
+        """Test: Crea todos los usuarios de la lista"""
+        data = [
+            {'username': f'bulk{i}', 'email': f'bulk{i}@example.com', 'full_name': f'Bulk {i}'}
+            for i in range(20)
+        ]
+        response = self.client.post('/users/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'created': 20})
+        self.assertEqual(User.objects.count(), 21)
+    
+    def test_errores_de_unicidad_por_elemento(self):
+        """Test: Usuarios y emails repetidos se reportan en su posición"""
+        data = [
+            {'username': 'nuevo', 'email': 'nuevo@example.com', 'full_name': 'Nuevo'},
+            {'username': 'existente', 'email': 'otro@example.com', 'full_name': 'Otro'},
+            {'username': 'tercero', 'email': 'nuevo@example.com', 'full_name': 'Tercero'},
+            {'username': 'cuarto', 'email': 'sin-arroba', 'full_name': 'Cuarto'},
+        ]
+        response = self.client.post('/users/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[3].keys(), {'email'})
+        
+        response = self.client.post('/users/bulk/', data[:3], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1].keys(), {'username'})
+        self.assertEqual(response.data[2].keys(), {'email'})
+        self.assertEqual(User.objects.count(), 1)
+    
+    def test_lista_requerida(self):
+        """Test: Un objeto en lugar de una lista se rechaza"""
+        response = self.client.post('/users/bulk/', {'username': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserExportTest(TestCase):
+    """Tests para la exportación de usuarios"""
+    
+    def test_exportar_usuarios_ndjson(self):
+        """Test: Exporta todos los usuarios con sus contadores"""
+        for i in range(3):
+            User.objects.create(username=f'exp{i}', email=f'exp{i}@example.com', full_name=f'Exp {i}')
+        response = self.client.get('/api/export/users.ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['username'], 'exp0')
+        self.assertEqual(json.loads(lines[0])['total_loans'], 0)
+
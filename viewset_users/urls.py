@@ -5,7 +5,8 @@ from .views import (
     UserListView,
     UserCreateView,
     UserDetailView,
-    UserUpdateView
+    UserUpdateView,
+    export_users
 )
 #ViewSet
 router = DefaultRouter()
@@ -17,4 +18,7 @@ urlpatterns = [
     path('generic/users/create/', UserCreateView.as_view(), name='user-create-generic'),
     path('generic/users/<int:pk>/', UserDetailView.as_view(), name='user-detail-generic'),
     path('generic/users/<int:pk>/update/', UserUpdateView.as_view(), name='user-update-generic'),
+    
+    # Exportación en streaming: .ndjson o .csv
+    path('api/export/users.<str:fmt>', export_users, name='export-users'),
 ] + router.urls
\ No newline at end of file
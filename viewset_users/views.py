@@ -4,16 +4,35 @@ from rest_framework.decorators import action
 from rest_framework import viewsets, generics
 from rest_framework import status
 from .models import User
-from .serializer import UserSerializer
+from .serializer import UserSerializer, UserBulkSerializer
+from api_server.mixins import BulkCreateViewMixin, EagerLoadingViewMixin, ValuesListViewMixin
+from api_server.export import CONTENT_TYPES, export_response
+from django.http import Http404
+from django.views.decorators.http import require_GET
+from api_server.cache import CachedResponseMixin
+from api_server.filters import ContainsFilter, PrefixFilter
 import logging
 
 logger = logging.getLogger(__name__)
 
-class UserViewSet(viewsets.ModelViewSet):
+#: Filtros de ``/users/``; ``username__contains`` necesita el prefijo
+USER_FILTERS = (
+    PrefixFilter('username__startswith', 'username'),
+    ContainsFilter('username__contains', 'username'),
+)
+
+class UserViewSet(CachedResponseMixin, BulkCreateViewMixin, ValuesListViewMixin,
+                  EagerLoadingViewMixin, viewsets.ModelViewSet):
     """ViewSet para gestionar usuarios.
     
         Proporciona operaciones CRUD completas para el modelo User.
+        Los listados y detalles se sirven desde la caché de respuestas.
+        ``POST /users/bulk/`` crea una lista de usuarios de una vez.
+        El listado admite ``?username__startswith=`` y ``?username__contains=``.
     """
+    cache_dependencies = (User,)
+    query_filters = USER_FILTERS
+    bulk_serializer_class = UserBulkSerializer
     queryset = User.objects.all()
     serializer_class = UserSerializer
     lookup_field = 'id'
@@ -21,8 +40,9 @@ class UserViewSet(viewsets.ModelViewSet):
 
 # Vistas genéricas basadas en clases
 
-class UserListView(generics.ListAPIView):
+class UserListView(ValuesListViewMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """Vista genérica para listar todos los usuarios"""
+    query_filters = USER_FILTERS
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
@@ -33,7 +53,7 @@ class UserCreateView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """Vista genérica para obtener detalles de un usuario"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -45,3 +65,31 @@ class UserUpdateView(generics.UpdateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     lookup_field = 'pk'
+
+
+USER_EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('username', 'username'),
+    ('email', 'email'),
+    ('full_name', 'full_name'),
+    ('total_loans', 'total_loans'),
+    ('active_loans', 'active_loans'),
+    ('completed_loans', 'completed_loans'),
+)
+
+
+@require_GET
+def export_users(request, fmt):
+    """Exporta todos los usuarios en streaming (ver :mod:`api_server.export`).
+
+    Args:
+        request: Objeto de petición HTTP
+        fmt: ``ndjson`` o ``csv``
+
+    Returns:
+        StreamingHttpResponse con un usuario por línea
+    """
+    if fmt not in CONTENT_TYPES:
+        raise Http404('Formato no soportado')
+    return export_response(User.objects.all(), USER_EXPORT_FIELDS, fmt, 'users')
+